@@ -0,0 +1,169 @@
+from collections import deque
+from typing import Deque, Dict, NamedTuple, Optional
+import asyncio
+import json
+import math
+import time
+
+from app.core.metrics import metrics
+
+
+class RouteClass(NamedTuple):
+    name: str
+    limit: int  # concurrent requests of this class
+    priority: int  # lower is served first when capacity frees up
+
+
+class Rejected(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Per-class concurrency limits with a bounded, prioritised wait queue.
+
+    A request runs when its class and the whole worker are both under their
+    limits and nobody of equal or higher priority is waiting. Otherwise it
+    queues, unless the queue is full or the expected wait (queue position x
+    recent service time of the class) is already past the deadline, in
+    which case it is rejected at once instead of holding the client.
+    Queued requests that are still waiting at the deadline are rejected too.
+    """
+
+    def __init__(self, classes, max_in_flight: int, queue_size: int, max_wait_seconds: float):
+        self.classes: Dict[str, RouteClass] = {route_class.name: route_class for route_class in classes}
+        self.max_in_flight = max_in_flight
+        self.queue_size = queue_size
+        self.max_wait = max_wait_seconds
+        self.in_flight = 0
+        self._running: Dict[str, int] = {name: 0 for name in self.classes}
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {name: deque() for name in self.classes}
+        self._service_time: Dict[str, float] = {name: 0.0 for name in self.classes}
+        self._by_priority = sorted(self.classes.values(), key=lambda route_class: route_class.priority)
+
+    def _has_capacity(self, name: str) -> bool:
+        return self.in_flight < self.max_in_flight and self._running[name] < self.classes[name].limit
+
+    def _waiting_ahead(self, name: str) -> int:
+        priority = self.classes[name].priority
+        return sum(
+            len(self._waiters[route_class.name])
+            for route_class in self._by_priority if route_class.priority <= priority
+        )
+
+    def expected_wait(self, name: str) -> float:
+        return (self._waiting_ahead(name) + 1) * self._service_time[name] / self.classes[name].limit
+
+    def _admit(self, name: str):
+        self.in_flight += 1
+        self._running[name] += 1
+        metrics.inc(f"admission.{name}.admitted")
+        metrics.set(f"admission.{name}.in_flight", self._running[name])
+
+    def _reject(self, name: str, reason: str, wait: float):
+        metrics.inc(f"admission.{name}.rejected.{reason}")
+        raise Rejected(reason, max(1, math.ceil(wait)))
+
+    async def acquire(self, name: str) -> float:
+        """Wait for a slot of class `name`; returns the admission time for release()"""
+        if self._has_capacity(name) and self._waiting_ahead(name) == 0:
+            self._admit(name)
+            return time.monotonic()
+
+        expected = self.expected_wait(name)
+        if len(self._waiters[name]) >= self.queue_size:
+            self._reject(name, "queue_full", expected)
+        if expected > self.max_wait:
+            self._reject(name, "deadline", expected)
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[name].append(future)
+        metrics.inc(f"admission.{name}.queued")
+        metrics.set(f"admission.{name}.waiting", len(self._waiters[name]))
+        try:
+            await asyncio.wait([future], timeout=self.max_wait)
+        except asyncio.CancelledError:
+            # Client went away: give back a slot granted meanwhile, or leave the queue
+            if future.done():
+                self._free(name)
+            else:
+                self._waiters[name].remove(future)
+            raise
+
+        if not future.done():
+            self._waiters[name].remove(future)
+            metrics.set(f"admission.{name}.waiting", len(self._waiters[name]))
+            self._reject(name, "timeout", self.expected_wait(name))
+        return time.monotonic()
+
+    def release(self, name: str, admitted_at: float):
+        elapsed = time.monotonic() - admitted_at
+        previous = self._service_time[name]
+        self._service_time[name] = elapsed if previous == 0 else 0.8 * previous + 0.2 * elapsed
+        self._free(name)
+
+    def _free(self, name: str):
+        self.in_flight -= 1
+        self._running[name] -= 1
+        metrics.set(f"admission.{name}.in_flight", self._running[name])
+        self._dispatch()
+
+    def _dispatch(self):
+        # Highest priority first; a class at its own limit does not block lower ones
+        for route_class in self._by_priority:
+            waiters = self._waiters[route_class.name]
+            while waiters and self._has_capacity(route_class.name):
+                future = waiters.popleft()
+                self._admit(route_class.name)
+                future.set_result(True)
+            metrics.set(f"admission.{route_class.name}.waiting", len(waiters))
+            if self.in_flight >= self.max_in_flight:
+                return
+
+
+def classify(method: str, path: str) -> Optional[str]:
+    """Route class of a request; None for requests that are never limited"""
+    if not path.startswith("/api/"):
+        return None  # health, readiness, metrics and docs must answer under load
+    if method == "POST" and path.startswith("/api/lessons/") and path.endswith(("/submit", "/single")):
+        return "submission"
+    if method == "GET" and path.startswith("/api/lessons"):
+        return "catalog"
+    return "default"
+
+
+class AdmissionMiddleware:
+    """ASGI middleware answering 503 + Retry-After to requests the controller sheds"""
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        name = classify(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            admitted_at = await self.controller.acquire(name)
+        except Rejected as e:
+            body = json.dumps({"detail": "Server is overloaded, retry later", "reason": e.reason}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(e.retry_after).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(name, admitted_at)
@@ -0,0 +1,68 @@
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+import time
+
+from app.core.metrics import metrics
+
+
+class LocalCache:
+    """Bounded in-process LRU cache with a TTL.
+
+    Entries are only as fresh as the invalidation bus keeps them: caches
+    registered with it are flushed on every NOTIFY for their entity and
+    suspended (every lookup misses) while the listener is disconnected.
+    """
+
+    def __init__(self, name: str, max_entries: int = 1024, ttl_seconds: float = 60.0):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.suspended = False
+        # Bumped on every invalidation so a value read before it is not stored after it
+        self.generation = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        if not self.enabled or self.suspended:
+            return None
+        entry = self._entries.get(key)
+        if entry is None:
+            metrics.inc(f"cache.{self.name}.misses")
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            metrics.inc(f"cache.{self.name}.misses")
+            return None
+        self._entries.move_to_end(key)
+        metrics.inc(f"cache.{self.name}.hits")
+        return value
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None):
+        """Store `value`; pass the `generation` seen before loading it to drop stale loads"""
+        if not self.enabled or self.suspended:
+            return
+        if generation is not None and generation != self.generation:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def evict(self, key: Hashable):
+        self.generation += 1
+        if self._entries.pop(key, None) is not None:
+            metrics.inc(f"cache.{self.name}.evictions")
+
+    def clear(self):
+        self.generation += 1
+        if self._entries:
+            metrics.inc(f"cache.{self.name}.flushes")
+        self._entries.clear()
@@ -0,0 +1,168 @@
+"""
+Per-request time budgets.
+
+DeadlineMiddleware gives every /api request a deadline for its route class
+and keeps it in a context variable. Work done for the request reads the
+remaining budget from there: sessions start each transaction with
+SET LOCAL statement_timeout, pool checkout waits no longer than the budget,
+and the fast path sets the same timeout on its raw connection. A request
+that runs out of budget gets 504 with code "deadline_exceeded"; the
+middleware cancels it outright if it overruns by more than a short grace,
+which also rolls back and returns its connection.
+"""
+from contextvars import ContextVar
+from typing import Dict, Optional
+import asyncio
+import json
+import logging
+import time
+
+from fastapi import HTTPException, status
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.util.queue import AsyncAdaptedQueue, Empty
+
+from app.core.admission import classify
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+ERROR_CODE = "deadline_exceeded"
+QUERY_CANCELED = "57014"  # SQLSTATE raised when statement_timeout fires
+
+# Extra time the handler gets after its budget before it is cancelled, so the
+# database timeout (a clean 504 from the route) normally fires first
+CANCEL_GRACE_SECONDS = 0.1
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(HTTPException):
+    """Raised when the current request has no time left; answered with 504"""
+
+    def __init__(self, detail: str = "Request deadline exceeded"):
+        super().__init__(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=detail)
+
+
+def set_deadline(seconds: float):
+    """Start a budget of `seconds` for the current context; returns a token for reset_deadline()"""
+    return _deadline.set(time.monotonic() + seconds)
+
+
+def reset_deadline(token):
+    _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current request's budget; None outside a request"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def statement_timeout_ms() -> Optional[int]:
+    """Remaining budget as a statement_timeout value; raises when it is used up"""
+    budget = remaining()
+    if budget is None:
+        return None
+    if budget <= 0:
+        metrics.inc("deadline.exceeded.before_query")
+        raise DeadlineExceeded()
+    return max(1, int(budget * 1000))
+
+
+def _set_statement_timeout(session, transaction, connection):
+    timeout = statement_timeout_ms()
+    if timeout is not None:
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {timeout}")
+
+
+def ran_out_of_time(error: BaseException) -> bool:
+    """Whether a database error is statement_timeout cancelling a query of the current request"""
+    # statement_timeout is the only thing that cancels our queries, so while a
+    # deadline is active a cancelled query means the request ran out of time
+    if _deadline.get() is None or getattr(error, "sqlstate", None) != QUERY_CANCELED:
+        return False
+    metrics.inc("deadline.exceeded.statement_timeout")
+    return True
+
+
+def _translate_query_canceled(context):
+    return DeadlineExceeded() if ran_out_of_time(context.original_exception) else None
+
+
+class DeadlineQueue(AsyncAdaptedQueue):
+    """Pool queue whose checkout wait is capped by the request's remaining budget"""
+
+    def get(self, block: bool = True, timeout: Optional[float] = None):
+        budget = remaining()
+        if not block or budget is None or (timeout is not None and timeout <= budget):
+            return super().get(block, timeout)
+        if budget <= 0:
+            metrics.inc("deadline.exceeded.pool_checkout")
+            raise DeadlineExceeded()
+        try:
+            return super().get(block, budget)
+        except Empty:
+            pass
+        metrics.inc("deadline.exceeded.pool_checkout")
+        raise DeadlineExceeded()
+
+
+class DeadlinePool(AsyncAdaptedQueuePool):
+    _queue_class = DeadlineQueue
+
+
+def install(engine, session_class):
+    """Apply request budgets to transactions of `session_class` and errors of `engine`"""
+    event.listen(session_class, "after_begin", _set_statement_timeout)
+    event.listen(engine.sync_engine, "handle_error", _translate_query_canceled, retval=True)
+
+
+def error_body(detail: str = "Request deadline exceeded") -> dict:
+    return {"detail": detail, "code": ERROR_CODE}
+
+
+class DeadlineMiddleware:
+    """ASGI middleware giving each /api request the budget of its route class"""
+
+    def __init__(self, app, budgets: Dict[str, float]):
+        self.app = app
+        self.budgets = budgets
+
+    async def __call__(self, scope, receive, send):
+        name = classify(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        budget = self.budgets.get(name)
+        if budget is None:
+            await self.app(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def send_wrapper(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        token = set_deadline(budget)
+        try:
+            await asyncio.wait_for(self.app(scope, receive, send_wrapper), budget + CANCEL_GRACE_SECONDS)
+        except asyncio.TimeoutError:
+            metrics.inc(f"deadline.{name}.cancelled")
+            logger.warning(f"Cancelled {scope['method']} {scope['path']} after its {budget:.1f}s budget")
+            if response_started:
+                return
+            body = json.dumps(error_body()).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 504,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+        finally:
+            reset_deadline(token)
@@ -0,0 +1,144 @@
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from typing import Dict, List, Optional
+import asyncio
+import json
+import logging
+
+from app.core.cache import LocalCache
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "ez_exam_invalidation"
+
+_NOTIFY = text("SELECT pg_notify(:channel, :payload)")
+
+
+class InvalidationBus:
+    """Cross-worker cache invalidation over Postgres LISTEN/NOTIFY.
+
+    Writers publish (entity, id, version) inside their transaction, so the
+    message is only delivered if and when it commits. Every worker keeps one
+    dedicated asyncpg connection LISTENing and evicts matching entries from
+    the caches registered for that entity. NOTIFY is not durable: whenever
+    the listener (re)connects every registered cache is flushed, and caches
+    stay suspended while it is disconnected, including before it first
+    connects and when the bus is never started (invalidation disabled).
+    """
+
+    def __init__(self, channel: str = CHANNEL, keepalive_seconds: float = 30.0):
+        self.channel = channel
+        self.keepalive_seconds = keepalive_seconds
+        self.listening = False
+        self._caches: Dict[str, List[LocalCache]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, entity: str, cache: LocalCache):
+        self._caches.setdefault(entity, []).append(cache)
+        # Without a listener nothing would evict what other workers change
+        cache.suspended = not self.listening
+
+    @staticmethod
+    def _payload(entity: str, entity_id=None, version=None) -> str:
+        return json.dumps({"entity": entity, "id": entity_id, "version": version})
+
+    async def publish(self, db, entity: str, entity_id=None, version=None):
+        """Queue an invalidation in the caller's transaction (AsyncSession)"""
+        await db.execute(_NOTIFY, {"channel": self.channel, "payload": self._payload(entity, entity_id, version)})
+
+    def publish_sync(self, db, entity: str, entity_id=None, version=None):
+        """Same as publish() for sync sessions used by scripts"""
+        db.execute(_NOTIFY, {"channel": self.channel, "payload": self._payload(entity, entity_id, version)})
+
+    def apply(self, entity: str, entity_id=None):
+        """Evict locally: one key, a whole entity (id None) or everything (entity "*")"""
+        if entity == "*":
+            self.flush_all("wildcard invalidation")
+            return
+        for cache in self._caches.get(entity, []):
+            if entity_id is None:
+                cache.clear()
+            else:
+                cache.evict(entity_id)
+        metrics.inc(f"invalidation.{entity}.received")
+
+    def flush_all(self, reason: str):
+        for caches in self._caches.values():
+            for cache in caches:
+                cache.clear()
+        metrics.inc("invalidation.full_flushes")
+        logger.info(f"Flushed all local caches: {reason}")
+
+    def _suspend(self, suspended: bool):
+        for caches in self._caches.values():
+            for cache in caches:
+                cache.suspended = suspended
+
+    def _on_notify(self, connection, pid, channel, payload):
+        try:
+            message = json.loads(payload)
+            self.apply(message["entity"], message.get("id"))
+        except Exception as e:
+            # A message we cannot read may have been meant for us
+            logger.error(f"Bad invalidation payload {payload!r}: {e}")
+            self.flush_all("unreadable invalidation")
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self._suspend(True)
+        self._task = asyncio.create_task(self._run(), name="invalidation-listener")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self.listening = False
+
+    async def _run(self):
+        # Imported here: only workers running the listener need the raw driver API
+        import asyncpg
+
+        dsn = make_url(settings.database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        delay = 1.0
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(dsn)
+                lost = asyncio.Event()
+                conn.add_termination_listener(lambda _: lost.set())
+                await conn.add_listener(self.channel, self._on_notify)
+                # Anything published while we were not listening is gone
+                self.flush_all("listener connected")
+                self._suspend(False)
+                self.listening = True
+                delay = 1.0
+                while not lost.is_set():
+                    try:
+                        await asyncio.wait_for(lost.wait(), timeout=self.keepalive_seconds)
+                    except asyncio.TimeoutError:
+                        # Surface half-open connections that never report termination
+                        await asyncio.wait_for(conn.fetchval("SELECT 1"), timeout=self.keepalive_seconds)
+                logger.warning("Invalidation listener connection lost")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Invalidation listener error: {e}")
+            finally:
+                self.listening = False
+                self._suspend(True)
+                if conn is not None and not conn.is_closed():
+                    conn.terminate()
+            metrics.inc("invalidation.reconnects")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+
+invalidation_bus = InvalidationBus()
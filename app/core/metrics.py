@@ -0,0 +1,33 @@
+from collections import defaultdict
+from typing import Dict
+
+
+class Metrics:
+    """In-process counters and gauges, exposed through GET /metrics.
+
+    Values are per worker process; aggregate across workers when scraping.
+    """
+
+    def __init__(self):
+        self._counters: Dict[str, float] = defaultdict(int)
+        self._gauges: Dict[str, float] = {}
+
+    def inc(self, name: str, value: float = 1):
+        self._counters[name] += value
+
+    def set(self, name: str, value: float):
+        self._gauges[name] = value
+
+    def get(self, name: str) -> float:
+        if name in self._gauges:
+            return self._gauges[name]
+        return self._counters.get(name, 0)
+
+    def snapshot(self) -> dict:
+        return {
+            "counters": dict(sorted(self._counters.items())),
+            "gauges": dict(sorted(self._gauges.items()))
+        }
+
+
+metrics = Metrics()
@@ -0,0 +1,122 @@
+"""
+Monthly range partitions of the submissions table.
+
+Sync helpers taking a SQLAlchemy Connection, shared by the maintenance
+script, compaction and the API startup (through run_sync). Migrations keep
+their own copies of what they need, so they do not change with this module.
+"""
+from sqlalchemy import text
+from datetime import date, datetime, timezone
+from typing import List, NamedTuple, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "submissions"
+# Serialises partition DDL between workers starting at the same time
+ADVISORY_LOCK_KEY = 7316021
+
+
+class Partition(NamedTuple):
+    name: str
+    start: date
+    end: date
+
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    month = value.month - 1 + months
+    return date(value.year + month // 12, month % 12 + 1, 1)
+
+
+def partition_name(start: date) -> str:
+    return f"{PARENT_TABLE}_y{start.year:04d}m{start.month:02d}"
+
+
+def create_month_partition(conn, start: date):
+    end = add_months(start, 1)
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(start)} "
+        f"PARTITION OF {PARENT_TABLE} "
+        f"FOR VALUES FROM ('{start.isoformat()} 00:00:00+00') TO ('{end.isoformat()} 00:00:00+00')"
+    ))
+
+
+def ensure_partitions(conn, months_ahead: int = 3, since: Optional[date] = None) -> List[str]:
+    """Create monthly partitions from `since` (default: this month) to `months_ahead` ahead.
+
+    There is no DEFAULT partition: a row outside every month fails its insert,
+    so these must exist before the month starts. When none are missing
+    (every worker start but the first in a month) nothing is locked.
+    """
+    current = month_start(datetime.now(timezone.utc))
+    first = month_start(since) if since else current
+    last = add_months(current, months_ahead)
+
+    def missing() -> List[date]:
+        existing = {partition.name for partition in list_partitions(conn)}
+        months = []
+        start = first
+        while start <= last:
+            if partition_name(start) not in existing:
+                months.append(start)
+            start = add_months(start, 1)
+        return months
+
+    if not missing():
+        return []
+    conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+    created = []
+    for start in missing():
+        create_month_partition(conn, start)
+        created.append(partition_name(start))
+    if created:
+        logger.info(f"Created submission partitions: {', '.join(created)}")
+    return created
+
+
+def list_partitions(conn) -> List[Partition]:
+    conn.execute(text("SET LOCAL TIME ZONE 'UTC'"))
+    rows = conn.execute(text("""
+        SELECT child.relname AS name,
+               pg_get_expr(child.relpartbound, child.oid) AS bound
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = :parent
+        ORDER BY child.relname
+    """), {"parent": PARENT_TABLE}).all()
+
+    partitions = []
+    for row in rows:
+        # FOR VALUES FROM ('2026-10-01 00:00:00+00') TO ('2026-11-01 00:00:00+00'),
+        # rendered in the session time zone, hence SET LOCAL TIME ZONE above
+        bounds = row.bound.split("'")
+        partitions.append(Partition(
+            row.name,
+            date.fromisoformat(bounds[1][:10]),
+            date.fromisoformat(bounds[3][:10])
+        ))
+    return partitions
+
+
+def detach_partitions(conn, names: List[str], archive_schema: Optional[str] = None,
+                      drop: bool = False):
+    """Detach the named partitions of submissions.
+
+    Detached partitions are moved to `archive_schema` when given, dropped when
+    `drop` is set, and otherwise left in place as standalone tables. Their rows
+    leave every query on submissions: fold them into summaries first
+    (app/services/submission_compaction.py, which calls this).
+    """
+    if archive_schema and names:
+        conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {archive_schema}"))
+    for name in names:
+        conn.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+        if drop:
+            conn.execute(text(f"DROP TABLE {name}"))
+        elif archive_schema:
+            conn.execute(text(f"ALTER TABLE {name} SET SCHEMA {archive_schema}"))
@@ -0,0 +1,101 @@
+"""
+Sampling CPU profiler for the event-loop thread.
+
+SIGPROF fires every `interval` seconds of process CPU time and its handler,
+which Python runs on the main thread (the one uvicorn runs the event loop
+on), records the interrupted stack. A coroutine's frames are linked to the
+frames of the coroutines awaiting it while it runs, so stacks run from the
+event loop through Task steps and every awaiting coroutine down to the
+code that was on the CPU, each frame labelled with its current line: the
+call site, or the await point a coroutine resumed from. Code SQLAlchemy
+runs in its greenlets is followed up into the awaiting coroutines.
+
+No samples are taken while the loop waits in select(), so a profile shows
+where CPU went, not wall time. CPU used by other threads (asyncio.to_thread,
+the driver's own threads) is charged to whatever the main thread is running.
+"""
+from collections import Counter
+from typing import Dict, Optional, Tuple
+import marshal
+import signal
+import threading
+
+from greenlet import getcurrent
+
+# (filename, first line, qualified name, module, current line)
+FrameKey = Tuple[str, int, str, str, int]
+
+
+def _stack(frame) -> Tuple[FrameKey, ...]:
+    stack = []
+    current = getcurrent()
+    while True:
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_filename, code.co_firstlineno, code.co_qualname,
+                          frame.f_globals.get("__name__", "?"), frame.f_lineno))
+            frame = frame.f_back
+        # The stack of a greenlet ends at its entry point; its parent is suspended
+        # in the switch() into it, below the coroutines that awaited it
+        current = current.parent
+        if current is None:
+            break
+        frame = current.gr_frame
+    stack.reverse()
+    return tuple(stack)
+
+
+class SamplingProfiler:
+    """Counts the main thread's stacks every `interval` seconds of CPU time"""
+
+    _running: Optional["SamplingProfiler"] = None
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._previous_handler = None
+
+    def _sample(self, signum, frame):
+        self.samples[_stack(frame)] += 1
+
+    def start(self):
+        if threading.current_thread() is not threading.main_thread():
+            raise RuntimeError("Profiling needs the event loop on the main thread")
+        if SamplingProfiler._running is not None:
+            raise RuntimeError("A profile is already running")
+        SamplingProfiler._running = self
+        self._previous_handler = signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, self._previous_handler or signal.SIG_DFL)
+        SamplingProfiler._running = None
+
+    def collapsed(self) -> str:
+        """Stacks in the collapsed format of flamegraph.pl and speedscope, one per line"""
+        lines = []
+        for stack, count in self.samples.most_common():
+            frames = ";".join(f"{module}.{name}:{line}" for _, _, name, module, line in stack)
+            lines.append(f"{frames} {count}")
+        return "\n".join(lines) + "\n"
+
+    def pstats(self) -> bytes:
+        """Samples as a marshalled stats file, readable with pstats.Stats(path)"""
+        weight = self.interval
+        stats: Dict[tuple, list] = {}
+        callers: Dict[tuple, Counter] = {}
+        for stack, count in self.samples.items():
+            functions = [(filename, first_line, name) for filename, first_line, name, _, _ in stack]
+            for function in set(functions):
+                entry = stats.setdefault(function, [0, 0, 0.0, 0.0])
+                entry[0] += count
+                entry[1] += count
+                entry[3] += count * weight
+            stats[functions[-1]][2] += count * weight
+            for caller, callee in set(zip(functions, functions[1:])):
+                callers.setdefault(callee, Counter())[caller] += count
+        return marshal.dumps({
+            function: (cc, nc, tt, ct, dict(callers.get(function, {})))
+            for function, (cc, nc, tt, ct) in stats.items()
+        })
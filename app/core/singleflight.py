@@ -0,0 +1,58 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable
+import asyncio
+import logging
+
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one in-flight call.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is running await the leader's result instead of repeating
+    the work. If the leader is cancelled, waiting callers are not: one of them
+    retries and becomes the new leader. A cancelled follower only stops waiting.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        while True:
+            future = self._inflight.get(key)
+            if future is None:
+                break
+            metrics.inc(f"singleflight.{self.name}.coalesced")
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if future.cancelled():
+                    # The leader went away; retry, possibly as the new leader
+                    continue
+                raise
+
+        future = asyncio.get_running_loop().create_future()
+        # Nobody may be waiting; mark failures as retrieved to avoid noisy logs
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        metrics.inc(f"singleflight.{self.name}.leaders")
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
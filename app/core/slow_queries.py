@@ -0,0 +1,267 @@
+"""
+Slow-statement log.
+
+Cursor-execute hooks on the engine time every statement. Those over the
+threshold are written as one JSON line each to a rotating file, with the
+shape of their parameters (types and list lengths, never values), the
+innermost service or route function that issued them and the request
+route. A random sample is re-run with EXPLAIN on a dedicated connection
+outside the pool, at most one at a time and a capped number per minute,
+and the plan is added to the line: EXPLAIN (ANALYZE, BUFFERS) inside a
+read-only transaction for reads, plain EXPLAIN for writes, which ANALYZE
+would execute again.
+
+Statements sent on raw driver connections (the single-submission fast path)
+bypass the engine hooks and are not timed.
+"""
+from collections import deque
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+from typing import Deque, Optional, Sequence
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime, timezone
+
+from greenlet import getcurrent
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Functions in these packages are reported as the caller of a statement
+CALLER_PACKAGES = ("app.services", "app.routes")
+MAX_STATEMENT_CHARS = 4000
+
+_request_scope: ContextVar[Optional[dict]] = ContextVar("slow_query_scope", default=None)
+
+_READ = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+_WRITE = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE)\b|\bFOR\s+(UPDATE|SHARE|NO KEY UPDATE|KEY SHARE)\b",
+                    re.IGNORECASE)
+
+
+def _value_shape(value) -> str:
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def parameter_shape(parameters, executemany: bool = False):
+    """Types of the bound parameters, without their values"""
+    if executemany:
+        rows = list(parameters)
+        return {"rows": len(rows), "shape": parameter_shape(rows[0]) if rows else None}
+    if parameters is None:
+        return None
+    if isinstance(parameters, dict):
+        return {name: _value_shape(value) for name, value in parameters.items()}
+    return [_value_shape(value) for value in parameters]
+
+
+def _frames():
+    """Frames of the current call chain, innermost first"""
+    frame = sys._getframe(1)
+    current = getcurrent()
+    while True:
+        while frame is not None:
+            yield frame
+            frame = frame.f_back
+        # SQLAlchemy runs the sync hooks in a greenlet whose stack ends at its
+        # own entry point; the awaiting coroutines are on its parent's stack
+        current = current.parent
+        if current is None:
+            return
+        frame = current.gr_frame
+
+
+def calling_function(packages: Sequence[str] = CALLER_PACKAGES) -> Optional[str]:
+    """Innermost function in `packages` on the current call chain, as module.qualname"""
+    for frame in _frames():
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith(tuple(packages)):
+            return f"{module}.{frame.f_code.co_qualname}"
+    return None
+
+
+def current_route() -> Optional[str]:
+    scope = _request_scope.get()
+    if scope is None:
+        return None
+    # The router adds the endpoint to the same scope dict once it has matched
+    endpoint = scope.get("endpoint")
+    name = f" ({endpoint.__module__}.{endpoint.__name__})" if endpoint is not None else ""
+    return f"{scope['method']} {scope['path']}{name}"
+
+
+class QueryContextMiddleware:
+    """ASGI middleware making the request visible to the slow-statement hook"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _request_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_scope.reset(token)
+
+
+class SlowQueryLog:
+    """Times statements of the engines it is installed on and logs the slow ones"""
+
+    def __init__(
+        self,
+        threshold_ms: float,
+        path: str,
+        max_bytes: int,
+        backups: int,
+        sample_rate: float,
+        explain_per_minute: int,
+        explain_timeout_ms: int,
+        dsn: Optional[str] = None
+    ):
+        self.threshold = threshold_ms / 1000
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.sample_rate = sample_rate
+        self.explain_per_minute = explain_per_minute
+        self.explain_timeout_ms = explain_timeout_ms
+        self.dsn = dsn
+        self._handler: Optional[RotatingFileHandler] = None
+        self._explained: Deque[float] = deque()
+        self._explaining = False
+        self._connection = None
+        self._tasks = set()
+
+    @classmethod
+    def from_settings(cls) -> "SlowQueryLog":
+        return cls(
+            threshold_ms=settings.slow_query_threshold_ms,
+            path=settings.slow_query_log_path,
+            max_bytes=settings.slow_query_log_max_bytes,
+            backups=settings.slow_query_log_backups,
+            sample_rate=settings.slow_query_explain_sample_rate,
+            explain_per_minute=settings.slow_query_explain_per_minute,
+            explain_timeout_ms=settings.slow_query_explain_timeout_ms,
+            dsn=make_url(settings.database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        )
+
+    def install(self, engine):
+        sync_engine = getattr(engine, "sync_engine", engine)
+        event.listen(sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        context._slow_query_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._slow_query_started
+        if elapsed < self.threshold:
+            return
+        try:
+            self.record(statement, parameters, elapsed, executemany)
+        except Exception as e:
+            # Never fail the query because it could not be logged
+            logger.error(f"Could not record slow statement: {e}")
+
+    def record(self, statement: str, parameters, seconds: float, executemany: bool = False):
+        entry = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round(seconds * 1000, 1),
+            "statement": statement[:MAX_STATEMENT_CHARS],
+            "parameters": parameter_shape(parameters, executemany),
+            "caller": calling_function(),
+            "route": current_route(),
+        }
+        metrics.inc("sql.slow")
+        logger.warning(f"Slow statement ({entry['duration_ms']:.0f}ms) from {entry['caller']} in {entry['route']}")
+
+        # The asyncpg dialect binds positionally ($1, $2, ...), as EXPLAIN needs
+        positional = isinstance(parameters, (list, tuple))
+        if not executemany and positional and self._take_explain_slot():
+            loop = asyncio.get_running_loop()
+            task = loop.create_task(self._explain_and_write(entry, statement, tuple(parameters)))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            return
+        self.write(entry)
+
+    def _take_explain_slot(self) -> bool:
+        """Sample, then allow one EXPLAIN at a time and explain_per_minute per minute"""
+        if self.dsn is None or self._explaining or random.random() >= self.sample_rate:
+            return False
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+        now = time.monotonic()
+        while self._explained and now - self._explained[0] > 60:
+            self._explained.popleft()
+        if len(self._explained) >= self.explain_per_minute:
+            metrics.inc("sql.slow.explain_skipped")
+            return False
+        self._explained.append(now)
+        self._explaining = True
+        return True
+
+    async def _explain_and_write(self, entry: dict, statement: str, parameters: tuple):
+        try:
+            entry["plan"] = await self.explain(statement, parameters)
+            metrics.inc("sql.slow.explained")
+        except Exception as e:
+            entry["plan_error"] = str(e)
+            if self._connection is not None and self._connection.is_closed():
+                self._connection = None
+        finally:
+            self._explaining = False
+        self.write(entry)
+
+    async def explain(self, statement: str, parameters: tuple):
+        # Imported here: only workers that explain a statement need the raw driver API
+        import asyncpg
+
+        if self._connection is None:
+            self._connection = await asyncpg.connect(self.dsn)
+        read = bool(_READ.match(statement)) and not _WRITE.search(statement)
+        options = "ANALYZE, BUFFERS, FORMAT JSON" if read else "FORMAT JSON"
+        async with self._connection.transaction(readonly=read):
+            await self._connection.execute(f"SET LOCAL statement_timeout = {int(self.explain_timeout_ms)}")
+            plan = await self._connection.fetchval(f"EXPLAIN ({options}) {statement}", *parameters)
+        return json.loads(plan) if isinstance(plan, str) else plan
+
+    def write(self, entry: dict):
+        if self._handler is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._handler = RotatingFileHandler(self.path, maxBytes=self.max_bytes, backupCount=self.backups)
+            self._handler.setFormatter(logging.Formatter("%(message)s"))
+        self._handler.emit(logging.makeLogRecord({"msg": json.dumps(entry, default=str)}))
+
+    async def stop(self):
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._connection is not None and not self._connection.is_closed():
+            await self._connection.close()
+        self._connection = None
+        if self._handler is not None:
+            self._handler.close()
+            self._handler = None
+
+
+slow_query_log = SlowQueryLog.from_settings()
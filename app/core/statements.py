@@ -0,0 +1,74 @@
+"""
+Hot-path statements built once at import and prepared on every new connection.
+
+Services define their per-request statements at module level with
+bindparam() and pass the values to execute(). SQLAlchemy memoizes the
+cache key of a statement object, so reusing the same object skips both the
+construction and the cache-key walk, and the compiled SQL comes straight
+from the engine's compiled cache. Statements registered with hot() are
+also prepared on each pool connection as it is opened, so the first
+request on a connection does not pay for the server round trip.
+"""
+from sqlalchemy import event
+from sqlalchemy.engine.default import DefaultExecutionContext
+from typing import List
+import logging
+
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+_hot_statements: List = []
+
+
+def hot(stmt):
+    """Register a statement to be prepared on every new connection; returns it.
+
+    Only statements without expanding (IN list) parameters can be prepared
+    ahead of time: their SQL text depends on the number of values.
+    """
+    _hot_statements.append(stmt)
+    return stmt
+
+
+def _prepare_hot_statements(dialect, dbapi_connection):
+    # SQLAlchemy's asyncpg adapter keeps its own per-connection LRU of
+    # prepared statements keyed by SQL text; filling it here is what makes
+    # later executions skip the Parse round trip. There is no public API for
+    # it: _prepare and _invalidate_schema_cache_asof are private to the
+    # pinned SQLAlchemy, and TestPrepareOnConnect fails when they change.
+    prepare = getattr(dbapi_connection, "_prepare", None)
+    if prepare is None:
+        return
+    for stmt in _hot_statements:
+        sql = stmt.compile(dialect=dialect).string
+        try:
+            dbapi_connection.await_(prepare(sql, dialect._invalidate_schema_cache_asof))
+            metrics.inc("sql.prepared_on_connect")
+        except Exception as e:
+            logger.warning(f"Could not prepare hot statement: {e}")
+
+
+def _count_compile_cache(conn, cursor, statement, parameters, context, executemany):
+    if not isinstance(context, DefaultExecutionContext) or context.compiled is None:
+        return
+    if context.cache_hit == context.dialect.CACHE_HIT:
+        metrics.inc("sql.compile_cache.hits")
+    elif context.cache_hit == context.dialect.CACHE_MISS:
+        metrics.inc("sql.compile_cache.misses")
+    else:
+        metrics.inc("sql.compile_cache.uncached")
+    hits = metrics.get("sql.compile_cache.hits")
+    total = hits + metrics.get("sql.compile_cache.misses") + metrics.get("sql.compile_cache.uncached")
+    metrics.set("sql.compile_cache.hit_rate", round(hits / total, 4))
+
+
+def install(engine, prepare: bool = True):
+    """Hook compile-cache metrics (and hot statement preparation) into an engine"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _count_compile_cache)
+    if prepare:
+        event.listen(
+            sync_engine, "connect",
+            lambda dbapi_connection, record: _prepare_hot_statements(sync_engine.dialect, dbapi_connection)
+        )
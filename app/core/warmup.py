@@ -0,0 +1,87 @@
+from fastapi import FastAPI
+from sqlalchemy import text
+import asyncio
+import logging
+import time
+
+from app.core.config import settings
+from app.core.database import engine, AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Matches no stored attempt or problem, so the submission reads find nothing
+WARMUP_ATTEMPT_ID = "warmup"
+WARMUP_PROBLEM_ID = 0
+
+
+async def warm_up_pool(connections: int):
+    """Open `connections` pool connections at once so they stay in the pool"""
+    connections = min(connections, settings.db_pool_size)
+    opened = await asyncio.gather(
+        *(engine.connect() for _ in range(connections)), return_exceptions=True
+    )
+    errors = [conn for conn in opened if isinstance(conn, BaseException)]
+    for conn in opened:
+        if not isinstance(conn, BaseException):
+            await conn.execute(text("SELECT 1"))
+            await conn.close()
+    if errors:
+        raise errors[0]
+
+
+async def warm_up_queries():
+    """Run each hot service query once so its SQL is compiled and cached"""
+    # Imported here: services pull in every model and schema
+    from app.services import LessonService, UserService, SubmissionService
+
+    user_id = settings.demo_user_id
+    async with AsyncSessionLocal() as db:
+        await LessonService.get_lessons_version(db, user_id)
+        lessons = await LessonService.get_lessons_with_progress(db, user_id)
+        profile = await UserService.get_user_profile(db, user_id)
+        if lessons and profile:
+            lesson_id = lessons[0].id
+            await LessonService.get_lesson_detail(db, lesson_id)
+            await LessonService.get_lesson_details(db, [lesson_id])
+            # Progress queries of the submission path; never flushed or committed
+            with db.no_autoflush:
+                await SubmissionService._update_lesson_progress(db, user_id, lesson_id)
+            await warm_up_submission_reads(db, user_id, lesson_id)
+        await db.rollback()
+
+
+async def warm_up_submission_reads(db, user_id: int, lesson_id: int):
+    """Run the reads of both submission paths for an attempt that does not exist.
+
+    The writes (answer stats, submission and idempotency inserts) are left
+    out: a warmup must not leave rows behind, and their statements are
+    prepared on connect through hot() all the same.
+    """
+    from app.services import IdempotencyService
+    from app.services.submission_service import existing_attempt_query, PROBLEM_IN_LESSON, OPTION_BY_ID
+    from app.services.submission_writer import USER_STATE
+
+    await IdempotencyService.get_response(db, user_id, WARMUP_ATTEMPT_ID, WARMUP_PROBLEM_ID)
+    # The batch path looks the attempt up without a problem, the single one
+    # with it; a new attempt misses the window and reads the older partitions
+    for problem_id in (None, WARMUP_PROBLEM_ID):
+        for before_window in (False, True):
+            stmt, params = existing_attempt_query(user_id, WARMUP_ATTEMPT_ID, problem_id, before_window)
+            await db.execute(stmt, params)
+    await db.execute(PROBLEM_IN_LESSON, {"problem_id": WARMUP_PROBLEM_ID, "lesson_id": lesson_id})
+    await db.execute(OPTION_BY_ID, {"option_id": WARMUP_PROBLEM_ID})
+    await db.execute(USER_STATE, {"user_id": user_id})
+
+
+async def warm_up(app: FastAPI):
+    started = time.perf_counter()
+    try:
+        await warm_up_pool(settings.warmup_connections)
+        await warm_up_queries()
+        # Builds the OpenAPI document and every Pydantic JSON schema it needs
+        app.openapi()
+    except Exception as e:
+        # Do not hold the worker out of rotation because of a DB blip at deploy
+        logger.error(f"Warmup failed, serving cold: {e}")
+    else:
+        logger.info(f"Warmup finished in {(time.perf_counter() - started) * 1000:.0f}ms")
@@ -1,22 +1,106 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 import logging
 
+from app.core.admission import AdmissionController, AdmissionMiddleware, RouteClass
 from app.core.config import settings
-from app.routes import lessons_router, submissions_router, users_router, health_router
+from app.core.database import engine
+from app.core.deadline import DeadlineExceeded, DeadlineMiddleware, error_body
+from app.core.invalidation import invalidation_bus
+from app.core.partitions import ensure_partitions
+from app.core.slow_queries import QueryContextMiddleware, slow_query_log
+from app.core.warmup import warm_up
+from app.routes import (
+    lessons_router, submissions_router, users_router, health_router, problems_router, debug_router
+)
+from app.services.idempotency_service import idempotency_sweeper
+from app.services.progress_recomputer import progress_recomputer
+from app.services.submission_writer import submission_writer
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.ready = False
+    try:
+        # Keep monthly submission partitions created ahead of time
+        async with engine.begin() as conn:
+            await conn.run_sync(ensure_partitions, settings.submission_partitions_months_ahead)
+    except Exception as e:
+        logger.error(f"Could not ensure submission partitions: {e}")
+    if settings.invalidation_enabled:
+        await invalidation_bus.start()
+    if settings.warmup_enabled:
+        await warm_up(app)
+    if settings.write_behind_enabled:
+        await submission_writer.start()
+    await idempotency_sweeper.start()
+    if settings.progress_recompute_enabled:
+        await progress_recomputer.start()
+    app.state.ready = True
+    yield
+    app.state.ready = False
+    # Flush queued submissions before the worker exits
+    await submission_writer.stop()
+    # Then recompute the progress still waiting
+    await progress_recomputer.stop()
+    await idempotency_sweeper.stop()
+    await invalidation_bus.stop()
+    await slow_query_log.stop()
+    await engine.dispose()
+
+
 # Create FastAPI app
 app = FastAPI(
     title=settings.api_title,
     description=settings.api_description,
-    version=settings.api_version
+    version=settings.api_version,
+    lifespan=lifespan
 )
 
-# Add CORS middleware
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded):
+    return JSONResponse(status_code=exc.status_code, content=error_body(exc.detail))
+
+
+# Budget starts once a request is admitted, so it is added before admission control
+if settings.deadline_enabled:
+    app.add_middleware(
+        DeadlineMiddleware,
+        budgets={
+            "submission": settings.deadline_submission_ms / 1000,
+            "catalog": settings.deadline_catalog_ms / 1000,
+            "default": settings.deadline_default_ms / 1000,
+        }
+    )
+
+# Shed load before it queues on pool checkout; submissions are served first
+if settings.admission_enabled:
+    app.add_middleware(
+        AdmissionMiddleware,
+        controller=AdmissionController(
+            [
+                RouteClass("submission", settings.admission_submission_limit, priority=0),
+                RouteClass("default", settings.admission_default_limit, priority=1),
+                RouteClass("catalog", settings.admission_catalog_limit, priority=2),
+            ],
+            max_in_flight=settings.admission_max_in_flight,
+            queue_size=settings.admission_queue_size,
+            max_wait_seconds=settings.admission_max_wait_ms / 1000
+        )
+    )
+
+# Outside the deadline middleware, whose handler task copies the request context
+if settings.slow_query_enabled:
+    app.add_middleware(QueryContextMiddleware)
+
+# Add CORS middleware (added last, so it wraps 503s from admission control too)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.allowed_origins,
@@ -30,6 +114,8 @@ app.include_router(health_router)
 app.include_router(lessons_router)
 app.include_router(submissions_router)
 app.include_router(users_router)
+app.include_router(problems_router)
+app.include_router(debug_router)
 
 
 if __name__ == "__main__":
@@ -3,7 +3,10 @@ from .user import User
 from .lesson import Lesson
 from .problem import Problem, ProblemOption
 from .submission import Submission
+from .submission_summary import SubmissionSummary
 from .user_progress import UserProgress
+from .problem_stats import ProblemStats, ProblemOptionStats
+from .idempotent_response import IdempotentResponse
 
 __all__ = [
     "BaseModel",
@@ -12,6 +15,10 @@ __all__ = [
     "Problem",
     "ProblemOption",
     "Submission",
-    "UserProgress"
+    "SubmissionSummary",
+    "UserProgress",
+    "ProblemStats",
+    "ProblemOptionStats",
+    "IdempotentResponse"
 ]
 
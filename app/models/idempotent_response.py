@@ -0,0 +1,23 @@
+from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, Index
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class IdempotentResponse(Base):
+    __tablename__ = "idempotent_responses"
+    
+    # Replay response of a submission, saved in the transaction that wrote it.
+    # problem_id is 0 for whole-lesson submissions; single answers are keyed
+    # per problem because an attempt may answer its problems one by one.
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    attempt_id = Column(String(100), primary_key=True)
+    problem_id = Column(Integer, primary_key=True)
+    response = Column(JSONB, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    
+    # Indexes
+    __table_args__ = (
+        # TTL sweeps delete the oldest rows first
+        Index('idx_idempotent_response_created', 'created_at'),
+    )
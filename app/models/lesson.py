@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Boolean, Text
+from sqlalchemy import BigInteger, Column, String, Integer, Boolean, Text, Index, UniqueConstraint, text
 from sqlalchemy.orm import relationship
 from .base import BaseModel
 
@@ -8,10 +8,20 @@ class Lesson(BaseModel):
     
     title = Column(String(200), nullable=False)
     description = Column(Text, nullable=True)
-    order_index = Column(Integer, nullable=False, index=True)
+    order_index = Column(Integer, nullable=False)
     is_active = Column(Boolean, default=True, nullable=False)
+    # Stable key of lessons managed by the content loader (app/services/content_loader.py)
+    external_key = Column(String(100), nullable=True)
+    # Bumped by a trigger on every UPDATE; the lessons listing ETag sums them
+    version = Column(BigInteger, server_default=text("1"), nullable=False)
     
     # Relationships
     problems = relationship("Problem", back_populates="lesson", cascade="all, delete-orphan")
     progress = relationship("UserProgress", back_populates="lesson")
-
+    
+    # Indexes
+    __table_args__ = (
+        # Only active lessons are ever listed
+        Index('idx_lesson_active_order', 'order_index', postgresql_where=text('is_active')),
+        UniqueConstraint('external_key', name='uq_lesson_external_key'),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, Text, Index, Boolean
+from sqlalchemy import Column, String, Integer, ForeignKey, Text, Index, Boolean, UniqueConstraint
 from sqlalchemy.orm import relationship
 from .base import BaseModel
 
@@ -11,6 +11,7 @@ class Problem(BaseModel):
     problem_type = Column(String(50), default="options", nullable=False)
     xp_value = Column(Integer, default=10, nullable=False)
     order_index = Column(Integer, nullable=False)
+    external_key = Column(String(100), nullable=True)  # see Lesson.external_key
     
     # Relationships
     lesson = relationship("Lesson", back_populates="problems")
@@ -20,6 +21,7 @@ class Problem(BaseModel):
     # Indexes
     __table_args__ = (
         Index('idx_problem_lesson_order', 'lesson_id', 'order_index'),
+        UniqueConstraint('external_key', name='uq_problem_external_key'),
     )
 
 
@@ -30,6 +32,7 @@ class ProblemOption(BaseModel):
     option_text = Column(Text, nullable=False)
     order_index = Column(Integer, nullable=False)
     is_correct = Column(Boolean, default=False)
+    external_key = Column(String(100), nullable=True)  # see Lesson.external_key
     
     # Relationships
     problem = relationship("Problem", back_populates="options")
@@ -38,5 +41,6 @@ class ProblemOption(BaseModel):
     # Indexes
     __table_args__ = (
         Index('idx_option_problem_order', 'problem_id', 'order_index'),
+        UniqueConstraint('external_key', name='uq_option_external_key'),
     )
 
@@ -0,0 +1,35 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Index
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class ProblemStats(Base):
+    __tablename__ = "problem_stats"
+    
+    problem_id = Column(Integer, ForeignKey("problems.id"), primary_key=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    correct = Column(Integer, default=0, nullable=False)
+    distinct_users = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Relationships
+    problem = relationship("Problem")
+
+
+class ProblemOptionStats(Base):
+    __tablename__ = "problem_option_stats"
+    
+    option_id = Column(Integer, ForeignKey("problem_options.id"), primary_key=True)
+    problem_id = Column(Integer, ForeignKey("problems.id"), nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    distinct_users = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Relationships
+    option = relationship("ProblemOption")
+    
+    # Indexes
+    __table_args__ = (
+        Index('idx_option_stats_problem', 'problem_id'),
+    )
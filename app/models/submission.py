@@ -7,14 +7,20 @@ from app.core.database import Base
 class Submission(Base):
     __tablename__ = "submissions"
     
-    id = Column(Integer, primary_key=True, index=True)
+    # The table is range-partitioned by month on submitted_at (see app/core/partitions.py),
+    # so the partition key is part of the primary key
+    id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     problem_id = Column(Integer, ForeignKey("problems.id"), nullable=False)
+    # Copy of problems.lesson_id so lesson-scoped queries need no join to problems;
+    # moving a problem to another lesson must update its submissions too. No foreign
+    # key: problems.lesson_id already references lessons
+    lesson_id = Column(Integer, nullable=False)
     attempt_id = Column(String(100), nullable=False)  # For idempotence
     option_id = Column(Integer, ForeignKey("problem_options.id"), nullable=False)
     is_correct = Column(Boolean, nullable=False)
     xp_earned = Column(Integer, default=0, nullable=False)
-    submitted_at = Column(DateTime(timezone=True), server_default=func.now())
+    submitted_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now(), nullable=False)
     
     # Relationships
     user = relationship("User", back_populates="submissions")
@@ -25,7 +31,8 @@ class Submission(Base):
     __table_args__ = (
         Index('idx_submission_user_attempt', 'user_id', 'attempt_id'),
         Index('idx_submission_user_problem', 'user_id', 'problem_id'),
-        Index('idx_submission_attempt_problem', 'attempt_id', 'problem_id'),
-        Index('idx_submission_problem_problem_problem_option', 'problem_id', 'option_id'),
+        # Lesson progress: index-only count of a user's correctly solved problems in a lesson
+        Index('idx_submission_user_lesson_correct', 'user_id', 'lesson_id', 'is_correct', 'problem_id'),
+        {'postgresql_partition_by': 'RANGE (submitted_at)'},
     )
 
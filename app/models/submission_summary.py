@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Index
+from sqlalchemy.dialects.postgresql import ARRAY
+from app.core.database import Base
+
+
+class SubmissionSummary(Base):
+    __tablename__ = "submission_summaries"
+    
+    # Submissions older than the compaction cutoff, folded per user and problem
+    # (see app/services/submission_compaction.py). Reads that need a user's
+    # whole history combine this table with the remaining submissions rows.
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    problem_id = Column(Integer, ForeignKey("problems.id"), primary_key=True)
+    # Same copy of problems.lesson_id as on submissions
+    lesson_id = Column(Integer, ForeignKey("lessons.id"), nullable=False)
+    attempts = Column(Integer, nullable=False)
+    first_correct_at = Column(DateTime(timezone=True), nullable=True)  # NULL: never solved
+    best_xp = Column(Integer, nullable=False)
+    # Options ever picked, so the distinct-user answer counters stay exact
+    option_ids = Column(ARRAY(Integer), nullable=False)
+    compacted_at = Column(DateTime(timezone=True), nullable=False)
+    
+    # Indexes
+    __table_args__ = (
+        Index('idx_summary_user_lesson', 'user_id', 'lesson_id'),
+    )
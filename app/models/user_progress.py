@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, Boolean, DateTime, Index
+from sqlalchemy import BigInteger, Column, Integer, ForeignKey, Boolean, DateTime, UniqueConstraint, text
 from sqlalchemy.orm import relationship
 from .base import BaseModel
 
@@ -12,6 +12,8 @@ class UserProgress(BaseModel):
     completion_percentage = Column(Integer, default=0, nullable=False)  # 0-100
     last_accessed_at = Column(DateTime(timezone=True), nullable=True)
     completed_at = Column(DateTime(timezone=True), nullable=True)
+    # Bumped by a trigger on every UPDATE; the lessons listing ETag sums them
+    version = Column(BigInteger, server_default=text("1"), nullable=False)
     
     # Relationships
     user = relationship("User", back_populates="progress")
@@ -19,6 +21,6 @@ class UserProgress(BaseModel):
     
     # Indexes
     __table_args__ = (
-        Index('idx_progress_user_lesson', 'user_id', 'lesson_id'),
+        UniqueConstraint('user_id', 'lesson_id', name='uq_progress_user_lesson'),
     )
 
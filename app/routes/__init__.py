@@ -2,11 +2,15 @@ from .lessons import router as lessons_router
 from .submissions import router as submissions_router
 from .users import router as users_router
 from .health import router as health_router
+from .problems import router as problems_router
+from .debug import router as debug_router
 
 __all__ = [
     "lessons_router",
     "submissions_router",
     "users_router", 
-    "health_router"
+    "health_router",
+    "problems_router",
+    "debug_router"
 ]
 
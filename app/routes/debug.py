@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse, Response
+from typing import Optional
+import asyncio
+import logging
+import secrets
+
+from app.core.config import settings
+from app.core.profiler import SamplingProfiler
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/debug", tags=["Debug"], include_in_schema=False)
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Without a configured token the admin routes (/debug, /metrics) do not exist"""
+    if not settings.debug_admin_token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token, settings.debug_admin_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin token required")
+
+
+@router.get("/profile", dependencies=[Depends(require_admin)])
+async def profile(
+    seconds: float = Query(10, gt=0, le=settings.debug_profile_max_seconds),
+    format: str = Query("collapsed", pattern="^(collapsed|pstats)$")
+):
+    """Sample this worker's CPU for `seconds` while it keeps serving traffic"""
+    profiler = SamplingProfiler(settings.debug_profile_interval_ms / 1000)
+    try:
+        profiler.start()
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.stop()
+    logger.info(f"Profiled {seconds:.1f}s: {sum(profiler.samples.values())} samples")
+
+    if format == "pstats":
+        return Response(
+            content=profiler.pstats(),
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": 'attachment; filename="profile.pstats"'}
+        )
+    return PlainTextResponse(profiler.collapsed())
@@ -1,5 +1,8 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, Request, status
+from fastapi.responses import JSONResponse
 from app.core.config import settings
+from app.core.metrics import metrics
+from app.routes.debug import require_admin
 
 router = APIRouter(tags=["Health"])
 
@@ -20,3 +23,19 @@ async def health_check():
         "version": settings.api_version
     }
 
+
+@router.get("/health/ready")
+async def readiness_check(request: Request):
+    """Ready only once startup warmup is done, so rolling restarts stay warm"""
+    if not getattr(request.app.state, "ready", False):
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "starting", "version": settings.api_version}
+        )
+    return {"status": "ready", "version": settings.api_version}
+
+
+# Counters name routes, statements and queue depths: admins only, as /debug
+@router.get("/metrics", dependencies=[Depends(require_admin)])
+async def get_metrics():
+    return metrics.snapshot()
@@ -1,23 +1,60 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 import logging
 
 from app.core.database import get_async_db
 from app.core.config import settings
-from app.schemas import LessonWithProgressResponse, LessonDetailResponse
+from app.core.http_cache import make_etag, etag_matches
+from app.core.singleflight import SingleFlight
+from app.schemas import LessonWithProgressResponse, LessonDetailResponse, LessonBatchItem, LessonBatchResponse
 from app.services import LessonService
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/lessons", tags=["Lessons"])
 
+# Identical concurrent catalog reads share one in-flight query chain
+catalog_flight = SingleFlight("catalog")
+
+
+def lessons_cache_headers(version: tuple) -> dict:
+    return {
+        "ETag": make_etag("lessons", settings.api_version, settings.demo_user_id, version),
+        # Per-user body: never share it, always revalidate
+        "Cache-Control": "private, no-cache",
+        "Vary": "Authorization, Cookie"
+    }
+
+
+async def load_lessons(db: AsyncSession) -> tuple:
+    """Version and body of the lessons listing, read together in one flight.
+
+    The version is read first: a write landing in between makes the ETag
+    older than the body, which only costs the client one more full response.
+    """
+    version = await LessonService.get_lessons_version(db, user_id=settings.demo_user_id)
+    lessons = await LessonService.get_lessons_with_progress(db, user_id=settings.demo_user_id)
+    return version, lessons
+
 
 @router.get("/", response_model=List[LessonWithProgressResponse])
-async def get_lessons(db: AsyncSession = Depends(get_async_db)):
+async def get_lessons(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
     try:
-        lessons = await LessonService.get_lessons_with_progress(db, user_id=settings.demo_user_id)
+        version = await LessonService.get_lessons_version(db, user_id=settings.demo_user_id)
+        cache_headers = lessons_cache_headers(version)
+        if etag_matches(request.headers.get("if-none-match"), cache_headers["ETag"]):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+        
+        # A follower may get an older leader's body: tag it with that leader's version
+        version, lessons = await catalog_flight.do(
+            ("GET /api/lessons/", settings.demo_user_id),
+            lambda: load_lessons(db)
+        )
+        response.headers.update(lessons_cache_headers(version))
         return lessons
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting lessons: {e}")
         raise HTTPException(
@@ -26,10 +63,53 @@ async def get_lessons(db: AsyncSession = Depends(get_async_db)):
         )
 
 
+# Declared before /{lesson_id} so "batch" is not parsed as a lesson id
+@router.get("/batch", response_model=LessonBatchResponse)
+async def get_lessons_batch(
+    ids: str = Query(..., description="Comma-separated lesson ids, e.g. 1,2,3"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        lesson_ids = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="ids must be a comma-separated list of integers"
+        )
+    if not lesson_ids:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="At least one lesson id is required"
+        )
+    if len(lesson_ids) > settings.lesson_batch_max_ids:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"At most {settings.lesson_batch_max_ids} lesson ids per request"
+        )
+    
+    try:
+        lessons = await LessonService.get_lesson_details(db, lesson_ids)
+        return LessonBatchResponse(lessons=[
+            LessonBatchItem(id=lesson_id, found=lesson_id in lessons, lesson=lessons.get(lesson_id))
+            for lesson_id in lesson_ids
+        ])
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting lessons batch: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve lessons"
+        )
+
+
 @router.get("/{lesson_id}", response_model=LessonDetailResponse)
 async def get_lesson_detail(lesson_id: int, db: AsyncSession = Depends(get_async_db)):
     try:
-        lesson = await LessonService.get_lesson_detail(db, lesson_id)
+        lesson = await catalog_flight.do(
+            ("GET /api/lessons/{lesson_id}", lesson_id),
+            lambda: LessonService.get_lesson_detail(db, lesson_id)
+        )
         if not lesson:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
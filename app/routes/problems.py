@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+import logging
+
+from app.core.database import get_async_db
+from app.schemas import ProblemStatisticsResponse
+from app.services import ProblemStatsService
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/problems", tags=["Problems"])
+
+
+@router.get("/{problem_id}/statistics", response_model=ProblemStatisticsResponse)
+async def get_problem_statistics(problem_id: int, db: AsyncSession = Depends(get_async_db)):
+    try:
+        statistics = await ProblemStatsService.get_problem_statistics(db, problem_id)
+        if not statistics:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Problem with id {problem_id} not found"
+            )
+        return statistics
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting problem statistics: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve problem statistics"
+        )
@@ -3,16 +3,23 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 import logging
 
-from app.core.database import get_async_db
+from app.core.database import get_async_db, raw_connection
 from app.core.config import settings
+from app.core.singleflight import SingleFlight
 from app.models import Lesson
 from app.schemas import SubmissionRequest, SubmissionResponse, SingleSubmissionRequest
-from app.services import SubmissionService
+from app.services import SubmissionService, FastSubmissionService
+from app.services.submission_service import AttemptResponseMissing
+from app.services.submission_writer import submission_writer, SubmissionQueueFull
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/lessons", tags=["Submissions"])
 
+# Client retries of an attempt that is still being processed wait for the
+# first request instead of grading and writing it a second time
+submission_flight = SingleFlight("submission")
+
 
 @router.post("/{lesson_id}/submit", response_model=SubmissionResponse)
 async def submit_lesson(
@@ -32,13 +39,21 @@ async def submit_lesson(
             )
         
         # Process submission
-        result = await SubmissionService.process_submission(
-            db, user_id=settings.demo_user_id, lesson_id=lesson_id, submission=submission
+        result = await submission_flight.do(
+            (settings.demo_user_id, submission.attempt_id),
+            lambda: SubmissionService.process_submission(
+                db, user_id=settings.demo_user_id, lesson_id=lesson_id, submission=submission
+            )
         )
         return result
         
     except HTTPException:
         raise
+    except AttemptResponseMissing as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
@@ -58,6 +73,18 @@ async def single_submit_lesson(
     db: AsyncSession = Depends(get_async_db)
 ):
     try:
+        if settings.single_fast_path_enabled and not submission_writer.running:
+            async with raw_connection() as conn:
+                result = await FastSubmissionService.process_single_submission(
+                    conn, user_id=settings.demo_user_id, lesson_id=lesson_id, submission=submission
+                )
+            if result is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Lesson with id {lesson_id} not found"
+                )
+            return result
+        
         lesson_stmt = select(Lesson).where(Lesson.id == lesson_id)
         lesson_result = await db.execute(lesson_stmt)
         lesson = lesson_result.scalar_one_or_none()
@@ -68,13 +95,29 @@ async def single_submit_lesson(
                 detail=f"Lesson with id {lesson_id} not found"
             )
         
-        result = await SubmissionService.process_single_submission(
-            db, user_id=settings.demo_user_id, lesson_id=lesson_id, submission=submission
-        )
+        if submission_writer.running:
+            result = await submission_writer.submit_single(
+                db, user_id=settings.demo_user_id, lesson_id=lesson_id, submission=submission
+            )
+        else:
+            result = await SubmissionService.process_single_submission(
+                db, user_id=settings.demo_user_id, lesson_id=lesson_id, submission=submission
+            )
         return result
         
     except HTTPException:
         raise
+    except AttemptResponseMissing as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    except SubmissionQueueFull as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"}
+        )
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
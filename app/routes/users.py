@@ -4,6 +4,7 @@ import logging
 
 from app.core.database import get_async_db
 from app.core.config import settings
+from app.core.singleflight import SingleFlight
 from app.schemas import ProfileResponse
 from app.services import UserService
 
@@ -11,11 +12,16 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/profiles", tags=["Profile"])
 
+profile_flight = SingleFlight("profile")
+
 
 @router.get("/", response_model=ProfileResponse)
 async def get_profile(db: AsyncSession = Depends(get_async_db)):
     try:
-        profile = await UserService.get_user_profile(db, user_id=settings.demo_user_id)
+        profile = await profile_flight.do(
+            ("GET /api/profiles/", settings.demo_user_id),
+            lambda: UserService.get_user_profile(db, user_id=settings.demo_user_id)
+        )
         if not profile:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -1,14 +1,17 @@
-from .lesson import LessonResponse, LessonWithProgressResponse, LessonDetailResponse
+from .lesson import LessonResponse, LessonWithProgressResponse, LessonDetailResponse, LessonBatchItem, LessonBatchResponse
 from .problem import ProblemResponse, ProblemOptionResponse
 from .submission import SubmissionRequest, SubmissionResponse, SingleSubmissionRequest
 from .user import ProfileResponse
 from .user_progress import UserProgressResponse
 from .common import ErrorResponse
+from .problem_stats import ProblemStatisticsResponse, OptionStatisticsResponse
 
 __all__ = [
     "LessonResponse",
     "LessonWithProgressResponse", 
     "LessonDetailResponse",
+    "LessonBatchItem",
+    "LessonBatchResponse",
     "ProblemResponse",
     "ProblemOptionResponse",
     "SubmissionRequest",
@@ -16,6 +19,8 @@ __all__ = [
     "ProfileResponse",
     "UserProgressResponse",
     "ErrorResponse",
-    "SingleSubmissionRequest"
+    "SingleSubmissionRequest",
+    "ProblemStatisticsResponse",
+    "OptionStatisticsResponse"
 ]
 
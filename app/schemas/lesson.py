@@ -27,3 +27,13 @@ class LessonWithProgressResponse(LessonResponse):
 class LessonDetailResponse(LessonResponse):
     problems: List[ProblemResponse] = []
 
+
+
+class LessonBatchItem(BaseModel):
+    id: int
+    found: bool
+    lesson: Optional[LessonDetailResponse] = None
+
+
+class LessonBatchResponse(BaseModel):
+    lessons: List[LessonBatchItem]  # In request order, one item per requested id
@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+from typing import List
+
+
+class OptionStatisticsResponse(BaseModel):
+    option_id: int
+    option_text: str
+    order_index: int
+    is_correct: bool
+    attempts: int
+    distinct_users: int
+    pick_rate: float  # Share of the problem's attempts that picked this option
+
+
+class ProblemStatisticsResponse(BaseModel):
+    problem_id: int
+    attempts: int
+    correct: int
+    distinct_users: int
+    correct_rate: float
+    options: List[OptionStatisticsResponse] = []
@@ -1,10 +1,16 @@
 from .lesson_service import LessonService
 from .submission_service import SubmissionService
 from .user_service import UserService
+from .problem_stats_service import ProblemStatsService
+from .fast_submission import FastSubmissionService
+from .idempotency_service import IdempotencyService
 
 __all__ = [
     "LessonService",
     "SubmissionService", 
-    "UserService"
+    "UserService",
+    "ProblemStatsService",
+    "FastSubmissionService",
+    "IdempotencyService"
 ]
 
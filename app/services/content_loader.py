@@ -0,0 +1,343 @@
+"""
+Bulk loader for lessons, problems and options kept in JSON files.
+
+Each file holds {"lessons": [...]}, every lesson with its "problems" and
+every problem with its "options". Lessons and problems carry a stable
+"key"; options default to "<problem key>/<order_index>". A load copies
+all records into temporary staging tables (COPY, one round trip per table)
+and applies them with one set-based upsert per table, matched on
+external_key, that only writes rows whose values differ. Everything runs
+in one transaction, so readers see the old catalog or the new one, and a
+single "lesson" invalidation tells every worker to drop its catalog cache.
+
+Rows are never deleted: submissions reference problems and options. Keyed
+rows missing from the files are counted as stale; deactivate a lesson with
+"is_active": false instead.
+
+Rows created before the loader (scripts/seed_data.py) have no key, so a
+load would insert the same content next to them. A load refuses while a
+lesson in the files has an unkeyed lesson at its order_index, or a problem
+an unkeyed problem at its order_index in its lesson. With adopt=True those
+rows take the keys from the files instead, options matched by order_index
+within their problem, and are then updated like any keyed row.
+"""
+from sqlalchemy import text
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+import json
+import time
+
+from app.core.invalidation import invalidation_bus
+from app.core.metrics import metrics
+
+
+class LessonRecord(NamedTuple):
+    key: str
+    title: str
+    description: Optional[str]
+    order_index: int
+    is_active: bool
+
+
+class ProblemRecord(NamedTuple):
+    key: str
+    lesson_key: str
+    question: str
+    problem_type: str
+    xp_value: int
+    order_index: int
+
+
+class OptionRecord(NamedTuple):
+    key: str
+    problem_key: str
+    option_text: str
+    order_index: int
+    is_correct: bool
+
+
+class Content(NamedTuple):
+    lessons: List[LessonRecord]
+    problems: List[ProblemRecord]
+    options: List[OptionRecord]
+
+
+class LoadReport(NamedTuple):
+    lessons: int  # rows inserted or changed
+    problems: int
+    options: int
+    adopted: int  # unkeyed rows that took their key from the files
+    stale_problems: int  # keyed problems of loaded lessons missing from the files
+    lesson_ids: List[int]  # lessons whose detail changed
+    new_problem_lesson_ids: List[int]  # lessons that gained problems: their progress is stale
+    seconds: float
+
+
+def _field(item: dict, name: str, where: str):
+    if name not in item:
+        raise ValueError(f"{where}: missing \"{name}\"")
+    return item[name]
+
+
+def parse_content(documents: Sequence[dict], sources: Optional[Sequence[str]] = None) -> Content:
+    """Flatten parsed JSON documents into records, checking keys are unique"""
+    content = Content([], [], [])
+    seen: Dict[str, set] = {"lesson": set(), "problem": set(), "option": set()}
+
+    def unique(kind: str, key: str, where: str) -> str:
+        if not isinstance(key, str) or not key:
+            raise ValueError(f"{where}: \"key\" must be a non-empty string")
+        if key in seen[kind]:
+            raise ValueError(f"{where}: duplicate {kind} key {key!r}")
+        seen[kind].add(key)
+        return key
+
+    for number, document in enumerate(documents):
+        source = sources[number] if sources else f"document {number + 1}"
+        for lesson in _field(document, "lessons", source):
+            lesson_key = unique("lesson", _field(lesson, "key", source), source)
+            where = f"{source}, lesson {lesson_key}"
+            content.lessons.append(LessonRecord(
+                lesson_key,
+                _field(lesson, "title", where),
+                lesson.get("description"),
+                int(_field(lesson, "order_index", where)),
+                bool(lesson.get("is_active", True))
+            ))
+            for problem in lesson.get("problems", []):
+                problem_key = unique("problem", _field(problem, "key", where), where)
+                problem_where = f"{source}, problem {problem_key}"
+                content.problems.append(ProblemRecord(
+                    problem_key,
+                    lesson_key,
+                    _field(problem, "question", problem_where),
+                    problem.get("problem_type", "options"),
+                    int(problem.get("xp_value", 10)),
+                    int(_field(problem, "order_index", problem_where))
+                ))
+                for position, option in enumerate(_field(problem, "options", problem_where), start=1):
+                    order_index = int(option.get("order_index", position))
+                    content.options.append(OptionRecord(
+                        unique("option", option.get("key", f"{problem_key}/{order_index}"), problem_where),
+                        problem_key,
+                        _field(option, "option_text", problem_where),
+                        order_index,
+                        bool(option.get("is_correct", False))
+                    ))
+    return content
+
+
+def read_content(paths: Sequence[str]) -> Content:
+    documents = []
+    for path in paths:
+        with open(path) as f:
+            documents.append(json.load(f))
+    return parse_content(documents, paths)
+
+
+# Serialises concurrent loads (pg_advisory_xact_lock)
+ADVISORY_LOCK_KEY = 7300482
+
+STAGING_TABLES = [
+    "CREATE TEMP TABLE staging_lessons (key text, title text, description text, order_index int, "
+    "is_active bool) ON COMMIT DROP",
+    "CREATE TEMP TABLE staging_problems (key text, lesson_key text, question text, problem_type text, "
+    "xp_value int, order_index int) ON COMMIT DROP",
+    "CREATE TEMP TABLE staging_options (key text, problem_key text, option_text text, order_index int, "
+    "is_correct bool) ON COMMIT DROP",
+]
+
+# Problems are never moved: submissions and summaries keep a copy of lesson_id
+MOVED_PROBLEMS = text("""
+    SELECT s.key FROM staging_problems AS s
+    JOIN problems AS p ON p.external_key = s.key
+    JOIN lessons AS l ON l.id = p.lesson_id
+    WHERE l.external_key IS DISTINCT FROM s.lesson_key
+    ORDER BY s.key LIMIT 5
+""")
+
+# Unkeyed rows a load would otherwise duplicate
+ADOPTABLE = text("""
+    SELECT (SELECT count(*) FROM staging_lessons AS s
+            WHERE NOT EXISTS (SELECT 1 FROM lessons AS k WHERE k.external_key = s.key)
+              AND EXISTS (SELECT 1 FROM lessons AS l
+                          WHERE l.external_key IS NULL AND l.order_index = s.order_index))
+         + (SELECT count(*) FROM staging_problems AS s
+            JOIN lessons AS l ON l.external_key = s.lesson_key
+            WHERE NOT EXISTS (SELECT 1 FROM problems AS k WHERE k.external_key = s.key)
+              AND EXISTS (SELECT 1 FROM problems AS p
+                          WHERE p.lesson_id = l.id AND p.external_key IS NULL AND p.order_index = s.order_index))
+""")
+
+# Adoption only takes one-to-one matches; ambiguous ones stay ADOPTABLE and fail the load
+ADOPT_LESSONS = text("""
+    WITH candidates AS (
+        SELECT l.id, s.key,
+               count(*) OVER (PARTITION BY l.id) AS per_row,
+               count(*) OVER (PARTITION BY s.key) AS per_key
+        FROM staging_lessons AS s
+        JOIN lessons AS l ON l.external_key IS NULL AND l.order_index = s.order_index
+        WHERE NOT EXISTS (SELECT 1 FROM lessons AS k WHERE k.external_key = s.key)
+    )
+    UPDATE lessons SET external_key = candidates.key
+    FROM candidates
+    WHERE lessons.id = candidates.id AND per_row = 1 AND per_key = 1
+""")
+
+ADOPT_PROBLEMS = text("""
+    WITH candidates AS (
+        SELECT p.id, s.key,
+               count(*) OVER (PARTITION BY p.id) AS per_row,
+               count(*) OVER (PARTITION BY s.key) AS per_key
+        FROM staging_problems AS s
+        JOIN lessons AS l ON l.external_key = s.lesson_key
+        JOIN problems AS p ON p.lesson_id = l.id AND p.external_key IS NULL AND p.order_index = s.order_index
+        WHERE NOT EXISTS (SELECT 1 FROM problems AS k WHERE k.external_key = s.key)
+    )
+    UPDATE problems SET external_key = candidates.key
+    FROM candidates
+    WHERE problems.id = candidates.id AND per_row = 1 AND per_key = 1
+""")
+
+ADOPT_OPTIONS = text("""
+    WITH candidates AS (
+        SELECT o.id, s.key,
+               count(*) OVER (PARTITION BY o.id) AS per_row,
+               count(*) OVER (PARTITION BY s.key) AS per_key
+        FROM staging_options AS s
+        JOIN problems AS p ON p.external_key = s.problem_key
+        JOIN problem_options AS o ON o.problem_id = p.id AND o.external_key IS NULL AND o.order_index = s.order_index
+        WHERE NOT EXISTS (SELECT 1 FROM problem_options AS k WHERE k.external_key = s.key)
+    )
+    UPDATE problem_options SET external_key = candidates.key
+    FROM candidates
+    WHERE problem_options.id = candidates.id AND per_row = 1 AND per_key = 1
+""")
+
+UPSERT_LESSONS = text("""
+    INSERT INTO lessons (external_key, title, description, order_index, is_active)
+    SELECT key, title, description, order_index, is_active FROM staging_lessons
+    ON CONFLICT ON CONSTRAINT uq_lesson_external_key DO UPDATE SET
+        title = excluded.title,
+        description = excluded.description,
+        order_index = excluded.order_index,
+        is_active = excluded.is_active,
+        updated_at = now()
+    WHERE (lessons.title, lessons.description, lessons.order_index, lessons.is_active)
+          IS DISTINCT FROM (excluded.title, excluded.description, excluded.order_index, excluded.is_active)
+    RETURNING id
+""")
+
+# xmax = 0 marks rows this statement inserted rather than updated
+UPSERT_PROBLEMS = text("""
+    INSERT INTO problems (external_key, lesson_id, question, problem_type, xp_value, order_index)
+    SELECT s.key, l.id, s.question, s.problem_type, s.xp_value, s.order_index
+    FROM staging_problems AS s JOIN lessons AS l ON l.external_key = s.lesson_key
+    ON CONFLICT ON CONSTRAINT uq_problem_external_key DO UPDATE SET
+        question = excluded.question,
+        problem_type = excluded.problem_type,
+        xp_value = excluded.xp_value,
+        order_index = excluded.order_index,
+        updated_at = now()
+    WHERE (problems.question, problems.problem_type, problems.xp_value, problems.order_index)
+          IS DISTINCT FROM (excluded.question, excluded.problem_type, excluded.xp_value, excluded.order_index)
+    RETURNING lesson_id, xmax = 0 AS inserted
+""")
+
+UPSERT_OPTIONS = text("""
+    WITH upserted AS (
+        INSERT INTO problem_options (external_key, problem_id, option_text, order_index, is_correct)
+        SELECT s.key, p.id, s.option_text, s.order_index, s.is_correct
+        FROM staging_options AS s JOIN problems AS p ON p.external_key = s.problem_key
+        ON CONFLICT ON CONSTRAINT uq_option_external_key DO UPDATE SET
+            option_text = excluded.option_text,
+            order_index = excluded.order_index,
+            is_correct = excluded.is_correct,
+            updated_at = now()
+        WHERE (problem_options.option_text, problem_options.order_index, problem_options.is_correct)
+              IS DISTINCT FROM (excluded.option_text, excluded.order_index, excluded.is_correct)
+        RETURNING problem_id
+    )
+    SELECT count(*) AS changed, coalesce(array_agg(DISTINCT p.lesson_id), '{}') AS lesson_ids
+    FROM upserted JOIN problems AS p ON p.id = upserted.problem_id
+""")
+
+STALE_PROBLEMS = text("""
+    SELECT count(*) FROM problems AS p
+    JOIN lessons AS l ON l.id = p.lesson_id
+    WHERE l.external_key IN (SELECT key FROM staging_lessons)
+      AND p.external_key IS NOT NULL
+      AND p.external_key NOT IN (SELECT key FROM staging_problems)
+""")
+
+# Lesson listings are versioned by lessons.version, which every UPDATE bumps (LESSONS_VERSION)
+TOUCH_LESSONS = text("UPDATE lessons SET updated_at = now() WHERE id = ANY(:lesson_ids)")
+
+
+async def load_content(
+    engine,
+    content: Content,
+    report: Optional[Callable[[str], None]] = None,
+    adopt: bool = False
+) -> LoadReport:
+    """Apply `content` to the catalog in one transaction; returns what changed.
+
+    Raises ValueError, changing nothing, when problems would move between
+    lessons or the files match unkeyed rows that `adopt` does not take over.
+    """
+    started = time.perf_counter()
+    async with engine.begin() as conn:
+        await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+        for statement in STAGING_TABLES:
+            await conn.execute(text(statement))
+        # COPY runs on the same connection, inside the transaction begun above
+        driver = (await conn.get_raw_connection()).driver_connection
+        for table, records in (("staging_lessons", content.lessons),
+                               ("staging_problems", content.problems),
+                               ("staging_options", content.options)):
+            if records:
+                await driver.copy_records_to_table(table, records=records, columns=records[0]._fields)
+        await conn.execute(text("ANALYZE staging_lessons, staging_problems, staging_options"))
+        if report is not None:
+            report(f"Staged {len(content.lessons)} lessons, {len(content.problems)} problems, "
+                   f"{len(content.options)} options in {time.perf_counter() - started:.1f}s")
+
+        moved = (await conn.execute(MOVED_PROBLEMS)).scalars().all()
+        if moved:
+            raise ValueError(f"Problems cannot move to another lesson: {', '.join(moved)}")
+
+        adopted = 0
+        if adopt:
+            for statement in (ADOPT_LESSONS, ADOPT_PROBLEMS, ADOPT_OPTIONS):
+                adopted += (await conn.execute(statement)).rowcount
+        unkeyed = (await conn.execute(ADOPTABLE)).scalar()
+        if unkeyed:
+            if adopt:
+                raise ValueError(
+                    f"{unkeyed} lesson(s) or problem(s) in the files match several unkeyed rows "
+                    "at the same order_index; key those rows by hand")
+            raise ValueError(
+                f"{unkeyed} lesson(s) or problem(s) in the files match unkeyed rows at the same "
+                "order_index; load with adopt to give those rows the keys instead of duplicating them")
+
+        lesson_rows = (await conn.execute(UPSERT_LESSONS)).scalars().all()
+        problem_rows = (await conn.execute(UPSERT_PROBLEMS)).all()
+        options = (await conn.execute(UPSERT_OPTIONS)).one()
+        stale = (await conn.execute(STALE_PROBLEMS)).scalar()
+
+        lesson_ids = sorted(set(lesson_rows) | {row.lesson_id for row in problem_rows} | set(options.lesson_ids))
+        if lesson_ids:
+            await conn.execute(TOUCH_LESSONS, {"lesson_ids": lesson_ids})
+            # One message for the whole load: every worker clears its lesson cache
+            await invalidation_bus.publish(conn, "lesson")
+
+    metrics.inc("content_loader.loads")
+    return LoadReport(
+        lessons=len(lesson_rows),
+        problems=len(problem_rows),
+        options=options.changed,
+        adopted=adopted,
+        stale_problems=stale,
+        lesson_ids=lesson_ids,
+        new_problem_lesson_ids=sorted({row.lesson_id for row in problem_rows if row.inserted}),
+        seconds=time.perf_counter() - started
+    )
@@ -0,0 +1,286 @@
+from datetime import datetime, timezone, timedelta
+from types import SimpleNamespace
+from typing import Optional
+import json
+import logging
+
+from app.core.config import settings
+from app.core.deadline import statement_timeout_ms
+from app.core.metrics import metrics
+from app.schemas import SubmissionResponse, SingleSubmissionRequest
+from app.services.idempotency_service import IdempotencyService, expiry_cutoff, response_cache
+from app.services.progress_recomputer import progress_recomputer
+from app.services.submission_service import SubmissionService, AttemptResponseMissing
+
+logger = logging.getLogger(__name__)
+
+# Plain SQL sent through asyncpg, which prepares each text once per
+# connection (its statement cache) and reuses it on every later call.
+LESSON_EXISTS = "SELECT 1 FROM lessons WHERE id = $1"
+
+EXISTING_ATTEMPT = """
+    SELECT problem_id, is_correct, xp_earned FROM submissions
+    WHERE user_id = $1 AND attempt_id = $2 AND submitted_at >= $3 AND problem_id = $4
+"""
+
+# Only read when the window has nothing, as in find_existing_attempt
+EARLIER_ATTEMPT = """
+    SELECT problem_id, is_correct, xp_earned FROM submissions
+    WHERE user_id = $1 AND attempt_id = $2 AND submitted_at < $3 AND problem_id = $4
+"""
+
+# jsonb goes in as JSON text and comes out decoded: the codec SQLAlchemy's
+# asyncpg dialect installs on every pooled connection
+STORED_RESPONSE = """
+    SELECT response FROM idempotent_responses
+    WHERE user_id = $1 AND attempt_id = $2 AND problem_id = $3 AND created_at >= $4
+"""
+
+SAVE_RESPONSE = """
+    INSERT INTO idempotent_responses (user_id, attempt_id, problem_id, response)
+    VALUES ($1, $2, $3, $4)
+    ON CONFLICT (user_id, attempt_id, problem_id) DO NOTHING
+    RETURNING 1
+"""
+
+PROBLEM_IN_LESSON = "SELECT xp_value FROM problems WHERE id = $1 AND lesson_id = $2"
+
+OPTION_IS_CORRECT = "SELECT is_correct FROM problem_options WHERE id = $1"
+
+# Same serialisation as ProblemStatsService.record_answers (LOCK_USER_PROBLEM)
+LOCK_USER_PROBLEM = "SELECT pg_advisory_xact_lock($1, $2)"
+
+# Same distinct-user rule as ProblemStatsService.record_answers: only
+# earlier attempts count, so this runs before the submission is inserted.
+# Compacted attempts are only left as the options of the summary row
+SEEN_BEFORE = """
+    SELECT count(*) > 0 AS seen_problem, coalesce(bool_or(option_id = $3), false) AS seen_option
+    FROM (
+        SELECT option_id FROM submissions WHERE user_id = $1 AND problem_id = $2
+        UNION ALL
+        SELECT unnest(option_ids) FROM submission_summaries WHERE user_id = $1 AND problem_id = $2
+    ) AS earlier
+"""
+
+UPSERT_PROBLEM_STATS = """
+    INSERT INTO problem_stats (problem_id, attempts, correct, distinct_users)
+    VALUES ($1, 1, $2, $3)
+    ON CONFLICT (problem_id) DO UPDATE SET
+        attempts = problem_stats.attempts + excluded.attempts,
+        correct = problem_stats.correct + excluded.correct,
+        distinct_users = problem_stats.distinct_users + excluded.distinct_users,
+        updated_at = now()
+"""
+
+UPSERT_OPTION_STATS = """
+    INSERT INTO problem_option_stats (option_id, problem_id, attempts, distinct_users)
+    VALUES ($1, $2, 1, $3)
+    ON CONFLICT (option_id) DO UPDATE SET
+        attempts = problem_option_stats.attempts + excluded.attempts,
+        distinct_users = problem_option_stats.distinct_users + excluded.distinct_users,
+        updated_at = now()
+"""
+
+INSERT_SUBMISSION = """
+    INSERT INTO submissions (user_id, problem_id, lesson_id, attempt_id, option_id, is_correct, xp_earned, submitted_at)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+"""
+
+USER_STATE = "SELECT total_xp, current_streak, last_activity_date FROM users WHERE id = $1"
+
+USER_STATE_FOR_UPDATE = USER_STATE + " FOR UPDATE"
+
+UPDATE_USER = """
+    UPDATE users SET total_xp = $2, current_streak = $3, last_activity_date = $4, updated_at = now()
+    WHERE id = $1
+"""
+
+# Taken before UPSERT_PROGRESS counts, as SubmissionService._update_lesson_progress
+# does: the upsert's own conflict lock comes after its counts were read
+INSERT_PROGRESS = """
+    INSERT INTO user_progress (user_id, lesson_id, is_completed, completion_percentage)
+    VALUES ($1, $2, false, 0)
+    ON CONFLICT ON CONSTRAINT uq_progress_user_lesson DO NOTHING
+"""
+LOCK_PROGRESS = "SELECT 1 FROM user_progress WHERE user_id = $1 AND lesson_id = $2 FOR UPDATE"
+
+# SubmissionService._update_lesson_progress in one statement
+UPSERT_PROGRESS = """
+    WITH counts AS (
+        SELECT (SELECT count(*) FROM problems WHERE lesson_id = $2) AS total,
+               (SELECT count(*) FROM (
+                    SELECT problem_id FROM submissions WHERE user_id = $1 AND lesson_id = $2 AND is_correct
+                    UNION
+                    SELECT problem_id FROM submission_summaries
+                    WHERE user_id = $1 AND lesson_id = $2 AND first_correct_at IS NOT NULL
+                ) AS solved_problems) AS solved
+    ), progress AS (
+        SELECT CASE WHEN total > 0 THEN least(solved, total) * 100 / total ELSE 0 END AS percentage FROM counts
+    )
+    INSERT INTO user_progress (user_id, lesson_id, is_completed, completion_percentage, last_accessed_at, completed_at)
+    SELECT $1, $2, percentage = 100, percentage, now(), CASE WHEN percentage = 100 THEN now() END
+    FROM progress
+    ON CONFLICT ON CONSTRAINT uq_progress_user_lesson DO UPDATE SET
+        is_completed = excluded.is_completed,
+        completion_percentage = excluded.completion_percentage,
+        last_accessed_at = excluded.last_accessed_at,
+        completed_at = coalesce(user_progress.completed_at, excluded.completed_at),
+        updated_at = now()
+"""
+
+
+class _AnsweredConcurrently(Exception):
+    """Rolls back the transaction when another request saved the attempt first"""
+
+
+class FastSubmissionService:
+    @staticmethod
+    async def process_single_submission(
+        conn,
+        user_id: int,
+        lesson_id: int,
+        submission: SingleSubmissionRequest
+    ) -> Optional[SubmissionResponse]:
+        """SubmissionService.process_single_submission on a raw asyncpg connection.
+
+        Same checks, writes and response, including the route's lesson lookup
+        (None when the lesson does not exist), in one transaction. The user
+        row is locked while its XP and streak are updated, and the response
+        is stored for replays in the same transaction. Lesson progress is
+        left to the background recomputer, or updated after the commit.
+        """
+        timeout = statement_timeout_ms()
+        try:
+            return await FastSubmissionService._process(conn, user_id, lesson_id, submission, timeout)
+        except _AnsweredConcurrently:
+            stored = await FastSubmissionService._stored_response(
+                conn, (user_id, submission.attempt_id, submission.answer['problem_id']))
+            if stored is not None:
+                return stored
+        # The stored response is not readable (expired, not yet swept): once
+        # more, now answered from the other request's committed submissions
+        try:
+            return await FastSubmissionService._process(conn, user_id, lesson_id, submission, timeout)
+        except _AnsweredConcurrently:
+            raise AttemptResponseMissing(
+                f"Attempt {submission.attempt_id} was answered concurrently and cannot be read back")
+
+    @staticmethod
+    async def _stored_response(conn, key) -> Optional[SubmissionResponse]:
+        cached = response_cache.get(key)
+        if cached is not None:
+            return cached
+        stored = await conn.fetchval(STORED_RESPONSE, *key, expiry_cutoff())
+        if stored is None:
+            return None
+        replay = SubmissionResponse(**stored)
+        IdempotencyService.remember(*key, replay)
+        return replay
+
+    @staticmethod
+    async def _process(
+        conn,
+        user_id: int,
+        lesson_id: int,
+        submission: SingleSubmissionRequest,
+        timeout: Optional[int]
+    ) -> Optional[SubmissionResponse]:
+        problem_id = submission.answer['problem_id']
+        problem_option_id = submission.answer['option_id']
+        key = (user_id, submission.attempt_id, problem_id)
+
+        async with conn.transaction():
+            if timeout is not None:
+                await conn.execute(f"SET LOCAL statement_timeout = {timeout}")
+            if await conn.fetchval(LESSON_EXISTS, lesson_id) is None:
+                return None
+
+            replay = await FastSubmissionService._stored_response(conn, key)
+            if replay is not None:
+                return replay
+
+            window_start = datetime.now(timezone.utc) - timedelta(days=settings.submission_idempotency_window_days)
+            existing = await conn.fetch(EXISTING_ATTEMPT, user_id, submission.attempt_id, window_start, problem_id)
+            if not existing:
+                existing = await conn.fetch(EARLIER_ATTEMPT, user_id, submission.attempt_id, window_start, problem_id)
+            if existing:
+                logger.info(
+                    f"Returning existing submission results for attempt_id: {submission.attempt_id}")
+                user = await conn.fetchrow(USER_STATE, user_id)
+                return SubmissionResponse(
+                    success=True,
+                    message="Submission already processed (idempotent response)",
+                    results=[{
+                        "problem_id": row["problem_id"],
+                        "is_correct": row["is_correct"],
+                        "xp_earned": row["xp_earned"]
+                    } for row in existing],
+                    total_xp_earned=sum(row["xp_earned"] for row in existing),
+                    new_total_xp=user["total_xp"],
+                    current_streak=user["current_streak"],
+                    streak_increased=False
+                )
+
+            xp_value = await conn.fetchval(PROBLEM_IN_LESSON, problem_id, lesson_id)
+            if xp_value is None:
+                raise ValueError(
+                    f"Invalid problem IDs for lesson {lesson_id}: {problem_id}")
+
+            is_correct = await conn.fetchval(OPTION_IS_CORRECT, problem_option_id)
+            if is_correct is None:
+                raise LookupError(f"Problem option {problem_option_id} not found")
+            xp_earned = xp_value if is_correct else 0
+            current_time = datetime.now(timezone.utc)
+
+            await conn.execute(LOCK_USER_PROBLEM, user_id, problem_id)
+            seen = await conn.fetchrow(SEEN_BEFORE, user_id, problem_id, problem_option_id)
+            await conn.execute(UPSERT_PROBLEM_STATS, problem_id, 1 if is_correct else 0,
+                               0 if seen["seen_problem"] else 1)
+            await conn.execute(UPSERT_OPTION_STATS, problem_option_id, problem_id,
+                               0 if seen["seen_option"] else 1)
+
+            await conn.execute(INSERT_SUBMISSION, user_id, problem_id, lesson_id, submission.attempt_id,
+                               problem_option_id, is_correct, xp_earned, current_time)
+
+            row = await conn.fetchrow(USER_STATE_FOR_UPDATE, user_id)
+            if not row:
+                raise ValueError(f"User {user_id} not found")
+            user = SimpleNamespace(**dict(row))
+            streak_increased = SubmissionService._update_user_streak(user, current_time)
+            user.total_xp += xp_earned
+            user.last_activity_date = current_time
+            await conn.execute(UPDATE_USER, user_id, user.total_xp, user.current_streak, user.last_activity_date)
+
+            response = SubmissionResponse(
+                success=True,
+                message="Submission processed successfully",
+                results=[{
+                    "problem_id": problem_id,
+                    "is_correct": is_correct,
+                    "xp_earned": xp_earned
+                }],
+                total_xp_earned=xp_earned,
+                new_total_xp=user.total_xp,
+                current_streak=user.current_streak,
+                streak_increased=streak_increased
+            )
+            replay = IdempotencyService.replay_of(response)
+            if await conn.fetchval(SAVE_RESPONSE, *key, json.dumps(replay.model_dump(mode="json"))) is None:
+                raise _AnsweredConcurrently()
+
+        IdempotencyService.remember(*key, replay)
+        if not progress_recomputer.enqueue(user_id, lesson_id):
+            try:
+                await FastSubmissionService._update_lesson_progress(conn, user_id, lesson_id)
+            except Exception as e:
+                logger.error(f"Error updating lesson progress: {e}")
+        metrics.inc("submissions.fast_path")
+        return response
+
+    @staticmethod
+    async def _update_lesson_progress(conn, user_id: int, lesson_id: int):
+        async with conn.transaction():
+            if await conn.fetchval(LOCK_PROGRESS, user_id, lesson_id) is None:
+                await conn.execute(INSERT_PROGRESS, user_id, lesson_id)
+                await conn.fetchval(LOCK_PROGRESS, user_id, lesson_id)
+            await conn.execute(UPSERT_PROGRESS, user_id, lesson_id)
@@ -0,0 +1,178 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, bindparam, text
+from sqlalchemy.dialects.postgresql import insert
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+import asyncio
+import logging
+
+from app.core.cache import LocalCache
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import metrics
+from app.core.statements import hot
+from app.models import IdempotentResponse
+from app.schemas import SubmissionResponse
+
+logger = logging.getLogger(__name__)
+
+# problem_id key of whole-lesson submissions; single answers use their problem
+ALL_ANSWERS = 0
+REPLAY_MESSAGE = "Submission already processed (idempotent response)"
+
+# Stored responses never change, so entries only leave by LRU or TTL
+response_cache = LocalCache(
+    "idempotency",
+    max_entries=settings.idempotency_cache_max_entries,
+    ttl_seconds=settings.idempotency_response_ttl_hours * 3600
+)
+
+STORED_RESPONSE = hot(select(IdempotentResponse.response).where(
+    IdempotentResponse.user_id == bindparam("user_id"),
+    IdempotentResponse.attempt_id == bindparam("attempt_id"),
+    IdempotentResponse.problem_id == bindparam("problem_id"),
+    IdempotentResponse.created_at >= bindparam("created_after")
+))
+# The primary key serialises concurrent requests for one attempt: the later
+# insert waits for the earlier transaction and then does nothing
+SAVE_RESPONSE = hot(
+    insert(IdempotentResponse)
+    .values(user_id=bindparam("user_id"), attempt_id=bindparam("attempt_id"),
+            problem_id=bindparam("problem_id"), response=bindparam("response"))
+    .on_conflict_do_nothing(index_elements=["user_id", "attempt_id", "problem_id"])
+    .returning(IdempotentResponse.user_id)
+)
+SWEEP_EXPIRED = text("""
+    DELETE FROM idempotent_responses
+    WHERE ctid IN (
+        SELECT ctid FROM idempotent_responses
+        WHERE created_at < :cutoff
+        ORDER BY created_at
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+""")
+
+
+def expiry_cutoff() -> datetime:
+    return datetime.now(timezone.utc) - timedelta(hours=settings.idempotency_response_ttl_hours)
+
+
+class IdempotencyService:
+    @staticmethod
+    def replay_of(response: SubmissionResponse) -> SubmissionResponse:
+        """What a replay of `response` answers: the same results, XP and streak, no new streak"""
+        return response.model_copy(update={"message": REPLAY_MESSAGE, "streak_increased": False})
+
+    @staticmethod
+    async def get_response(
+        db: AsyncSession,
+        user_id: int,
+        attempt_id: str,
+        problem_id: int = ALL_ANSWERS
+    ) -> Optional[SubmissionResponse]:
+        """Stored replay response of an attempt, from the local LRU or one primary key lookup"""
+        key = (user_id, attempt_id, problem_id)
+        cached = response_cache.get(key)
+        if cached is not None:
+            return cached
+
+        result = await db.execute(STORED_RESPONSE, {
+            "user_id": user_id,
+            "attempt_id": attempt_id,
+            "problem_id": problem_id,
+            "created_after": expiry_cutoff()
+        })
+        stored = result.scalar_one_or_none()
+        if stored is None:
+            return None
+        replay = SubmissionResponse(**stored)
+        response_cache.set(key, replay)
+        metrics.inc("idempotency.replays_from_store")
+        return replay
+
+    @staticmethod
+    async def save_response(
+        db: AsyncSession,
+        user_id: int,
+        attempt_id: str,
+        problem_id: int,
+        response: SubmissionResponse
+    ) -> Optional[SubmissionResponse]:
+        """Save the replay of `response` in the caller's transaction.
+
+        Returns the replay to pass to remember() after commit, or None when a
+        concurrent request for the same attempt committed first; the caller
+        must then roll back and answer with get_response().
+        """
+        replay = IdempotencyService.replay_of(response)
+        result = await db.execute(SAVE_RESPONSE, {
+            "user_id": user_id,
+            "attempt_id": attempt_id,
+            "problem_id": problem_id,
+            "response": replay.model_dump(mode="json")
+        })
+        if result.scalar_one_or_none() is None:
+            metrics.inc("idempotency.concurrent_duplicates")
+            return None
+        return replay
+
+    @staticmethod
+    def remember(user_id: int, attempt_id: str, problem_id: int, replay: SubmissionResponse):
+        """Cache a saved replay once its transaction has committed"""
+        response_cache.set((user_id, attempt_id, problem_id), replay)
+
+    @staticmethod
+    async def sweep_expired(db: AsyncSession, batch_size: int) -> int:
+        """Delete expired responses in batches of `batch_size`, committing each batch"""
+        deleted = 0
+        cutoff = expiry_cutoff()
+        while True:
+            result = await db.execute(SWEEP_EXPIRED, {"cutoff": cutoff, "batch_size": batch_size})
+            await db.commit()
+            deleted += result.rowcount
+            if result.rowcount < batch_size:
+                break
+        if deleted:
+            metrics.inc("idempotency.swept", deleted)
+        return deleted
+
+
+class IdempotencySweeper:
+    """Background task removing stored responses older than the TTL"""
+
+    def __init__(self, interval_seconds: float, batch_size: int):
+        self.interval = interval_seconds
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="idempotency-sweeper")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                async with AsyncSessionLocal() as db:
+                    deleted = await IdempotencyService.sweep_expired(db, self.batch_size)
+                if deleted:
+                    logger.info(f"Removed {deleted} expired idempotent responses")
+            except Exception as e:
+                logger.error(f"Error sweeping idempotent responses: {e}")
+
+
+idempotency_sweeper = IdempotencySweeper(
+    interval_seconds=settings.idempotency_sweep_interval_seconds,
+    batch_size=settings.idempotency_sweep_batch_size
+)
@@ -1,27 +1,122 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
-from typing import List, Optional
+from sqlalchemy import BigInteger, select, func, bindparam, true
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional
 import logging
 
+from app.core.cache import LocalCache
+from app.core.config import settings
+from app.core.invalidation import invalidation_bus
+from app.core.statements import hot
 from app.models import Lesson, Problem, ProblemOption, UserProgress
 from app.schemas import LessonWithProgressResponse, LessonDetailResponse, ProblemResponse, ProblemOptionResponse
 
 logger = logging.getLogger(__name__)
 
+# Lesson detail responses by lesson id. Writers that change a lesson, its
+# problems or their options must publish a "lesson" invalidation for it.
+lesson_detail_cache = LocalCache(
+    "lesson_detail",
+    max_entries=settings.catalog_cache_max_entries,
+    ttl_seconds=settings.catalog_cache_ttl_seconds
+)
+invalidation_bus.register("lesson", lesson_detail_cache)
+
+
+# Catalog reads select only the columns the responses need, straight from
+# the tables, into these read models: no ORM entities, identity map or
+# unused columns (is_correct, timestamps of problems and options).
+class LessonRow(NamedTuple):
+    id: int
+    title: str
+    description: Optional[str]
+    order_index: int
+    is_active: bool
+    created_at: datetime
+    updated_at: datetime
+
+
+class ProblemRow(NamedTuple):
+    id: int
+    lesson_id: int
+    question: str
+    problem_type: str
+    xp_value: int
+    order_index: int
+
+
+class OptionRow(NamedTuple):
+    id: int
+    problem_id: int
+    option_text: str
+    order_index: int
+
+
+lessons_table = Lesson.__table__
+problems_table = Problem.__table__
+options_table = ProblemOption.__table__
+progress_table = UserProgress.__table__
+
+LESSON_COLUMNS = [lessons_table.c[name] for name in LessonRow._fields]
+PROBLEM_COLUMNS = [problems_table.c[name] for name in ProblemRow._fields]
+OPTION_COLUMNS = [options_table.c[name] for name in OptionRow._fields]
+
+# Hot-path statements, built once; values are passed to execute()
+# Every committed UPDATE bumps its row's version, so the sums only repeat if
+# rows are deleted and recreated, which the counts and max ids catch
+CATALOG_VERSION = select(
+    func.coalesce(func.sum(Lesson.version), 0).cast(BigInteger).label("catalog_version"),
+    func.count(Lesson.id).label("lessons"),
+    func.max(Lesson.id).label("last_lesson_id")
+).where(Lesson.is_active == True).subquery()
+PROGRESS_VERSION = select(
+    func.coalesce(func.sum(UserProgress.version), 0).cast(BigInteger).label("progress_version"),
+    func.count(UserProgress.id).label("progress_rows"),
+    func.max(UserProgress.id).label("last_progress_id")
+).where(UserProgress.user_id == bindparam("user_id")).subquery()
+LESSONS_VERSION = hot(select(CATALOG_VERSION, PROGRESS_VERSION).select_from(
+    CATALOG_VERSION.join(PROGRESS_VERSION, true())))
+ACTIVE_LESSONS = hot(
+    select(*LESSON_COLUMNS)
+    .where(lessons_table.c.is_active == True)
+    .order_by(lessons_table.c.order_index)
+)
+USER_PROGRESS = hot(select(
+    progress_table.c.lesson_id,
+    progress_table.c.is_completed,
+    progress_table.c.completion_percentage
+).where(progress_table.c.user_id == bindparam("user_id")))
+LESSONS_BY_ID = select(*LESSON_COLUMNS).where(lessons_table.c.id.in_(bindparam("lesson_ids", expanding=True)))
+# Ordered in SQL, so grouping keeps problems and options in display order
+PROBLEMS_BY_LESSON = (
+    select(*PROBLEM_COLUMNS)
+    .where(problems_table.c.lesson_id.in_(bindparam("lesson_ids", expanding=True)))
+    .order_by(problems_table.c.lesson_id, problems_table.c.order_index)
+)
+OPTIONS_BY_LESSON = (
+    select(*OPTION_COLUMNS)
+    .join(problems_table, problems_table.c.id == options_table.c.problem_id)
+    .where(problems_table.c.lesson_id.in_(bindparam("lesson_ids", expanding=True)))
+    .order_by(options_table.c.problem_id, options_table.c.order_index)
+)
+
 
 class LessonService:
+    @staticmethod
+    async def get_lessons_version(db: AsyncSession, user_id: int) -> tuple:
+        """Cheap version of the lessons listing: catalog and user progress change markers"""
+        result = await db.execute(LESSONS_VERSION, {"user_id": user_id})
+        return tuple(result.one())
+    
     @staticmethod
     async def get_lessons_with_progress(db: AsyncSession, user_id: int) -> List[LessonWithProgressResponse]:
         # Get all active lessons
-        stmt = select(Lesson).where(Lesson.is_active == True).order_by(Lesson.order_index)
-        result = await db.execute(stmt)
-        lessons = result.scalars().all()
+        result = await db.execute(ACTIVE_LESSONS)
+        lessons = [LessonRow._make(row) for row in result]
         
         # Get user progress for all lessons
-        progress_stmt = select(UserProgress).where(UserProgress.user_id == user_id)
-        progress_result = await db.execute(progress_stmt)
-        progress_records = {p.lesson_id: p for p in progress_result.scalars().all()}
+        progress_result = await db.execute(USER_PROGRESS, {"user_id": user_id})
+        progress_records = {row.lesson_id: row for row in progress_result}
         
         # Build response
         lesson_responses = []
@@ -46,28 +141,82 @@ class LessonService:
     
     @staticmethod
     async def get_lesson_detail(db: AsyncSession, lesson_id: int) -> Optional[LessonDetailResponse]:
-        stmt = (
-            select(Lesson)
-            .options(
-                selectinload(Lesson.problems).selectinload(Problem.options)
-            )
-            .where(Lesson.id == lesson_id)
-        )
-        result = await db.execute(stmt)
-        lesson = result.scalar_one_or_none()
+        cached = lesson_detail_cache.get(lesson_id)
+        if cached is not None:
+            return cached
+        generation = lesson_detail_cache.generation
         
-        if not lesson:
+        lesson_details = await LessonService._load_lesson_details(db, [lesson_id])
+        lesson_detail = lesson_details.get(lesson_id)
+        if not lesson_detail:
             return None
         
+        lesson_detail_cache.set(lesson_id, lesson_detail, generation)
+        return lesson_detail
+    
+    @staticmethod
+    async def get_lesson_details(db: AsyncSession, lesson_ids: List[int]) -> Dict[int, LessonDetailResponse]:
+        """Load many lessons in three statements (lessons, problems, options), keyed by id"""
+        lesson_details = {}
+        missing_ids = set()
+        for lesson_id in lesson_ids:
+            cached = lesson_detail_cache.get(lesson_id)
+            if cached is not None:
+                lesson_details[lesson_id] = cached
+            else:
+                missing_ids.add(lesson_id)
+        
+        if not missing_ids:
+            return lesson_details
+        generation = lesson_detail_cache.generation
+        
+        loaded = await LessonService._load_lesson_details(db, missing_ids)
+        for lesson_id, lesson_detail in loaded.items():
+            lesson_detail_cache.set(lesson_id, lesson_detail, generation)
+        lesson_details.update(loaded)
+        return lesson_details
+    
+    @staticmethod
+    async def _load_lesson_details(db: AsyncSession, lesson_ids: Iterable[int]) -> Dict[int, LessonDetailResponse]:
+        params = {"lesson_ids": list(lesson_ids)}
+        lessons_result = await db.execute(LESSONS_BY_ID, params)
+        lessons = [LessonRow._make(row) for row in lessons_result]
+        if not lessons:
+            return {}
+        
+        problems_result = await db.execute(PROBLEMS_BY_LESSON, params)
+        problems_by_lesson: Dict[int, List[ProblemRow]] = {}
+        for row in problems_result:
+            problem = ProblemRow._make(row)
+            problems_by_lesson.setdefault(problem.lesson_id, []).append(problem)
+        
+        options_result = await db.execute(OPTIONS_BY_LESSON, params)
+        options_by_problem: Dict[int, List[OptionRow]] = {}
+        for row in options_result:
+            option = OptionRow._make(row)
+            options_by_problem.setdefault(option.problem_id, []).append(option)
+        
+        return {
+            lesson.id: LessonService._build_lesson_detail(
+                lesson, problems_by_lesson.get(lesson.id, []), options_by_problem)
+            for lesson in lessons
+        }
+    
+    @staticmethod
+    def _build_lesson_detail(
+        lesson: LessonRow,
+        problems: List[ProblemRow],
+        options_by_problem: Dict[int, List[OptionRow]]
+    ) -> LessonDetailResponse:
         # Build problem responses
         problem_responses = []
-        for problem in sorted(lesson.problems, key=lambda p: p.order_index):
+        for problem in problems:
             option_responses = [
                 ProblemOptionResponse(
                     id=option.id,
                     option_text=option.option_text,
                     order_index=option.order_index
-                ) for option in sorted(problem.options, key=lambda o: o.order_index)
+                ) for option in options_by_problem.get(problem.id, [])
             ]
             
             problem_response = ProblemResponse(
@@ -90,4 +239,3 @@ class LessonService:
             updated_at=lesson.updated_at,
             problems=problem_responses
         )
-
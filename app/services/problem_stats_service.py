@@ -0,0 +1,155 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, and_, union, text
+from sqlalchemy.dialects.postgresql import insert
+from typing import Iterable, Optional, Tuple
+import logging
+
+from app.models import Problem, ProblemOption, Submission, SubmissionSummary, ProblemStats, ProblemOptionStats
+from app.schemas import ProblemStatisticsResponse, OptionStatisticsResponse
+
+logger = logging.getLogger(__name__)
+
+# Held until the submission commits, so a concurrent first attempt of the same
+# user on the same problem reads the other's submission before counting
+LOCK_USER_PROBLEM = text("SELECT pg_advisory_xact_lock(:user_id, :problem_id)")
+
+
+class ProblemStatsService:
+    @staticmethod
+    async def record_answers(
+        db: AsyncSession,
+        user_id: int,
+        answers: Iterable[Tuple[int, int, bool]]
+    ) -> None:
+        """Fold graded (problem_id, option_id, is_correct) answers into the counters.
+
+        Must run in the submission transaction *before* the new submission rows
+        are added, so the distinct-user check only sees earlier attempts. The
+        check is serialised per (user, problem) by an advisory lock held until
+        the transaction ends.
+        """
+        answers = list(answers)
+        if not answers:
+            return
+
+        problem_ids = {problem_id for problem_id, _, _ in answers}
+        # Locked in key order so submissions covering several problems cannot deadlock
+        for problem_id in sorted(problem_ids):
+            await db.execute(LOCK_USER_PROBLEM, {"user_id": user_id, "problem_id": problem_id})
+        # Compacted attempts only remain as the option ids of their summary
+        seen_stmt = union(
+            select(Submission.problem_id, Submission.option_id).where(
+                and_(
+                    Submission.user_id == user_id,
+                    Submission.problem_id.in_(problem_ids)
+                )
+            ),
+            select(SubmissionSummary.problem_id, func.unnest(SubmissionSummary.option_ids)).where(
+                and_(
+                    SubmissionSummary.user_id == user_id,
+                    SubmissionSummary.problem_id.in_(problem_ids)
+                )
+            )
+        )
+        seen_result = await db.execute(seen_stmt)
+        seen_pairs = {(row.problem_id, row.option_id) for row in seen_result}
+        seen_problems = {problem_id for problem_id, _ in seen_pairs}
+
+        problem_rows = {}
+        option_rows = {}
+        for problem_id, option_id, is_correct in answers:
+            row = problem_rows.setdefault(problem_id, {
+                "problem_id": problem_id, "attempts": 0, "correct": 0, "distinct_users": 0
+            })
+            row["attempts"] += 1
+            row["correct"] += 1 if is_correct else 0
+            if problem_id not in seen_problems:
+                row["distinct_users"] = 1
+                seen_problems.add(problem_id)
+
+            option_row = option_rows.setdefault(option_id, {
+                "option_id": option_id, "problem_id": problem_id, "attempts": 0, "distinct_users": 0
+            })
+            option_row["attempts"] += 1
+            if (problem_id, option_id) not in seen_pairs:
+                option_row["distinct_users"] = 1
+                seen_pairs.add((problem_id, option_id))
+
+        # Upsert in key order so concurrent submissions lock rows in the same order
+        problem_stmt = insert(ProblemStats).values(
+            [problem_rows[key] for key in sorted(problem_rows)])
+        problem_stmt = problem_stmt.on_conflict_do_update(
+            index_elements=[ProblemStats.problem_id],
+            set_={
+                "attempts": ProblemStats.attempts + problem_stmt.excluded.attempts,
+                "correct": ProblemStats.correct + problem_stmt.excluded.correct,
+                "distinct_users": ProblemStats.distinct_users + problem_stmt.excluded.distinct_users,
+                "updated_at": func.now()
+            }
+        )
+        await db.execute(problem_stmt)
+
+        option_stmt = insert(ProblemOptionStats).values(
+            [option_rows[key] for key in sorted(option_rows)])
+        option_stmt = option_stmt.on_conflict_do_update(
+            index_elements=[ProblemOptionStats.option_id],
+            set_={
+                "attempts": ProblemOptionStats.attempts + option_stmt.excluded.attempts,
+                "distinct_users": ProblemOptionStats.distinct_users + option_stmt.excluded.distinct_users,
+                "updated_at": func.now()
+            }
+        )
+        await db.execute(option_stmt)
+
+    @staticmethod
+    async def get_problem_statistics(db: AsyncSession, problem_id: int) -> Optional[ProblemStatisticsResponse]:
+        """Serve answer distribution from the counter tables, never from submissions"""
+        problem_stmt = (
+            select(Problem.id, ProblemStats.attempts, ProblemStats.correct, ProblemStats.distinct_users)
+            .outerjoin(ProblemStats, ProblemStats.problem_id == Problem.id)
+            .where(Problem.id == problem_id)
+        )
+        problem_result = await db.execute(problem_stmt)
+        problem = problem_result.one_or_none()
+
+        if not problem:
+            return None
+
+        attempts = problem.attempts or 0
+        correct = problem.correct or 0
+
+        options_stmt = (
+            select(
+                ProblemOption.id,
+                ProblemOption.option_text,
+                ProblemOption.order_index,
+                ProblemOption.is_correct,
+                ProblemOptionStats.attempts,
+                ProblemOptionStats.distinct_users
+            )
+            .outerjoin(ProblemOptionStats, ProblemOptionStats.option_id == ProblemOption.id)
+            .where(ProblemOption.problem_id == problem_id)
+            .order_by(ProblemOption.order_index)
+        )
+        options_result = await db.execute(options_stmt)
+
+        option_responses = [
+            OptionStatisticsResponse(
+                option_id=option.id,
+                option_text=option.option_text,
+                order_index=option.order_index,
+                is_correct=bool(option.is_correct),
+                attempts=option.attempts or 0,
+                distinct_users=option.distinct_users or 0,
+                pick_rate=round((option.attempts or 0) / attempts, 4) if attempts > 0 else 0.0
+            ) for option in options_result
+        ]
+
+        return ProblemStatisticsResponse(
+            problem_id=problem.id,
+            attempts=attempts,
+            correct=correct,
+            distinct_users=problem.distinct_users or 0,
+            correct_rate=round(correct / attempts, 4) if attempts > 0 else 0.0,
+            options=option_responses
+        )
@@ -0,0 +1,171 @@
+"""
+Full rebuild of user_progress from submissions.
+
+After lessons gain or lose problems every stored completion percentage of
+those lessons is wrong until the user submits again. The rebuild recomputes
+them with one set-based statement per range of user ids: it counts solved
+problems per (user, lesson) from submissions (an index range scan on
+idx_submission_user_lesson_correct) and the summaries of compacted ones,
+upserts progress for every pair with
+submissions, resets pairs that no longer have any, and only writes rows
+whose values change. Ranges are independent, so several run in parallel
+on their own connections, each in its own short transaction; finished
+ranges are recorded in a checkpoint file so an interrupted rebuild resumes
+where it stopped.
+"""
+from sqlalchemy import text
+from typing import Callable, List, NamedTuple, Optional, Sequence
+import asyncio
+import json
+import os
+import time
+
+from app.core.metrics import metrics
+
+REBUILD_CHUNK = """
+    WITH totals AS (
+        SELECT lesson_id, count(*) AS total FROM problems GROUP BY lesson_id
+    ), answers AS (
+        SELECT user_id, lesson_id, problem_id, is_correct FROM submissions
+        WHERE user_id >= :low AND user_id < :high {lesson_filter}
+        UNION ALL
+        SELECT user_id, lesson_id, problem_id, first_correct_at IS NOT NULL FROM submission_summaries
+        WHERE user_id >= :low AND user_id < :high {lesson_filter}
+    ), attempted AS (
+        SELECT user_id, lesson_id, count(DISTINCT problem_id) FILTER (WHERE is_correct) AS solved
+        FROM answers
+        GROUP BY user_id, lesson_id
+    ), pairs AS (
+        SELECT user_id, lesson_id, solved FROM attempted
+        UNION ALL
+        SELECT p.user_id, p.lesson_id, 0 FROM user_progress AS p
+        WHERE p.user_id >= :low AND p.user_id < :high {progress_filter}
+          AND NOT EXISTS (
+              SELECT 1 FROM attempted AS a WHERE a.user_id = p.user_id AND a.lesson_id = p.lesson_id
+          )
+    ), computed AS (
+        SELECT pairs.user_id, pairs.lesson_id,
+               CASE WHEN coalesce(totals.total, 0) > 0
+                    THEN least(pairs.solved, totals.total) * 100 / totals.total ELSE 0 END AS percentage
+        FROM pairs LEFT JOIN totals USING (lesson_id)
+    )
+    INSERT INTO user_progress (user_id, lesson_id, is_completed, completion_percentage, completed_at)
+    SELECT user_id, lesson_id, percentage = 100, percentage, CASE WHEN percentage = 100 THEN now() END
+    FROM computed
+    ON CONFLICT ON CONSTRAINT uq_progress_user_lesson DO UPDATE SET
+        is_completed = excluded.is_completed,
+        completion_percentage = excluded.completion_percentage,
+        completed_at = coalesce(user_progress.completed_at, excluded.completed_at),
+        updated_at = now()
+    WHERE user_progress.completion_percentage IS DISTINCT FROM excluded.completion_percentage
+       OR user_progress.is_completed IS DISTINCT FROM excluded.is_completed
+"""
+
+
+def rebuild_statement(lesson_ids: Optional[Sequence[int]] = None):
+    """The per-range statement, limited to `lesson_ids` when given"""
+    if lesson_ids is None:
+        return text(REBUILD_CHUNK.format(lesson_filter="", progress_filter=""))
+    return text(REBUILD_CHUNK.format(
+        lesson_filter="AND lesson_id = ANY(:lesson_ids)",
+        progress_filter="AND p.lesson_id = ANY(:lesson_ids)"
+    ))
+
+
+class Chunk(NamedTuple):
+    low: int  # first user id, inclusive
+    high: int  # last user id, exclusive
+
+
+def user_id_chunks(min_id: int, max_id: int, chunk_size: int) -> List[Chunk]:
+    return [Chunk(low, min(low + chunk_size, max_id + 1)) for low in range(min_id, max_id + 1, chunk_size)]
+
+
+class RebuildReport(NamedTuple):
+    chunks: int
+    skipped: int  # already done according to the checkpoint
+    rows_changed: int
+    seconds: float
+
+
+class Checkpoint:
+    """Finished chunks of one rebuild, kept in a JSON file replaced atomically"""
+
+    def __init__(self, path: Optional[str], params: dict):
+        self.path = path
+        self.params = params
+        self.done = set()
+        if path and os.path.exists(path):
+            with open(path) as f:
+                saved = json.load(f)
+            if saved["params"] != params:
+                raise ValueError(
+                    f"Checkpoint {path} belongs to a rebuild with {saved['params']}, not {params}; "
+                    "remove it to start over")
+            self.done = {Chunk(*chunk) for chunk in saved["done"]}
+
+    def mark_done(self, chunk: Chunk):
+        self.done.add(chunk)
+        if not self.path:
+            return
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump({"params": self.params, "done": sorted(self.done)}, f)
+        os.replace(temporary, self.path)
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+async def user_id_bounds(engine):
+    async with engine.connect() as conn:
+        return (await conn.execute(text("SELECT min(id), max(id) FROM users"))).one()
+
+
+async def rebuild_progress(
+    engine,
+    workers: int = 4,
+    chunk_size: int = 10000,
+    lesson_ids: Optional[Sequence[int]] = None,
+    checkpoint_path: Optional[str] = None,
+    report: Optional[Callable[[str], None]] = None
+) -> RebuildReport:
+    """Recompute user_progress for all users, `workers` user-id ranges at a time"""
+    min_id, max_id = await user_id_bounds(engine)
+    if min_id is None:
+        return RebuildReport(0, 0, 0, 0.0)
+
+    lesson_ids = sorted(lesson_ids) if lesson_ids is not None else None
+    checkpoint = Checkpoint(checkpoint_path, {"chunk_size": chunk_size, "lesson_ids": lesson_ids})
+    chunks = user_id_chunks(min_id, max_id, chunk_size)
+    todo = [chunk for chunk in chunks if chunk not in checkpoint.done]
+    stmt = rebuild_statement(lesson_ids)
+    params = {"lesson_ids": lesson_ids} if lesson_ids is not None else {}
+
+    queue: asyncio.Queue = asyncio.Queue()
+    for chunk in todo:
+        queue.put_nowait(chunk)
+    rows_changed = 0
+    finished = 0
+    started = time.perf_counter()
+
+    async def worker():
+        nonlocal rows_changed, finished
+        while not queue.empty():
+            chunk = queue.get_nowait()
+            async with engine.begin() as conn:
+                result = await conn.execute(stmt, {"low": chunk.low, "high": chunk.high, **params})
+            checkpoint.mark_done(chunk)
+            rows_changed += result.rowcount
+            finished += 1
+            metrics.inc("progress_rebuild.chunks")
+            if report is not None:
+                elapsed = time.perf_counter() - started
+                eta = elapsed / finished * (len(todo) - finished)
+                report(f"{finished}/{len(todo)} chunks, {rows_changed} rows changed, "
+                       f"{elapsed:.1f}s elapsed, ~{eta:.0f}s left")
+
+    await asyncio.gather(*(worker() for _ in range(min(workers, len(todo)) or 1)))
+    checkpoint.clear()
+    return RebuildReport(len(chunks), len(chunks) - len(todo), rows_changed, time.perf_counter() - started)
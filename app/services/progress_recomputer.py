@@ -0,0 +1,132 @@
+from typing import Dict, List, Optional, Set, Tuple
+import asyncio
+import logging
+import time
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressRecomputer:
+    """Background lesson-progress recomputation off the submission path.
+
+    Submissions enqueue (user_id, lesson_id) after their commit. A key that
+    is already waiting is not queued again, so a burst of answers in one
+    lesson costs one recomputation. A key is recomputed by one worker at a
+    time: one enqueued while it is being recomputed waits until that run
+    has finished, then the same worker runs it again and sees the new
+    answers, so an older snapshot can never commit after a newer one.
+    Across processes and the inline fallback, the progress row lock that
+    _update_lesson_progress takes before counting gives the same order.
+    A fixed number of workers recompute, each in its own session. When the
+    queue is full (or the recomputer is not running) enqueue() returns
+    False and the caller updates progress inline as before.
+    """
+
+    def __init__(self, queue_size: int, concurrency: int):
+        self.queue_size = queue_size
+        self.concurrency = concurrency
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        # Waiting keys and when they first became stale
+        self._waiting: Dict[Tuple[int, int], float] = {}
+        # Keys a worker is recomputing; they are not queued again while there
+        self._running: Set[Tuple[int, int]] = set()
+
+    @classmethod
+    def from_settings(cls) -> "ProgressRecomputer":
+        return cls(
+            queue_size=settings.progress_queue_size,
+            concurrency=settings.progress_recompute_concurrency
+        )
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiting)
+
+    async def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._run(), name=f"progress-recompute-{n}")
+            for n in range(self.concurrency)
+        ]
+        logger.info(f"Background progress recomputation enabled (workers={self.concurrency})")
+
+    async def stop(self):
+        """Recompute everything still waiting and stop the workers"""
+        if not self.running:
+            return
+        # Not running from here on: later submissions update progress inline
+        workers, self._workers = self._workers, []
+        for _ in workers:
+            self._queue.put_nowait(None)
+        await asyncio.gather(*workers)
+
+    def enqueue(self, user_id: int, lesson_id: int) -> bool:
+        """Mark a user's lesson progress stale; False when the caller must update it inline"""
+        if not self.running:
+            return False
+        key = (user_id, lesson_id)
+        if key in self._waiting:
+            metrics.inc("progress.coalesced")
+            return True
+        if len(self._waiting) >= self.queue_size:
+            metrics.inc("progress.queue_full")
+            return False
+        self._waiting[key] = time.monotonic()
+        if key not in self._running:
+            self._queue.put_nowait(key)
+        metrics.inc("progress.enqueued")
+        metrics.set("progress.waiting", len(self._waiting))
+        return True
+
+    async def _run(self):
+        while True:
+            key = await self._queue.get()
+            if key is None:
+                return
+            self._running.add(key)
+            try:
+                while key in self._waiting:
+                    await self._recompute_waiting(key)
+            finally:
+                self._running.discard(key)
+
+    async def _recompute_waiting(self, key: Tuple[int, int]):
+        # Leave the waiting set first: answers committed from here on mark the key again
+        stale_since = self._waiting.pop(key)
+        metrics.set("progress.waiting", len(self._waiting))
+        try:
+            await self.recompute(*key)
+        except Exception as e:
+            metrics.inc("progress.failed")
+            logger.error(f"Error recomputing lesson progress for {key}: {e}")
+            return
+        # How long the stored progress lagged behind the user's answers
+        metrics.set("progress.staleness_ms", (time.monotonic() - stale_since) * 1000)
+        metrics.inc("progress.recomputed")
+
+    @staticmethod
+    async def recompute(user_id: int, lesson_id: int):
+        # Imported here: the submission service imports this module to enqueue
+        from app.services.submission_service import SubmissionService
+
+        async with AsyncSessionLocal() as db:
+            try:
+                await SubmissionService._update_lesson_progress(db, user_id, lesson_id)
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+
+
+progress_recomputer = ProgressRecomputer.from_settings()
@@ -0,0 +1,91 @@
+"""
+Compaction of old submissions into per-(user, problem) summaries.
+
+Progress and the answer counters only need to know, per user and problem,
+whether it was ever solved, which options were picked, how often and the
+best XP. Compaction works a whole monthly partition at a time: it reads
+every expired partition once, folds its rows into submission_summaries
+and detaches the partition, in one transaction, so every answer is in
+exactly one of the two places at any snapshot and readers that union
+them never count an answer twice or miss one. Nothing is deleted row by
+row; the detached partitions are dropped or kept in an archive schema.
+
+The cutoff must stay outside the idempotency window. Replay lookups only
+read raw submissions, so compaction is what ends the recognition of an
+attempt's replays.
+"""
+from sqlalchemy import text
+from datetime import date, datetime, timedelta, timezone
+from typing import List, NamedTuple, Optional
+import time
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.partitions import ADVISORY_LOCK_KEY, list_partitions, detach_partitions
+
+# Formatted with a partition name read from the catalog
+FOLD_PARTITION = """
+    WITH folded AS (
+        SELECT user_id, problem_id,
+               max(lesson_id) AS lesson_id,
+               count(*) AS attempts,
+               min(submitted_at) FILTER (WHERE is_correct) AS first_correct_at,
+               max(xp_earned) AS best_xp,
+               array_agg(DISTINCT option_id ORDER BY option_id) AS option_ids
+        FROM {partition}
+        GROUP BY user_id, problem_id
+    )
+    INSERT INTO submission_summaries
+        (user_id, problem_id, lesson_id, attempts, first_correct_at, best_xp, option_ids, compacted_at)
+    SELECT user_id, problem_id, lesson_id, attempts, first_correct_at, best_xp, option_ids, now()
+    FROM folded
+    ON CONFLICT (user_id, problem_id) DO UPDATE SET
+        lesson_id = excluded.lesson_id,
+        attempts = submission_summaries.attempts + excluded.attempts,
+        -- least() and greatest() skip NULLs
+        first_correct_at = least(submission_summaries.first_correct_at, excluded.first_correct_at),
+        best_xp = greatest(submission_summaries.best_xp, excluded.best_xp),
+        option_ids = ARRAY(
+            SELECT DISTINCT unnest(submission_summaries.option_ids || excluded.option_ids) ORDER BY 1
+        ),
+        compacted_at = excluded.compacted_at
+"""
+
+
+class CompactionReport(NamedTuple):
+    partitions: List[str]  # detached
+    summaries: int  # summary rows written
+    seconds: float
+
+
+def earliest_allowed_cutoff() -> datetime:
+    """Compaction may not reach into the idempotency window"""
+    return datetime.now(timezone.utc) - timedelta(days=settings.submission_idempotency_window_days)
+
+
+def compact_partitions_before(conn, cutoff: date, archive_schema: Optional[str] = None,
+                              drop: bool = False) -> CompactionReport:
+    """Fold every monthly partition that ends on or before `cutoff` into summaries and detach it.
+
+    Detached partitions are moved to `archive_schema` when given, dropped when
+    `drop` is set, and otherwise left in place as standalone tables. Runs in
+    the caller's transaction: all partitions are folded first, under a SHARE
+    lock that only blocks writes to those old months, and detached last, so
+    the exclusive lock DETACH takes on submissions is held briefly.
+    """
+    if datetime.combine(cutoff, datetime.min.time(), timezone.utc) > earliest_allowed_cutoff():
+        raise ValueError(
+            f"Cutoff {cutoff:%Y-%m-%d} is inside the {settings.submission_idempotency_window_days}-day "
+            "idempotency window")
+
+    started = time.perf_counter()
+    conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+    expired = [partition.name for partition in list_partitions(conn) if partition.end <= cutoff]
+    summaries = 0
+    for name in expired:
+        # Held until commit, so no row can arrive between the fold and the detach
+        conn.execute(text(f"LOCK TABLE {name} IN SHARE MODE"))
+        summaries += conn.execute(text(FOLD_PARTITION.format(partition=name))).rowcount
+        metrics.inc("compaction.partitions")
+    detach_partitions(conn, expired, archive_schema=archive_schema, drop=drop)
+    return CompactionReport(expired, summaries, time.perf_counter() - started)
@@ -1,14 +1,124 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_
-from datetime import datetime, timezone
-from typing import List
+from sqlalchemy import select, func, bindparam, union
+from sqlalchemy.dialects.postgresql import insert
+from datetime import datetime, timezone, timedelta
+from typing import List, Optional, Tuple
 import logging
 
-from app.models import ProblemOption, User, Problem, Submission, UserProgress
+from app.core.config import settings
+from app.core.statements import hot
+from app.models import ProblemOption, User, Problem, Submission, SubmissionSummary, UserProgress
 from app.schemas import SubmissionRequest, SubmissionResponse, SingleSubmissionRequest
+from app.services.idempotency_service import IdempotencyService, ALL_ANSWERS
+from app.services.problem_stats_service import ProblemStatsService
+from app.services.progress_recomputer import progress_recomputer
+from app.services.user_service import USER_BY_ID
 
 logger = logging.getLogger(__name__)
 
+# Hot-path statements, built once; values are passed to execute()
+ATTEMPT_SUBMISSIONS = select(Submission).where(
+    Submission.user_id == bindparam("user_id"),
+    Submission.attempt_id == bindparam("attempt_id")
+)
+EXISTING_ATTEMPT = hot(ATTEMPT_SUBMISSIONS.where(Submission.submitted_at >= bindparam("window_start")))
+EXISTING_ATTEMPT_PROBLEM = hot(EXISTING_ATTEMPT.where(Submission.problem_id == bindparam("problem_id")))
+# Attempts older than the idempotency window
+EARLIER_ATTEMPT = hot(ATTEMPT_SUBMISSIONS.where(Submission.submitted_at < bindparam("window_start")))
+EARLIER_ATTEMPT_PROBLEM = hot(EARLIER_ATTEMPT.where(Submission.problem_id == bindparam("problem_id")))
+PROBLEMS_IN_LESSON = select(Problem).where(
+    Problem.id.in_(bindparam("problem_ids", expanding=True)),
+    Problem.lesson_id == bindparam("lesson_id")
+)
+PROBLEM_IN_LESSON = hot(select(Problem).where(
+    Problem.id == bindparam("problem_id"),
+    Problem.lesson_id == bindparam("lesson_id")
+))
+OPTIONS_BY_ID = select(ProblemOption).where(ProblemOption.id.in_(bindparam("option_ids", expanding=True)))
+OPTION_BY_ID = hot(select(ProblemOption).where(ProblemOption.id == bindparam("option_id")))
+# Locked until commit: progress is recounted by one transaction at a time, each
+# after the answers of the ones before it have committed. populate_existing, so
+# a row already in the session is refreshed to its locked version
+PROGRESS_FOR_LESSON = hot(
+    select(UserProgress)
+    .where(
+        UserProgress.user_id == bindparam("user_id"),
+        UserProgress.lesson_id == bindparam("lesson_id")
+    )
+    .with_for_update()
+    .execution_options(populate_existing=True)
+)
+# (user_id, lesson_id) is unique: a concurrent first submission may win the insert
+INSERT_PROGRESS = hot(
+    insert(UserProgress)
+    .values(user_id=bindparam("user_id"), lesson_id=bindparam("lesson_id"),
+            is_completed=False, completion_percentage=0)
+    .on_conflict_do_nothing(constraint="uq_progress_user_lesson")
+)
+LESSON_PROBLEM_COUNT = hot(select(func.count(Problem.id)).where(Problem.lesson_id == bindparam("lesson_id")))
+# Solved problems live in recent submissions and in the summaries of compacted ones
+SOLVED_IN_LESSON = union(
+    select(Submission.problem_id).where(
+        Submission.user_id == bindparam("user_id"),
+        Submission.lesson_id == bindparam("lesson_id"),
+        Submission.is_correct == True
+    ),
+    select(SubmissionSummary.problem_id).where(
+        SubmissionSummary.user_id == bindparam("user_id"),
+        SubmissionSummary.lesson_id == bindparam("lesson_id"),
+        SubmissionSummary.first_correct_at.isnot(None)
+    )
+).subquery()
+LESSON_SOLVED_COUNT = hot(select(func.count()).select_from(SOLVED_IN_LESSON))
+
+
+class AttemptResponseMissing(Exception):
+    """Raised when another request committed an attempt first but nothing of it can be read back"""
+
+
+def existing_attempt_query(
+    user_id: int,
+    attempt_id: str,
+    problem_id: Optional[int] = None,
+    before_window: bool = False
+) -> Tuple:
+    """Statement and parameters for the submissions already stored for an attempt.
+
+    Bounded to the idempotency window so the planner only visits the most
+    recent monthly partitions of submissions; `before_window` looks at the
+    older ones instead.
+    """
+    params = {
+        "user_id": user_id,
+        "attempt_id": attempt_id,
+        "window_start": datetime.now(timezone.utc) - timedelta(days=settings.submission_idempotency_window_days)
+    }
+    if problem_id is None:
+        return (EARLIER_ATTEMPT if before_window else EXISTING_ATTEMPT), params
+    params["problem_id"] = problem_id
+    return (EARLIER_ATTEMPT_PROBLEM if before_window else EXISTING_ATTEMPT_PROBLEM), params
+
+
+async def find_existing_attempt(
+    db: AsyncSession,
+    user_id: int,
+    attempt_id: str,
+    problem_id: Optional[int] = None
+) -> List[Submission]:
+    """Submissions already stored for an attempt, at any age.
+
+    The idempotency window is read first. Older partitions are only read when
+    it finds nothing; compaction leaves them empty, so that is one index probe
+    each. A replay is recognised for as long as its submissions are kept.
+    """
+    for before_window in (False, True):
+        stmt, params = existing_attempt_query(user_id, attempt_id, problem_id, before_window)
+        result = await db.execute(stmt, params)
+        existing_submissions = result.scalars().all()
+        if existing_submissions:
+            return existing_submissions
+    return []
+
 
 class SubmissionService:
     @staticmethod
@@ -18,14 +128,12 @@ class SubmissionService:
         lesson_id: int,
         submission: SubmissionRequest
     ) -> SubmissionResponse:
-        existing_stmt = select(Submission).where(
-            and_(
-                Submission.user_id == user_id,
-                Submission.attempt_id == submission.attempt_id
-            )
-        )
-        existing_result = await db.execute(existing_stmt)
-        existing_submissions = existing_result.scalars().all()
+        replay = await IdempotencyService.get_response(db, user_id, submission.attempt_id)
+        if replay is not None:
+            return replay
+
+        # Attempts older than the stored responses are rebuilt from submissions
+        existing_submissions = await find_existing_attempt(db, user_id, submission.attempt_id)
 
         if existing_submissions:
             logger.info(
@@ -35,13 +143,8 @@ class SubmissionService:
             )
 
         problem_ids = [answer["problem_id"] for answer in submission.answers]
-        problems_stmt = select(Problem).where(
-            and_(
-                Problem.id.in_(problem_ids),
-                Problem.lesson_id == lesson_id
-            )
-        )
-        problems_result = await db.execute(problems_stmt)
+        problems_result = await db.execute(
+            PROBLEMS_IN_LESSON, {"problem_ids": problem_ids, "lesson_id": lesson_id})
         valid_problems = problems_result.scalars().all()
 
         if len(valid_problems) != len(problem_ids):
@@ -53,9 +156,7 @@ class SubmissionService:
 
         problem_option_ids = [answer["option_id"]
                               for answer in submission.answers]
-        problem_option_stmt = select(ProblemOption).where(
-            ProblemOption.id.in_(problem_option_ids))
-        problem_options_result = await db.execute(problem_option_stmt)
+        problem_options_result = await db.execute(OPTIONS_BY_ID, {"option_ids": problem_option_ids})
         problem_options = problem_options_result.scalars().all()
 
         problem_options_dict = {po.id: po for po in problem_options}
@@ -65,6 +166,12 @@ class SubmissionService:
         current_time = datetime.now(timezone.utc)
 
         try:
+            await ProblemStatsService.record_answers(db, user_id, [
+                (answer["problem_id"], answer["option_id"],
+                 problem_options_dict[answer["option_id"]].is_correct)
+                for answer in submission.answers
+            ])
+
             for answer_data in submission.answers:
                 problem_id = answer_data["problem_id"]
                 option_id = answer_data["option_id"]
@@ -77,6 +184,7 @@ class SubmissionService:
                 submission_record = Submission(
                     user_id=user_id,
                     problem_id=problem_id,
+                    lesson_id=lesson_id,
                     attempt_id=submission.attempt_id,
                     option_id=option_id,
                     is_correct=is_correct,
@@ -93,8 +201,7 @@ class SubmissionService:
 
                 total_xp_earned += xp_earned
 
-            user_stmt = select(User).where(User.id == user_id)
-            user_result = await db.execute(user_stmt)
+            user_result = await db.execute(USER_BY_ID, {"user_id": user_id})
             user = user_result.scalar_one_or_none()
 
             if not user:
@@ -106,15 +213,7 @@ class SubmissionService:
             user.total_xp += total_xp_earned
             user.last_activity_date = current_time
 
-            await db.commit()
-
-            try:
-                await SubmissionService._update_lesson_progress(db, user_id, lesson_id)
-                await db.commit()
-            except Exception as e:
-                logger.error(f"Error updating lesson progress: {e}")
-
-            return SubmissionResponse(
+            response = SubmissionResponse(
                 success=True,
                 message="Submission processed successfully",
                 results=results,
@@ -123,6 +222,18 @@ class SubmissionService:
                 current_streak=user.current_streak,
                 streak_increased=streak_increased
             )
+            replay = await IdempotencyService.save_response(
+                db, user_id, submission.attempt_id, ALL_ANSWERS, response)
+            if replay is None:
+                # A concurrent request for this attempt committed first: answer with its response
+                await db.rollback()
+                return await SubmissionService._answered_elsewhere(db, user_id, submission.attempt_id, ALL_ANSWERS)
+
+            await db.commit()
+            IdempotencyService.remember(user_id, submission.attempt_id, ALL_ANSWERS, replay)
+            await SubmissionService._refresh_lesson_progress(db, user_id, lesson_id)
+
+            return response
 
         except Exception as e:
             await db.rollback()
@@ -138,15 +249,11 @@ class SubmissionService:
     ) -> SubmissionResponse:
         problem_id = submission.answer['problem_id']
         problem_option_id = submission.answer['option_id']
-        existing_stmt = select(Submission).where(
-            and_(
-                Submission.user_id == user_id,
-                Submission.attempt_id == submission.attempt_id,
-                Submission.problem_id == problem_id
-            )
-        )
-        existing_result = await db.execute(existing_stmt)
-        existing_submissions = existing_result.scalars().all()
+        replay = await IdempotencyService.get_response(db, user_id, submission.attempt_id, problem_id)
+        if replay is not None:
+            return replay
+
+        existing_submissions = await find_existing_attempt(db, user_id, submission.attempt_id, problem_id)
 
         if existing_submissions:
             logger.info(
@@ -155,22 +262,15 @@ class SubmissionService:
                 db, user_id, existing_submissions
             )
 
-        problems_stmt = select(Problem).where(
-            and_(
-                Problem.id == problem_id,
-                Problem.lesson_id == lesson_id
-            )
-        )
-        problems_result = await db.execute(problems_stmt)
+        problems_result = await db.execute(
+            PROBLEM_IN_LESSON, {"problem_id": problem_id, "lesson_id": lesson_id})
         valid_problem = problems_result.scalar_one_or_none()
 
         if not valid_problem:
             raise ValueError(
                 f"Invalid problem IDs for lesson {lesson_id}: {problem_id}")
 
-        problem_option_stmt = select(ProblemOption).where(
-            ProblemOption.id == submission.answer["option_id"])
-        problem_option_result = await db.execute(problem_option_stmt)
+        problem_option_result = await db.execute(OPTION_BY_ID, {"option_id": problem_option_id})
         problem_option = problem_option_result.scalar_one_or_none()
 
         results = []
@@ -181,9 +281,13 @@ class SubmissionService:
             is_correct = problem_option.is_correct
             xp_earned = valid_problem.xp_value if is_correct else 0
 
+            await ProblemStatsService.record_answers(
+                db, user_id, [(problem_id, problem_option_id, is_correct)])
+
             submission_record = Submission(
                 user_id=user_id,
                 problem_id=problem_id,
+                lesson_id=lesson_id,
                 attempt_id=submission.attempt_id,
                 option_id=problem_option_id,
                 is_correct=is_correct,
@@ -200,8 +304,7 @@ class SubmissionService:
 
             total_xp_earned += xp_earned
 
-            user_stmt = select(User).where(User.id == user_id)
-            user_result = await db.execute(user_stmt)
+            user_result = await db.execute(USER_BY_ID, {"user_id": user_id})
             user = user_result.scalar_one_or_none()
 
             if not user:
@@ -213,15 +316,7 @@ class SubmissionService:
             user.total_xp += total_xp_earned
             user.last_activity_date = current_time
 
-            await db.commit()
-
-            try:
-                await SubmissionService._update_lesson_progress(db, user_id, lesson_id)
-                await db.commit()
-            except Exception as e:
-                logger.error(f"Error updating lesson progress: {e}")
-
-            return SubmissionResponse(
+            response = SubmissionResponse(
                 success=True,
                 message="Submission processed successfully",
                 results=results,
@@ -230,12 +325,47 @@ class SubmissionService:
                 current_streak=user.current_streak,
                 streak_increased=streak_increased
             )
+            replay = await IdempotencyService.save_response(
+                db, user_id, submission.attempt_id, problem_id, response)
+            if replay is None:
+                # A concurrent request for this attempt committed first: answer with its response
+                await db.rollback()
+                return await SubmissionService._answered_elsewhere(db, user_id, submission.attempt_id, problem_id)
+
+            await db.commit()
+            IdempotencyService.remember(user_id, submission.attempt_id, problem_id, replay)
+            await SubmissionService._refresh_lesson_progress(db, user_id, lesson_id)
+
+            return response
 
         except Exception as e:
             await db.rollback()
             logger.error(f"Error processing submission: {e}")
             raise
 
+    @staticmethod
+    async def _answered_elsewhere(
+        db: AsyncSession,
+        user_id: int,
+        attempt_id: str,
+        problem_id: int
+    ) -> SubmissionResponse:
+        """Response for an attempt another request committed first.
+
+        Its stored response, or one rebuilt from its submissions when the
+        stored response has already expired.
+        """
+        replay = await IdempotencyService.get_response(db, user_id, attempt_id, problem_id)
+        if replay is not None:
+            return replay
+        existing_submissions = await find_existing_attempt(
+            db, user_id, attempt_id, None if problem_id == ALL_ANSWERS else problem_id)
+        if not existing_submissions:
+            raise AttemptResponseMissing(f"Attempt {attempt_id} was answered concurrently and cannot be read back")
+        return await SubmissionService._build_submission_response_from_existing(
+            db, user_id, existing_submissions
+        )
+
     @staticmethod
     async def _build_submission_response_from_existing(
         db: AsyncSession,
@@ -253,8 +383,7 @@ class SubmissionService:
             })
             total_xp_earned += sub.xp_earned
 
-        user_stmt = select(User).where(User.id == user_id)
-        user_result = await db.execute(user_stmt)
+        user_result = await db.execute(USER_BY_ID, {"user_id": user_id})
         user = user_result.scalar_one()
 
         return SubmissionResponse(
@@ -288,45 +417,41 @@ class SubmissionService:
             user.current_streak = 1
             return True
 
+    @staticmethod
+    async def _refresh_lesson_progress(db: AsyncSession, user_id: int, lesson_id: int):
+        """Hand the progress update to the background recomputer, or run it inline when it cannot take it"""
+        if progress_recomputer.enqueue(user_id, lesson_id):
+            return
+        try:
+            await SubmissionService._update_lesson_progress(db, user_id, lesson_id)
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Error updating lesson progress: {e}")
+
     @staticmethod
     async def _update_lesson_progress(db: AsyncSession, user_id: int, lesson_id: int):
-        progress_stmt = select(UserProgress).where(
-            and_(UserProgress.user_id == user_id,
-                 UserProgress.lesson_id == lesson_id)
-        )
-        progress_result = await db.execute(progress_stmt)
+        params = {"user_id": user_id, "lesson_id": lesson_id}
+        progress_result = await db.execute(PROGRESS_FOR_LESSON, params)
         progress = progress_result.scalar_one_or_none()
 
         if not progress:
-            progress = UserProgress(
-                user_id=user_id,
-                lesson_id=lesson_id,
-                is_completed=False,
-                completion_percentage=0
-            )
-            db.add(progress)
+            await db.execute(INSERT_PROGRESS, params)
+            progress_result = await db.execute(PROGRESS_FOR_LESSON, params)
+            progress = progress_result.scalar_one()
 
         # Calculate completion percentage
-        total_problems_stmt = select(func.count(Problem.id)).where(
-            Problem.lesson_id == lesson_id)
-        total_problems_result = await db.execute(total_problems_stmt)
+        total_problems_result = await db.execute(LESSON_PROBLEM_COUNT, {"lesson_id": lesson_id})
         total_problems = total_problems_result.scalar()
 
         # Count correct submissions for this lesson
-        correct_submissions_stmt = select(func.count(func.distinct(Submission.problem_id))).where(
-            and_(
-                Submission.user_id == user_id,
-                Submission.is_correct == True,
-                Submission.problem_id.in_(
-                    select(Problem.id).where(Problem.lesson_id == lesson_id)
-                )
-            )
-        )
-        correct_submissions_result = await db.execute(correct_submissions_stmt)
+        correct_submissions_result = await db.execute(LESSON_SOLVED_COUNT, params)
         correct_submissions = correct_submissions_result.scalar()
 
-        completion_percentage = int(
-            (correct_submissions / total_problems) * 100) if total_problems > 0 else 0
+        # Integer arithmetic, as UPSERT_PROGRESS and the progress rebuild do in SQL;
+        # answers to problems since moved to another lesson can exceed the total
+        completion_percentage = (
+            min(correct_submissions, total_problems) * 100 // total_problems if total_problems > 0 else 0)
         is_completed = completion_percentage == 100
 
         progress.completion_percentage = completion_percentage
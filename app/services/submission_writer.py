@@ -0,0 +1,470 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert, bindparam
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+import asyncio
+import logging
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import metrics
+from app.core.statements import hot
+from app.models import User, Submission, IdempotentResponse
+from app.schemas import SubmissionResponse, SingleSubmissionRequest
+from app.services.idempotency_service import IdempotencyService
+from app.services.problem_stats_service import ProblemStatsService
+from app.services.submission_service import (
+    SubmissionService, find_existing_attempt, PROBLEM_IN_LESSON, OPTION_BY_ID
+)
+
+logger = logging.getLogger(__name__)
+
+USER_STATE = hot(select(
+    User.total_xp, User.current_streak, User.last_activity_date
+).where(User.id == bindparam("user_id")))
+
+
+class SubmissionQueueFull(Exception):
+    """Raised when the write-behind queue stays full past the enqueue timeout"""
+
+
+class GradedAnswer(NamedTuple):
+    is_correct: bool
+    xp_earned: int
+
+
+class PendingAnswer:
+    __slots__ = (
+        "user_id", "lesson_id", "problem_id", "option_id", "attempt_id",
+        "is_correct", "xp_earned", "submitted_at", "replay", "future"
+    )
+
+    def __init__(self, user_id, lesson_id, problem_id, option_id, attempt_id,
+                 is_correct, xp_earned, submitted_at, replay, future=None):
+        self.user_id = user_id
+        self.lesson_id = lesson_id
+        self.problem_id = problem_id
+        self.option_id = option_id
+        self.attempt_id = attempt_id
+        self.is_correct = is_correct
+        self.xp_earned = xp_earned
+        self.submitted_at = submitted_at
+        self.replay = replay  # stored with the row, answered to replays once committed
+        self.future = future
+
+    @property
+    def key(self) -> Tuple[int, str, int]:
+        return (self.user_id, self.attempt_id, self.problem_id)
+
+    def as_row(self) -> dict:
+        return {
+            "user_id": self.user_id,
+            "problem_id": self.problem_id,
+            "lesson_id": self.lesson_id,
+            "attempt_id": self.attempt_id,
+            "option_id": self.option_id,
+            "is_correct": self.is_correct,
+            "xp_earned": self.xp_earned,
+            "submitted_at": self.submitted_at
+        }
+
+    def as_response_row(self) -> dict:
+        return {
+            "user_id": self.user_id,
+            "attempt_id": self.attempt_id,
+            "problem_id": self.problem_id,
+            "response": self.replay.model_dump(mode="json")
+        }
+
+
+class SubmissionWriter:
+    """Write-behind path for single-answer submissions.
+
+    Answers are graded on the request path and answered from an in-memory
+    projection of the user's XP and streak, while a flusher persists them in
+    batched transactions (group commit). Capacity is bounded by a semaphore
+    held from enqueue until the answer has been written.
+    """
+
+    def __init__(
+        self,
+        queue_size: int,
+        batch_size: int,
+        flush_interval_ms: int,
+        enqueue_timeout_ms: int,
+        durability: str = "flush"
+    ):
+        if durability not in ("enqueue", "flush"):
+            raise ValueError(f"Unknown write-behind durability: {durability}")
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.enqueue_timeout = enqueue_timeout_ms / 1000
+        self.durability = durability
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._capacity: Optional[asyncio.Semaphore] = None
+        self._task: Optional[asyncio.Task] = None
+        # Answers accepted but not yet committed, for idempotent replays
+        self._pending: Dict[Tuple[int, str, int], PendingAnswer] = {}
+        # Projected user state (total_xp, current_streak, last_activity_date)
+        # while the user still has answers in flight
+        self._projected_users: Dict[int, SimpleNamespace] = {}
+        # The committed state each projection was built on, advanced as the
+        # user's answers are written
+        self._committed_users: Dict[int, SimpleNamespace] = {}
+        self._pending_per_user: Dict[int, int] = {}
+        self._flush_epoch = 0
+
+    @classmethod
+    def from_settings(cls) -> "SubmissionWriter":
+        return cls(
+            queue_size=settings.write_behind_queue_size,
+            batch_size=settings.write_behind_batch_size,
+            flush_interval_ms=settings.write_behind_flush_interval_ms,
+            enqueue_timeout_ms=settings.write_behind_enqueue_timeout_ms,
+            durability=settings.write_behind_durability
+        )
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._capacity = asyncio.Semaphore(self.queue_size)
+        self._task = asyncio.create_task(self._run(), name="submission-writer")
+        logger.info(
+            f"Write-behind submissions enabled (durability={self.durability}, "
+            f"batch={self.batch_size}, interval={self.flush_interval * 1000:.0f}ms)")
+
+    async def stop(self):
+        """Flush everything still queued and stop the flusher"""
+        if not self.running:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def submit_single(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        lesson_id: int,
+        submission: SingleSubmissionRequest
+    ) -> SubmissionResponse:
+        if not self.running:
+            raise RuntimeError("Submission writer is not running")
+
+        problem_id = submission.answer['problem_id']
+        problem_option_id = submission.answer['option_id']
+        key = (user_id, submission.attempt_id, problem_id)
+
+        pending = self._pending.get(key)
+        if pending:
+            return pending.replay
+
+        graded = await self._grade(db, user_id, lesson_id, submission)
+        if isinstance(graded, SubmissionResponse):
+            return graded
+
+        # The flusher needs a connection from the same pool: never hold one
+        # while waiting for capacity or for the flush
+        await db.close()
+        try:
+            await asyncio.wait_for(self._capacity.acquire(), timeout=self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            raise SubmissionQueueFull("Submission queue is full, retry later")
+
+        try:
+            user_state = await self._load_user_state(db, user_id)
+        except BaseException:
+            self._capacity.release()
+            raise
+
+        # From here to the enqueue there is no await, so the projection and
+        # the pending map are updated atomically with respect to other requests
+        pending = self._pending.get(key)
+        if pending:
+            self._capacity.release()
+            return pending.replay
+
+        # The user's committed state, kept to rebuild the projection from
+        committed = SimpleNamespace(**vars(user_state))
+        current_time = datetime.now(timezone.utc)
+        streak_increased = SubmissionService._update_user_streak(user_state, current_time)
+        user_state.total_xp += graded.xp_earned
+        user_state.last_activity_date = current_time
+        response = SubmissionResponse(
+            success=True,
+            message="Submission processed successfully",
+            results=[{
+                "problem_id": problem_id,
+                "is_correct": graded.is_correct,
+                "xp_earned": graded.xp_earned
+            }],
+            total_xp_earned=graded.xp_earned,
+            new_total_xp=user_state.total_xp,
+            current_streak=user_state.current_streak,
+            streak_increased=streak_increased
+        )
+
+        future = None
+        if self.durability == "flush":
+            future = asyncio.get_running_loop().create_future()
+            # Mark a failed flush as retrieved even if the client has gone away
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+        pending = PendingAnswer(
+            user_id=user_id,
+            lesson_id=lesson_id,
+            problem_id=problem_id,
+            option_id=problem_option_id,
+            attempt_id=submission.attempt_id,
+            is_correct=graded.is_correct,
+            xp_earned=graded.xp_earned,
+            submitted_at=current_time,
+            replay=IdempotencyService.replay_of(response),
+            future=future
+        )
+        self._pending[key] = pending
+        if user_id not in self._projected_users:
+            self._committed_users[user_id] = committed
+        self._projected_users[user_id] = user_state
+        self._pending_per_user[user_id] = self._pending_per_user.get(user_id, 0) + 1
+        self._queue.put_nowait(pending)
+
+        if future is not None:
+            # The user state read above checked a connection out again
+            await db.close()
+            # Shield so a disconnecting client does not cancel the shared flush
+            answered_elsewhere = await asyncio.shield(future)
+            if answered_elsewhere is not None:
+                return answered_elsewhere
+
+        return response
+
+    async def _grade(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        lesson_id: int,
+        submission: SingleSubmissionRequest
+    ) -> Union[SubmissionResponse, GradedAnswer]:
+        """Stored response of a replayed attempt, or the grade of a new answer"""
+        problem_id = submission.answer['problem_id']
+        replay = await IdempotencyService.get_response(db, user_id, submission.attempt_id, problem_id)
+        if replay is not None:
+            return replay
+
+        existing_submissions = await find_existing_attempt(db, user_id, submission.attempt_id, problem_id)
+
+        if existing_submissions:
+            logger.info(
+                f"Returning existing submission results for attempt_id: {submission.attempt_id}")
+            return await SubmissionService._build_submission_response_from_existing(
+                db, user_id, existing_submissions
+            )
+
+        problems_result = await db.execute(
+            PROBLEM_IN_LESSON, {"problem_id": problem_id, "lesson_id": lesson_id})
+        valid_problem = problems_result.scalar_one_or_none()
+
+        if not valid_problem:
+            raise ValueError(
+                f"Invalid problem IDs for lesson {lesson_id}: {problem_id}")
+
+        problem_option_result = await db.execute(OPTION_BY_ID, {"option_id": submission.answer['option_id']})
+        problem_option = problem_option_result.scalar_one_or_none()
+        is_correct = problem_option.is_correct
+        return GradedAnswer(is_correct, valid_problem.xp_value if is_correct else 0)
+
+    async def _load_user_state(self, db: AsyncSession, user_id: int) -> SimpleNamespace:
+        while True:
+            projected = self._projected_users.get(user_id)
+            if projected is not None:
+                return projected
+
+            epoch = self._flush_epoch
+            user_result = await db.execute(USER_STATE, {"user_id": user_id})
+            user = user_result.one_or_none()
+
+            if not user:
+                raise ValueError(f"User {user_id} not found")
+
+            # A flush committed while we were reading: the row may predate it
+            if epoch == self._flush_epoch or user_id in self._projected_users:
+                projected = self._projected_users.get(user_id)
+                if projected is not None:
+                    return projected
+                return SimpleNamespace(
+                    total_xp=user.total_xp,
+                    current_streak=user.current_streak,
+                    last_activity_date=user.last_activity_date
+                )
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = asyncio.get_running_loop().time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+        # Drain whatever was accepted before shutdown
+        remaining = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                remaining.append(item)
+        for start in range(0, len(remaining), self.batch_size):
+            await self._flush(remaining[start:start + self.batch_size])
+
+    async def _flush(self, batch: List[PendingAnswer]):
+        try:
+            answered_elsewhere = await self._persist(batch)
+        except Exception as e:
+            logger.error(f"Error flushing {len(batch)} queued submissions, retrying one by one: {e}")
+            for answer in batch:
+                try:
+                    answered_elsewhere = await self._persist([answer])
+                except Exception as item_error:
+                    logger.error(
+                        f"Dropping queued submission {answer.key} after failed write: {item_error}")
+                    self._complete([answer], error=item_error)
+                else:
+                    self._complete([answer], answered_elsewhere)
+        else:
+            self._complete(batch, answered_elsewhere)
+
+    async def _persist(self, batch: List[PendingAnswer]) -> Dict[Tuple[int, str, int], SubmissionResponse]:
+        """Write a batch in one transaction.
+
+        Returns the responses of the answers whose attempt another request
+        committed first; those answers are left out of every write.
+        """
+        async with AsyncSessionLocal() as db:
+            try:
+                # The stored responses' primary key decides which request
+                # writes an attempt: a conflicting insert waits for the other
+                # transaction and then returns nothing. Key order keeps two
+                # overlapping batches from deadlocking.
+                saved_result = await db.execute(
+                    pg_insert(IdempotentResponse)
+                    .values([answer.as_response_row() for answer in sorted(batch, key=lambda a: a.key)])
+                    .on_conflict_do_nothing(index_elements=["user_id", "attempt_id", "problem_id"])
+                    .returning(IdempotentResponse.user_id, IdempotentResponse.attempt_id,
+                               IdempotentResponse.problem_id)
+                )
+                saved = {tuple(row) for row in saved_result.all()}
+                answered_elsewhere = {}
+                for answer in batch:
+                    if answer.key not in saved:
+                        metrics.inc("idempotency.concurrent_duplicates")
+                        answered_elsewhere[answer.key] = await SubmissionService._answered_elsewhere(
+                            db, *answer.key)
+                written = [answer for answer in batch if answer.key in saved]
+
+                by_user: Dict[int, List[PendingAnswer]] = {}
+                for answer in written:
+                    by_user.setdefault(answer.user_id, []).append(answer)
+
+                # Counters must see the state before this batch's rows exist
+                for user_id, answers in sorted(by_user.items()):
+                    await ProblemStatsService.record_answers(db, user_id, [
+                        (answer.problem_id, answer.option_id, answer.is_correct) for answer in answers
+                    ])
+
+                if written:
+                    await db.execute(insert(Submission), [answer.as_row() for answer in written])
+
+                    users_stmt = (
+                        select(User)
+                        .where(User.id.in_(by_user.keys()))
+                        .order_by(User.id)
+                        .with_for_update()
+                    )
+                    users_result = await db.execute(users_stmt)
+                    for user in users_result.scalars().all():
+                        for answer in sorted(by_user[user.id], key=lambda a: a.submitted_at):
+                            self._apply(user, answer)
+
+                for user_id, lesson_id in sorted({(a.user_id, a.lesson_id) for a in written}):
+                    await SubmissionService._update_lesson_progress(db, user_id, lesson_id)
+
+                await db.commit()
+                return answered_elsewhere
+            except Exception:
+                await db.rollback()
+                raise
+
+    @staticmethod
+    def _apply(user, answer: PendingAnswer):
+        """Fold one answer into a user's XP and streak"""
+        SubmissionService._update_user_streak(user, answer.submitted_at)
+        user.total_xp += answer.xp_earned
+        user.last_activity_date = answer.submitted_at
+
+    def _complete(
+        self,
+        batch: List[PendingAnswer],
+        answered_elsewhere: Optional[Dict[Tuple[int, str, int], SubmissionResponse]] = None,
+        error: Optional[Exception] = None
+    ):
+        answered_elsewhere = answered_elsewhere or {}
+        self._flush_epoch += 1
+        # Users with an answer whose XP and streak are in the projection but
+        # were not written
+        stale = set()
+        for answer in batch:
+            self._pending.pop(answer.key, None)
+            remaining = self._pending_per_user.get(answer.user_id, 0) - 1
+            if remaining <= 0:
+                self._pending_per_user.pop(answer.user_id, None)
+                self._projected_users.pop(answer.user_id, None)
+                self._committed_users.pop(answer.user_id, None)
+            else:
+                self._pending_per_user[answer.user_id] = remaining
+                if error is None and answer.key not in answered_elsewhere:
+                    self._apply(self._committed_users[answer.user_id], answer)
+                else:
+                    stale.add(answer.user_id)
+            self._capacity.release()
+
+            stored = answered_elsewhere.get(answer.key)
+            if error is None:
+                IdempotencyService.remember(*answer.key, stored or answer.replay)
+            if answer.future is not None and not answer.future.done():
+                if error is None:
+                    answer.future.set_result(stored)
+                else:
+                    answer.future.set_exception(error)
+
+        # Rebuild from the committed state plus the answers still in flight
+        for user_id in stale & self._projected_users.keys():
+            projected = SimpleNamespace(**vars(self._committed_users[user_id]))
+            in_flight = [answer for answer in self._pending.values() if answer.user_id == user_id]
+            for answer in sorted(in_flight, key=lambda a: a.submitted_at):
+                self._apply(projected, answer)
+            self._projected_users[user_id] = projected
+
+
+submission_writer = SubmissionWriter.from_settings()
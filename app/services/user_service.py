@@ -1,37 +1,40 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, bindparam
 from typing import Optional
 import logging
 
+from app.core.statements import hot
 from app.models import User, Lesson, UserProgress
 from app.schemas import ProfileResponse
 
 logger = logging.getLogger(__name__)
 
+# Hot-path statements, built once; values are passed to execute()
+USER_BY_ID = hot(select(User).where(User.id == bindparam("user_id")))
+ACTIVE_LESSON_COUNT = hot(select(func.count(Lesson.id)).where(Lesson.is_active == True))
+COMPLETED_LESSON_COUNT = hot(select(func.count(UserProgress.id)).where(
+    UserProgress.user_id == bindparam("user_id"),
+    UserProgress.is_completed == True
+))
+
 
 class UserService:
     @staticmethod
     async def get_user_profile(db: AsyncSession, user_id: int) -> Optional[ProfileResponse]:
         """Get user profile with statistics"""
         # Get user
-        user_stmt = select(User).where(User.id == user_id)
-        user_result = await db.execute(user_stmt)
+        user_result = await db.execute(USER_BY_ID, {"user_id": user_id})
         user = user_result.scalar_one_or_none()
         
         if not user:
             return None
         
         # Get total lessons count
-        total_lessons_stmt = select(func.count(Lesson.id)).where(Lesson.is_active == True)
-        total_lessons_result = await db.execute(total_lessons_stmt)
+        total_lessons_result = await db.execute(ACTIVE_LESSON_COUNT)
         total_lessons = total_lessons_result.scalar()
         
         # Get completed lessons count
-        completed_lessons_stmt = select(func.count(UserProgress.id)).where(
-            UserProgress.user_id == user_id,
-            UserProgress.is_completed == True
-        )
-        completed_lessons_result = await db.execute(completed_lessons_stmt)
+        completed_lessons_result = await db.execute(COMPLETED_LESSON_COUNT, {"user_id": user_id})
         completed_lessons = completed_lessons_result.scalar()
         
         # Calculate progress percentage
@@ -0,0 +1,67 @@
+"""add problem stats counters
+
+Revision ID: 5b1f0c9d2e47
+Revises: 3aafaefa158f
+Create Date: 2026-10-18 09:12:31.418203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1f0c9d2e47'
+down_revision: Union[str, None] = '3aafaefa158f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('problem_stats',
+    sa.Column('problem_id', sa.Integer(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('correct', sa.Integer(), nullable=False),
+    sa.Column('distinct_users', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['problem_id'], ['problems.id'], ),
+    sa.PrimaryKeyConstraint('problem_id')
+    )
+    op.create_table('problem_option_stats',
+    sa.Column('option_id', sa.Integer(), nullable=False),
+    sa.Column('problem_id', sa.Integer(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('distinct_users', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['option_id'], ['problem_options.id'], ),
+    sa.ForeignKeyConstraint(['problem_id'], ['problems.id'], ),
+    sa.PrimaryKeyConstraint('option_id')
+    )
+    op.create_index('idx_option_stats_problem', 'problem_option_stats', ['problem_id'], unique=False)
+
+    # One-off backfill; from here on the counters are maintained by the submission path
+    op.execute("""
+        INSERT INTO problem_stats (problem_id, attempts, correct, distinct_users)
+        SELECT problem_id,
+               count(*),
+               count(*) FILTER (WHERE is_correct),
+               count(DISTINCT user_id)
+        FROM submissions
+        GROUP BY problem_id
+    """)
+    op.execute("""
+        INSERT INTO problem_option_stats (option_id, problem_id, attempts, distinct_users)
+        SELECT option_id,
+               min(problem_id),
+               count(*),
+               count(DISTINCT user_id)
+        FROM submissions
+        GROUP BY option_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_option_stats_problem', table_name='problem_option_stats')
+    op.drop_table('problem_option_stats')
+    op.drop_table('problem_stats')
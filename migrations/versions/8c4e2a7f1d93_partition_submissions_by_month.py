@@ -0,0 +1,137 @@
+"""partition submissions by month
+
+Revision ID: 8c4e2a7f1d93
+Revises: 5b1f0c9d2e47
+Create Date: 2026-10-18 11:40:05.772310
+
+Converts submissions into a table range-partitioned by month on
+submitted_at. The primary key becomes (id, submitted_at) because the
+partition key must be part of every unique constraint. Rows are copied
+from the old table, which is then dropped. The id sequence is kept.
+
+There is deliberately no DEFAULT partition: rows in it would block
+creating the partition of their month. Months are created ahead instead
+(at worker startup and by scripts/submission_partitions.py ensure).
+
+"""
+from datetime import date, datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c4e2a7f1d93'
+down_revision: Union[str, None] = '5b1f0c9d2e47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+
+SUBMISSION_INDEXES = [
+    ('idx_submission_attempt_problem', ['attempt_id', 'problem_id']),
+    ('idx_submission_problem_problem_problem_option', ['problem_id', 'option_id']),
+    ('idx_submission_user_attempt', ['user_id', 'attempt_id']),
+    ('idx_submission_user_problem', ['user_id', 'problem_id']),
+    ('ix_submissions_id', ['id']),
+]
+
+
+# Partition names and bounds as in app/core/partitions.py at the time of this
+# revision, copied so the migration does not change when that module does
+def add_months(value: date, months: int) -> date:
+    month = value.month - 1 + months
+    return date(value.year + month // 12, month % 12 + 1, 1)
+
+
+def create_month_partitions(first: date, last: date):
+    start = first
+    while start <= last:
+        end = add_months(start, 1)
+        op.execute(
+            f"CREATE TABLE submissions_y{start.year:04d}m{start.month:02d} PARTITION OF submissions "
+            f"FOR VALUES FROM ('{start.isoformat()} 00:00:00+00') TO ('{end.isoformat()} 00:00:00+00')"
+        )
+        start = end
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    op.rename_table('submissions', 'submissions_legacy')
+    for name, _ in SUBMISSION_INDEXES:
+        op.drop_index(name, table_name='submissions_legacy')
+    op.execute("ALTER TABLE submissions_legacy RENAME CONSTRAINT submissions_pkey TO submissions_legacy_pkey")
+
+    op.execute("""
+        CREATE TABLE submissions (
+            id integer NOT NULL DEFAULT nextval('submissions_id_seq'),
+            user_id integer NOT NULL REFERENCES users (id),
+            problem_id integer NOT NULL REFERENCES problems (id),
+            attempt_id varchar(100) NOT NULL,
+            option_id integer NOT NULL REFERENCES problem_options (id),
+            is_correct boolean NOT NULL,
+            xp_earned integer NOT NULL,
+            submitted_at timestamptz NOT NULL DEFAULT now(),
+            CONSTRAINT submissions_pkey PRIMARY KEY (id, submitted_at)
+        ) PARTITION BY RANGE (submitted_at)
+    """)
+    op.execute("ALTER SEQUENCE submissions_id_seq OWNED BY submissions.id")
+
+    oldest, newest = conn.execute(sa.text(
+        "SELECT min(submitted_at), max(submitted_at) FROM submissions_legacy")).one()
+    now = datetime.now(timezone.utc)
+    current = date(now.year, now.month, 1)
+    first, last = current, add_months(current, MONTHS_AHEAD)
+    if oldest is not None:
+        oldest, newest = oldest.astimezone(timezone.utc), newest.astimezone(timezone.utc)
+        # Every copied row needs its month, even one dated in the future
+        first = min(first, date(oldest.year, oldest.month, 1))
+        last = max(last, date(newest.year, newest.month, 1))
+    create_month_partitions(first, last)
+
+    op.execute("""
+        INSERT INTO submissions (id, user_id, problem_id, attempt_id, option_id,
+                                 is_correct, xp_earned, submitted_at)
+        SELECT id, user_id, problem_id, attempt_id, option_id,
+               is_correct, xp_earned, coalesce(submitted_at, now())
+        FROM submissions_legacy
+    """)
+    op.drop_table('submissions_legacy')
+
+    # Built after the copy; created on the parent, so every partition gets them
+    for name, columns in SUBMISSION_INDEXES:
+        op.create_index(name, 'submissions', columns, unique=False)
+
+
+def downgrade() -> None:
+    op.rename_table('submissions', 'submissions_partitioned')
+    for name, _ in SUBMISSION_INDEXES:
+        op.drop_index(name, table_name='submissions_partitioned')
+    op.execute("ALTER TABLE submissions_partitioned RENAME CONSTRAINT submissions_pkey TO submissions_partitioned_pkey")
+
+    op.create_table('submissions',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('submissions_id_seq')"), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('problem_id', sa.Integer(), nullable=False),
+    sa.Column('attempt_id', sa.String(length=100), nullable=False),
+    sa.Column('option_id', sa.Integer(), nullable=False),
+    sa.Column('is_correct', sa.Boolean(), nullable=False),
+    sa.Column('xp_earned', sa.Integer(), nullable=False),
+    sa.Column('submitted_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['option_id'], ['problem_options.id'], ),
+    sa.ForeignKeyConstraint(['problem_id'], ['problems.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("ALTER SEQUENCE submissions_id_seq OWNED BY submissions.id")
+    op.execute("""
+        INSERT INTO submissions
+        SELECT id, user_id, problem_id, attempt_id, option_id, is_correct, xp_earned, submitted_at
+        FROM submissions_partitioned
+    """)
+    op.drop_table('submissions_partitioned')
+
+    for name, columns in SUBMISSION_INDEXES:
+        op.create_index(name, 'submissions', columns, unique=False)
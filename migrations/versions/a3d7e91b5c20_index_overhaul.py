@@ -0,0 +1,113 @@
+"""index overhaul for service query shapes
+
+Revision ID: a3d7e91b5c20
+Revises: 8c4e2a7f1d93
+Create Date: 2026-10-18 14:02:47.118934
+
+Drops indexes no query uses and adds the ones the services need:
+
+* ix_<table>_id on every primary key duplicates the primary key index.
+* idx_submission_attempt_problem is never used: every attempt lookup also
+  filters on user_id, and idx_submission_user_attempt serves it.
+* idx_submission_problem_problem_problem_option was for GROUP BY reports,
+  which now read the problem_stats counters instead.
+* The lesson-progress count gets its index from d6b2f48a9e15, which adds
+  (user_id, lesson_id, is_correct, problem_id) together with the column.
+* New idx_lesson_active_order is a partial index for the active-lessons
+  listing. It replaces ix_lessons_order_index.
+* user_progress gets a unique (user_id, lesson_id) constraint. It replaces
+  idx_progress_user_lesson. Duplicate rows are removed first, keeping the
+  most advanced one.
+
+New indexes are built CONCURRENTLY, so writes are not blocked. Drops on
+the partitioned submissions table cannot be concurrent; each is a short
+metadata-only lock. An interrupted run can be re-run: an invalid index
+left by a failed concurrent build is dropped and built again, and the
+unique constraint is only added once.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d7e91b5c20'
+down_revision: Union[str, None] = '8c4e2a7f1d93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+REDUNDANT_PK_INDEXES = [
+    ('ix_lessons_id', 'lessons'),
+    ('ix_users_id', 'users'),
+    ('ix_problems_id', 'problems'),
+    ('ix_problem_options_id', 'problem_options'),
+    ('ix_user_progress_id', 'user_progress'),
+]
+
+
+def drop_if_invalid(conn, name: str, table: str):
+    """A failed CREATE INDEX CONCURRENTLY leaves an invalid index that IF NOT EXISTS would keep"""
+    invalid = conn.execute(sa.text(
+        "SELECT 1 FROM pg_index WHERE indexrelid = to_regclass(:name) AND NOT indisvalid"
+    ), {"name": name}).scalar()
+    if invalid:
+        op.drop_index(name, table_name=table, postgresql_concurrently=True)
+
+
+def upgrade() -> None:
+    # Keep the most advanced progress row per (user, lesson) before enforcing uniqueness
+    op.execute("""
+        DELETE FROM user_progress
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (
+                    PARTITION BY user_id, lesson_id
+                    ORDER BY is_completed DESC, completion_percentage DESC, id DESC
+                ) AS rank
+                FROM user_progress
+            ) ranked
+            WHERE rank > 1
+        )
+    """)
+
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+
+        drop_if_invalid(conn, 'idx_lesson_active_order', 'lessons')
+        op.create_index('idx_lesson_active_order', 'lessons', ['order_index'], unique=False,
+                        postgresql_where=sa.text('is_active'), postgresql_concurrently=True,
+                        if_not_exists=True)
+        drop_if_invalid(conn, 'uq_progress_user_lesson', 'user_progress')
+        op.create_index('uq_progress_user_lesson', 'user_progress', ['user_id', 'lesson_id'], unique=True,
+                        postgresql_concurrently=True, if_not_exists=True)
+        constrained = conn.execute(sa.text(
+            "SELECT 1 FROM pg_constraint WHERE conname = 'uq_progress_user_lesson' "
+            "AND conrelid = 'user_progress'::regclass"
+        )).scalar()
+        if not constrained:
+            op.execute("ALTER TABLE user_progress ADD CONSTRAINT uq_progress_user_lesson "
+                       "UNIQUE USING INDEX uq_progress_user_lesson")
+
+        for name, table in REDUNDANT_PK_INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_lessons_order_index', table_name='lessons', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('idx_progress_user_lesson', table_name='user_progress', postgresql_concurrently=True, if_exists=True)
+
+    op.drop_index('ix_submissions_id', table_name='submissions')
+    op.drop_index('idx_submission_attempt_problem', table_name='submissions')
+    op.drop_index('idx_submission_problem_problem_problem_option', table_name='submissions')
+
+
+def downgrade() -> None:
+    op.create_index('idx_submission_problem_problem_problem_option', 'submissions', ['problem_id', 'option_id'], unique=False)
+    op.create_index('idx_submission_attempt_problem', 'submissions', ['attempt_id', 'problem_id'], unique=False)
+    op.create_index('ix_submissions_id', 'submissions', ['id'], unique=False)
+
+    op.create_index('idx_progress_user_lesson', 'user_progress', ['user_id', 'lesson_id'], unique=False)
+    op.drop_constraint('uq_progress_user_lesson', 'user_progress', type_='unique')
+    op.create_index(op.f('ix_lessons_order_index'), 'lessons', ['order_index'], unique=False)
+    op.drop_index('idx_lesson_active_order', table_name='lessons')
+    for name, table in REDUNDANT_PK_INDEXES:
+        op.create_index(name, table, ['id'], unique=False)
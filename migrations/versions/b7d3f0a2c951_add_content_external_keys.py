@@ -0,0 +1,43 @@
+"""add content external keys
+
+Revision ID: b7d3f0a2c951
+Revises: f4a1c8d3e6b2
+Create Date: 2026-10-18 21:05:37.402118
+
+Stable keys by which the content loader matches lessons, problems and
+options in JSON files to existing rows. Rows created before the loader
+keep NULL keys, which unique constraints do not compare. There is no
+sensible key to invent for them here: the first load of files describing
+them adopts them instead (scripts/load_content.py --adopt), and loads
+that would duplicate them are refused.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d3f0a2c951'
+down_revision: Union[str, None] = 'f4a1c8d3e6b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('lessons', sa.Column('external_key', sa.String(length=100), nullable=True))
+    op.create_unique_constraint('uq_lesson_external_key', 'lessons', ['external_key'])
+    op.add_column('problems', sa.Column('external_key', sa.String(length=100), nullable=True))
+    op.create_unique_constraint('uq_problem_external_key', 'problems', ['external_key'])
+    op.add_column('problem_options', sa.Column('external_key', sa.String(length=100), nullable=True))
+    op.create_unique_constraint('uq_option_external_key', 'problem_options', ['external_key'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_option_external_key', 'problem_options', type_='unique')
+    op.drop_column('problem_options', 'external_key')
+    op.drop_constraint('uq_problem_external_key', 'problems', type_='unique')
+    op.drop_column('problems', 'external_key')
+    op.drop_constraint('uq_lesson_external_key', 'lessons', type_='unique')
+    op.drop_column('lessons', 'external_key')
@@ -0,0 +1,81 @@
+"""require submission lesson_id
+
+Revision ID: c1f6e3a9d5b8
+Revises: e8b4d2c6a1f7
+Create Date: 2026-10-19 09:12:44.630517
+
+Contract step of d6b2f48a9e15. Run it only once no worker of a release
+older than d6b2f48a9e15 is left, since those insert without lesson_id.
+It is kept last so a release can deploy with
+`alembic upgrade e8b4d2c6a1f7` and leave it for the next one.
+
+Each step commits on its own. A NOT VALID check is added, which only
+changes metadata. It is then validated, which scans the table without
+blocking writes. SET NOT NULL can use the validated check and skips its
+own scan, after which the check is redundant and dropped. The fill
+trigger goes too.
+
+lesson_id gets no foreign key. It is a copy of problems.lesson_id, which
+already references lessons, and validating a foreign key on the
+partitioned table would scan it while blocking writes.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c1f6e3a9d5b8'
+down_revision: Union[str, None] = 'e8b4d2c6a1f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 50000
+
+# Nothing should be left once the trigger has run for a release; rows a
+# backfill batch missed would otherwise fail the validation
+BACKFILL = sa.text("""
+    UPDATE submissions AS s
+    SET lesson_id = p.lesson_id
+    FROM problems AS p
+    WHERE p.id = s.problem_id
+      AND s.lesson_id IS NULL
+      AND s.id >= :low AND s.id < :high
+""")
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        low, high = conn.execute(sa.text("SELECT min(id), max(id) FROM submissions")).one()
+        if low is not None:
+            for start in range(low, high + 1, BATCH_SIZE):
+                conn.execute(BACKFILL, {"low": start, "high": start + BATCH_SIZE})
+
+        op.execute("ALTER TABLE submissions ADD CONSTRAINT submissions_lesson_id_not_null "
+                   "CHECK (lesson_id IS NOT NULL) NOT VALID")
+        op.execute("ALTER TABLE submissions VALIDATE CONSTRAINT submissions_lesson_id_not_null")
+        op.alter_column('submissions', 'lesson_id', nullable=False)
+        op.execute("ALTER TABLE submissions DROP CONSTRAINT submissions_lesson_id_not_null")
+
+    op.execute("DROP TRIGGER submissions_fill_lesson_id ON submissions")
+    op.execute("DROP FUNCTION submissions_fill_lesson_id()")
+
+
+def downgrade() -> None:
+    op.execute("""
+        CREATE FUNCTION submissions_fill_lesson_id() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF NEW.lesson_id IS NULL THEN
+                SELECT lesson_id INTO NEW.lesson_id FROM problems WHERE id = NEW.problem_id;
+            END IF;
+            RETURN NEW;
+        END $$
+    """)
+    op.execute("""
+        CREATE TRIGGER submissions_fill_lesson_id BEFORE INSERT ON submissions
+        FOR EACH ROW EXECUTE FUNCTION submissions_fill_lesson_id()
+    """)
+    op.alter_column('submissions', 'lesson_id', nullable=True)
@@ -0,0 +1,111 @@
+"""add lesson_id to submissions
+
+Revision ID: d6b2f48a9e15
+Revises: a3d7e91b5c20
+Create Date: 2026-10-18 16:21:09.503176
+
+Stores problems.lesson_id on each submission, so lesson-scoped queries
+(progress, per-lesson reports) are range scans on one index with no join
+to problems.
+
+This is the expand step; c1f6e3a9d5b8 is the contract step and ships in
+a later release. Here the column is only added, nullable, which changes
+metadata only, so workers of the previous release keep inserting without
+it. A BEFORE INSERT trigger fills lesson_id on their rows. Existing rows
+are backfilled in id-range batches, each committed on its own, so no
+long transaction holds row locks and nothing is scanned under a table
+lock.
+
+(user_id, lesson_id, is_correct, problem_id) is built concurrently.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6b2f48a9e15'
+down_revision: Union[str, None] = 'a3d7e91b5c20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 50000
+
+BACKFILL = sa.text("""
+    UPDATE submissions AS s
+    SET lesson_id = p.lesson_id
+    FROM problems AS p
+    WHERE p.id = s.problem_id
+      AND s.lesson_id IS NULL
+      AND s.id >= :low AND s.id < :high
+""")
+
+
+# As app/core/partitions.create_partitioned_index_concurrently did at the time
+# of this revision, copied so the migration does not change when that module does
+def create_partitioned_index_concurrently(conn, name: str, columns: str):
+    """Parent index ON ONLY (invalid, instant), then each partition's built
+    concurrently and attached; safe to re-run after an interruption"""
+    conn.execute(sa.text(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY submissions ({columns})"))
+    partitions = conn.execute(sa.text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = 'submissions'::regclass
+        ORDER BY child.relname
+    """)).scalars().all()
+    for partition in partitions:
+        child = f"{partition}_{name}"[:63]
+        # An interrupted CONCURRENTLY build leaves an invalid index behind
+        conn.execute(sa.text(f"""
+            DO $$
+            BEGIN
+                IF EXISTS (SELECT 1 FROM pg_index WHERE indexrelid = to_regclass('{child}') AND NOT indisvalid) THEN
+                    EXECUTE 'DROP INDEX {child}';
+                END IF;
+            END $$
+        """))
+        conn.execute(sa.text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {child} ON {partition} ({columns})"))
+        attached = conn.execute(sa.text(
+            "SELECT 1 FROM pg_inherits WHERE inhrelid = to_regclass(:child) AND inhparent = to_regclass(:parent)"
+        ), {"child": child, "parent": name}).scalar()
+        if not attached:
+            conn.execute(sa.text(f"ALTER INDEX {name} ATTACH PARTITION {child}"))
+
+
+def upgrade() -> None:
+    op.add_column('submissions', sa.Column('lesson_id', sa.Integer(), nullable=True))
+    # Created in the same transaction as the column, so the backfill below
+    # sees every row inserted without lesson_id
+    op.execute("""
+        CREATE FUNCTION submissions_fill_lesson_id() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF NEW.lesson_id IS NULL THEN
+                SELECT lesson_id INTO NEW.lesson_id FROM problems WHERE id = NEW.problem_id;
+            END IF;
+            RETURN NEW;
+        END $$
+    """)
+    op.execute("""
+        CREATE TRIGGER submissions_fill_lesson_id BEFORE INSERT ON submissions
+        FOR EACH ROW EXECUTE FUNCTION submissions_fill_lesson_id()
+    """)
+
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        low, high = conn.execute(sa.text("SELECT min(id), max(id) FROM submissions")).one()
+        if low is not None:
+            for start in range(low, high + 1, BATCH_SIZE):
+                conn.execute(BACKFILL, {"low": start, "high": start + BATCH_SIZE})
+
+        create_partitioned_index_concurrently(
+            conn, 'idx_submission_user_lesson_correct', 'user_id, lesson_id, is_correct, problem_id')
+
+
+def downgrade() -> None:
+    op.drop_index('idx_submission_user_lesson_correct', table_name='submissions')
+    op.execute("DROP TRIGGER submissions_fill_lesson_id ON submissions")
+    op.execute("DROP FUNCTION submissions_fill_lesson_id()")
+    op.drop_column('submissions', 'lesson_id')
@@ -0,0 +1,42 @@
+"""add idempotent responses
+
+Revision ID: e2c9a4f7b318
+Revises: d6b2f48a9e15
+Create Date: 2026-10-18 18:02:44.215730
+
+Stores the response of each submission, keyed by (user_id, attempt_id,
+problem_id), so replays are answered with the XP and streak the original
+request returned instead of the current ones. Attempts submitted before
+this table existed are still rebuilt from submissions.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2c9a4f7b318'
+down_revision: Union[str, None] = 'd6b2f48a9e15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('idempotent_responses',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('attempt_id', sa.String(length=100), nullable=False),
+    sa.Column('problem_id', sa.Integer(), nullable=False),
+    sa.Column('response', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'attempt_id', 'problem_id')
+    )
+    op.create_index('idx_idempotent_response_created', 'idempotent_responses', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_idempotent_response_created', table_name='idempotent_responses')
+    op.drop_table('idempotent_responses')
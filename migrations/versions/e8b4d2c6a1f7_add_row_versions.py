@@ -0,0 +1,53 @@
+"""add row versions to lessons and user_progress
+
+Revision ID: e8b4d2c6a1f7
+Revises: b7d3f0a2c951
+Create Date: 2026-10-19 10:31:02.214580
+
+The lessons listing ETag was built from max(updated_at), and updated_at
+is the writing transaction's start time: a transaction that started
+earlier but committed later did not move the maximum. Each row now
+carries a version that a trigger bumps on every UPDATE, so the listing
+version can sum them. Updates of one row are serialised by its row lock,
+so every committed change adds to the sum whatever the commit order.
+
+The columns have a constant default, so adding them only changes
+metadata.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b4d2c6a1f7'
+down_revision: Union[str, None] = 'b7d3f0a2c951'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ['lessons', 'user_progress']
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE FUNCTION bump_row_version() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            NEW.version := OLD.version + 1;
+            RETURN NEW;
+        END $$
+    """)
+    for table in TABLES:
+        op.add_column(table, sa.Column('version', sa.BigInteger(), server_default='1', nullable=False))
+        op.execute(f"""
+            CREATE TRIGGER {table}_bump_version BEFORE UPDATE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION bump_row_version()
+        """)
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.execute(f"DROP TRIGGER {table}_bump_version ON {table}")
+        op.drop_column(table, 'version')
+    op.execute("DROP FUNCTION bump_row_version()")
@@ -0,0 +1,47 @@
+"""add submission summaries
+
+Revision ID: f4a1c8d3e6b2
+Revises: e2c9a4f7b318
+Create Date: 2026-10-18 19:40:12.871324
+
+Per-(user, problem) summary that compaction folds old submissions into
+(first correct answer, attempt count, best XP, options picked), so the raw
+rows can be deleted. The table starts empty; nothing changes until
+partition retention (scripts/submission_partitions.py retain) runs.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4a1c8d3e6b2'
+down_revision: Union[str, None] = 'e2c9a4f7b318'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('submission_summaries',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('problem_id', sa.Integer(), nullable=False),
+    sa.Column('lesson_id', sa.Integer(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('first_correct_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('best_xp', sa.Integer(), nullable=False),
+    sa.Column('option_ids', postgresql.ARRAY(sa.Integer()), nullable=False),
+    sa.Column('compacted_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['lesson_id'], ['lessons.id'], ),
+    sa.ForeignKeyConstraint(['problem_id'], ['problems.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'problem_id')
+    )
+    op.create_index('idx_summary_user_lesson', 'submission_summaries', ['user_id', 'lesson_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_summary_user_lesson', table_name='submission_summaries')
+    op.drop_table('submission_summaries')
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+CPU and allocation benchmark for the lesson detail read path.
+
+Builds a large lesson (500 problems x 6 options by default) inside a
+transaction that is rolled back, then reads it repeatedly through the
+former ORM path (entities with selectinload) and through the column
+projection path in LessonService. It reports CPU time per read and peak
+traced memory for a single read.
+
+    python3 scripts/bench_catalog_reads.py --problems 500 --options 6 --runs 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import selectinload
+
+from app.core.database import engine, AsyncSessionLocal
+from app.models import Lesson, Problem, ProblemOption
+from app.schemas import LessonDetailResponse, ProblemResponse, ProblemOptionResponse
+from app.services import LessonService
+from app.services.lesson_service import lesson_detail_cache
+
+
+async def orm_lesson_detail(db, lesson_id):
+    """The entity-hydrating read path LessonService used before column projections"""
+    stmt = (
+        select(Lesson)
+        .options(selectinload(Lesson.problems).selectinload(Problem.options))
+        .where(Lesson.id == lesson_id)
+    )
+    lesson = (await db.execute(stmt)).scalar_one()
+    problems = []
+    for problem in sorted(lesson.problems, key=lambda p: p.order_index):
+        options = [
+            ProblemOptionResponse(id=option.id, option_text=option.option_text, order_index=option.order_index)
+            for option in sorted(problem.options, key=lambda o: o.order_index)
+        ]
+        problems.append(ProblemResponse(
+            id=problem.id, question=problem.question, problem_type=problem.problem_type,
+            xp_value=problem.xp_value, order_index=problem.order_index, options=options
+        ))
+    detail = LessonDetailResponse(
+        id=lesson.id, title=lesson.title, description=lesson.description, order_index=lesson.order_index,
+        is_active=lesson.is_active, created_at=lesson.created_at, updated_at=lesson.updated_at, problems=problems
+    )
+    # Otherwise the next run would find every entity in the identity map
+    db.expunge_all()
+    return detail
+
+
+async def projection_lesson_detail(db, lesson_id):
+    lesson_detail_cache.clear()
+    return await LessonService.get_lesson_detail(db, lesson_id)
+
+
+async def create_lesson(db, problems: int, options: int) -> int:
+    lesson_id = (await db.execute(
+        insert(Lesson).values(title="Benchmark lesson", order_index=100000, is_active=False).returning(Lesson.id)
+    )).scalar_one()
+    problem_ids = (await db.execute(
+        insert(Problem).returning(Problem.id),
+        [{"lesson_id": lesson_id, "question": f"Question {i} " + "x" * 80, "problem_type": "options",
+          "xp_value": 10, "order_index": i} for i in range(problems)]
+    )).scalars().all()
+    await db.execute(insert(ProblemOption), [
+        {"problem_id": problem_id, "option_text": f"Option {i}", "order_index": i, "is_correct": i == 0}
+        for problem_id in problem_ids for i in range(options)
+    ])
+    return lesson_id
+
+
+async def measure(db, read, lesson_id, runs: int) -> dict:
+    await read(db, lesson_id)  # warm SQLAlchemy's compiled cache and the connection
+
+    cpu_ms = []
+    for _ in range(runs):
+        started = time.process_time()
+        await read(db, lesson_id)
+        cpu_ms.append((time.process_time() - started) * 1000)
+
+    tracemalloc.start()
+    await read(db, lesson_id)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"cpu_ms_p50": statistics.median(cpu_ms), "cpu_ms_min": min(cpu_ms), "peak_kib": peak / 1024}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--problems", type=int, default=500)
+    parser.add_argument("--options", type=int, default=6)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    async with AsyncSessionLocal() as db:
+        lesson_id = await create_lesson(db, args.problems, args.options)
+        await db.flush()
+        try:
+            orm = await measure(db, orm_lesson_detail, lesson_id, args.runs)
+            projection = await measure(db, projection_lesson_detail, lesson_id, args.runs)
+            assert (await orm_lesson_detail(db, lesson_id)) == (await projection_lesson_detail(db, lesson_id))
+        finally:
+            await db.rollback()
+    await engine.dispose()
+
+    print(f"Lesson with {args.problems} problems x {args.options} options, {args.runs} runs")
+    print(f"{'':<12} {'cpu p50 ms':>12} {'cpu min ms':>12} {'peak KiB':>12}")
+    for label, result in (("orm", orm), ("projection", projection)):
+        print(f"{label:<12} {result['cpu_ms_p50']:>12.2f} {result['cpu_ms_min']:>12.2f} {result['peak_kib']:>12.0f}")
+    print(f"cpu: {orm['cpu_ms_p50'] / projection['cpu_ms_p50']:.2f}x, "
+          f"peak memory: {orm['peak_kib'] / projection['peak_kib']:.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Thundering-herd benchmark for request coalescing on catalog and profile reads.
+
+Fires a burst of identical concurrent reads, once straight through the
+services and once through SingleFlight, and reports the SQL statements
+executed in each case against the database in DATABASE_URL.
+
+    python3 scripts/bench_coalescing.py --burst 1000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, select
+
+from app.core.config import settings
+from app.core.database import engine, AsyncSessionLocal
+from app.core.singleflight import SingleFlight
+from app.models import Lesson
+from app.services import LessonService, UserService
+
+
+class QueryCounter:
+    def __init__(self):
+        self.queries = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.queries += 1
+
+
+async def burst(label, size, read, counter, flight=None, key=None):
+    async def one():
+        async with AsyncSessionLocal() as db:
+            if flight is None:
+                return await read(db)
+            return await flight.do(key, lambda: read(db))
+
+    queries_before = counter.queries
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(size)))
+    elapsed = time.perf_counter() - started
+    print(f"{label:<32} {elapsed:8.2f}s {counter.queries - queries_before:8d} queries")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--burst", type=int, default=500)
+    args = parser.parse_args()
+
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(Lesson.id).order_by(Lesson.order_index).limit(1))
+        lesson_id = result.scalar_one_or_none()
+    if lesson_id is None:
+        raise SystemExit("No lessons found, run scripts/seed_data.py first")
+
+    counter = QueryCounter()
+    reads = [
+        ("lesson detail", ("GET /api/lessons/{lesson_id}", lesson_id),
+         lambda db: LessonService.get_lesson_detail(db, lesson_id)),
+        ("lessons list", ("GET /api/lessons/", settings.demo_user_id),
+         lambda db: LessonService.get_lessons_with_progress(db, settings.demo_user_id)),
+        ("profile", ("GET /api/profiles/", settings.demo_user_id),
+         lambda db: UserService.get_user_profile(db, settings.demo_user_id)),
+    ]
+
+    print(f"{'read':<32} {'wall':>9} {'SQL':>16}")
+    for label, key, read in reads:
+        await burst(f"{label} / direct", args.burst, read, counter)
+        await burst(f"{label} / coalesced", args.burst, read, counter,
+                    flight=SingleFlight("bench"), key=key)
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
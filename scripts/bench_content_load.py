@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark the bulk content loader.
+
+Builds a synthetic bank of --problems problems (bench_content_* keys, in
+inactive lessons of --per-lesson problems, 4 options each) and times three
+loads: the initial insert, an unchanged reload and a reload with --edit-
+percent of the questions changed. The rows stay in the database; point
+DATABASE_URL at a scratch database.
+
+    python3 scripts/bench_content_load.py --problems 50000
+"""
+import argparse
+import asyncio
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+from app.services.content_loader import load_content, parse_content
+
+PREFIX = "bench_content_"
+
+
+def bank(problems: int, per_lesson: int, edited: int = 0) -> dict:
+    lessons = []
+    for lesson_number in range(problems // per_lesson + (1 if problems % per_lesson else 0)):
+        lesson_problems = []
+        for index in range(per_lesson):
+            number = lesson_number * per_lesson + index
+            if number >= problems:
+                break
+            question = f"What is {number} + 1?" + (" (revised)" if number < edited else "")
+            lesson_problems.append({
+                "key": f"{PREFIX}problem_{number}",
+                "question": question,
+                "order_index": index + 1,
+                "options": [{"option_text": str(number + delta), "is_correct": delta == 1} for delta in range(4)]
+            })
+        lessons.append({
+            "key": f"{PREFIX}lesson_{lesson_number}",
+            "title": f"Benchmark lesson {lesson_number}",
+            "order_index": 100000 + lesson_number,
+            "is_active": False,
+            "problems": lesson_problems
+        })
+    return {"lessons": lessons}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--problems", type=int, default=50000)
+    parser.add_argument("--per-lesson", type=int, default=50)
+    parser.add_argument("--edit-percent", type=float, default=1.0)
+    args = parser.parse_args()
+
+    edited = int(args.problems * args.edit_percent / 100)
+    engine = create_async_engine(settings.database_url, pool_size=1, max_overflow=0)
+    try:
+        print(f"{'load':>10} {'seconds':>8} {'problems':>9} {'options':>9}")
+        for name, document in (("initial", bank(args.problems, args.per_lesson)),
+                               ("unchanged", bank(args.problems, args.per_lesson)),
+                               ("edited", bank(args.problems, args.per_lesson, edited))):
+            result = await load_content(engine, parse_content([document]))
+            print(f"{name:>10} {result.seconds:>8.2f} {result.problems:>9} {result.options:>9}")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Measure index write amplification and service read latency.
+
+Run it before and after an index migration against the same data set:
+
+    python3 scripts/bench_indexes.py --save before.json
+    alembic upgrade head
+    python3 scripts/bench_indexes.py --compare before.json
+
+Write amplification is measured as WAL bytes and index bytes produced per
+inserted submission (rows are inserted in a transaction that is rolled
+back). Read latency is p50/p95 of each hot service query over --reads runs.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select, text
+
+from app.core.config import settings
+from app.core.database import engine, AsyncSessionLocal
+from app.models import Lesson, Problem, ProblemOption
+from app.services import LessonService, UserService, SubmissionService
+from app.services.lesson_service import lesson_detail_cache
+
+
+async def measure_writes(rows: int) -> dict:
+    async with engine.connect() as conn:
+        target = (await conn.execute(
+            select(Problem.id, Problem.lesson_id, ProblemOption.id)
+            .join(ProblemOption, ProblemOption.problem_id == Problem.id)
+            .limit(1)
+        )).one()
+        index_bytes_before = (await conn.execute(text(
+            "SELECT coalesce(sum(pg_relation_size(indexrelid)), 0) FROM pg_stat_user_indexes "
+            "WHERE relname LIKE 'submissions%'"))).scalar()
+        lsn_before = (await conn.execute(text("SELECT pg_current_wal_insert_lsn()"))).scalar()
+
+        # Still in the transaction the reads above began; rolled back below
+        started = time.perf_counter()
+        await conn.execute(text("""
+            INSERT INTO submissions (user_id, problem_id, lesson_id, attempt_id, option_id, is_correct, xp_earned,
+                                     submitted_at)
+            SELECT :user_id, :problem_id, :lesson_id, 'bench_' || g, :option_id, g % 2 = 0, 10, now()
+            FROM generate_series(1, :rows) AS g
+        """), {"user_id": settings.demo_user_id, "problem_id": target[0], "lesson_id": target[1],
+              "option_id": target[2], "rows": rows})
+        elapsed = time.perf_counter() - started
+        lsn_after = (await conn.execute(text("SELECT pg_current_wal_insert_lsn()"))).scalar()
+        wal_bytes = (await conn.execute(
+            text("SELECT pg_wal_lsn_diff(:after, :before)"), {"after": lsn_after, "before": lsn_before}
+        )).scalar()
+        index_bytes_after = (await conn.execute(text(
+            "SELECT coalesce(sum(pg_relation_size(indexrelid)), 0) FROM pg_stat_user_indexes "
+            "WHERE relname LIKE 'submissions%'"))).scalar()
+        await conn.rollback()
+
+    return {
+        "rows": rows,
+        "insert_seconds": round(elapsed, 4),
+        "wal_bytes_per_row": round(float(wal_bytes) / rows, 1),
+        "index_bytes_per_row": round(float(index_bytes_after - index_bytes_before) / rows, 1),
+    }
+
+
+async def measure_reads(runs: int) -> dict:
+    async with AsyncSessionLocal() as db:
+        lesson_id = (await db.execute(select(Lesson.id).order_by(Lesson.order_index).limit(1))).scalar_one()
+
+    def uncached_detail(db):
+        lesson_detail_cache.clear()
+        return LessonService.get_lesson_detail(db, lesson_id)
+
+    reads = {
+        "lessons_with_progress": lambda db: LessonService.get_lessons_with_progress(db, settings.demo_user_id),
+        "lesson_detail": uncached_detail,
+        "profile": lambda db: UserService.get_user_profile(db, settings.demo_user_id),
+        "lesson_progress": lambda db: SubmissionService._update_lesson_progress(db, settings.demo_user_id, lesson_id),
+    }
+    results = {}
+    async with AsyncSessionLocal() as db:
+        for name, read in reads.items():
+            timings = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                await read(db)
+                timings.append((time.perf_counter() - started) * 1000)
+                await db.rollback()
+            timings.sort()
+            results[name] = {
+                "p50_ms": round(statistics.median(timings), 3),
+                "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 3),
+            }
+    return results
+
+
+def print_comparison(before: dict, after: dict):
+    def rows(section):
+        for key, value in after[section].items():
+            if isinstance(value, dict):
+                for metric, number in value.items():
+                    yield f"{key}.{metric}", before[section].get(key, {}).get(metric), number
+            else:
+                yield key, before[section].get(key), value
+
+    for section in ("writes", "reads"):
+        print(f"\n{section}")
+        for name, old, new in rows(section):
+            change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+            print(f"  {name:<36} {old!s:>12} -> {new!s:>12}  {change}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--reads", type=int, default=200)
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="compare with results saved earlier")
+    args = parser.parse_args()
+
+    results = {"writes": await measure_writes(args.rows), "reads": await measure_reads(args.reads)}
+    await engine.dispose()
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), results)
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
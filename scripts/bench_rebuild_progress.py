@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Benchmark the parallel user_progress rebuild.
+
+Seeds --users benchmark users (bench_rebuild_<n>) answering --answers
+problems each across --lessons inactive benchmark lessons, then times the
+rebuild after a content change (one problem added to every benchmark
+lesson, then removed again, so every progress row changes) for each
+--workers value. It writes a lot of data: point DATABASE_URL at a scratch
+database.
+
+    python3 scripts/bench_rebuild_progress.py --users 1000000 --lessons 50 --answers 50 --workers 1,4,8
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+from app.core.database import get_sync_engine
+from app.services.progress_rebuild import rebuild_progress
+
+PREFIX = "bench_rebuild_"
+USER_BATCH = 100000
+
+
+def seed(users: int, lessons: int, problems_per_lesson: int, answers: int):
+    with get_sync_engine().begin() as conn:
+        if conn.execute(text("SELECT 1 FROM lessons WHERE title LIKE :prefix LIMIT 1"),
+                        {"prefix": f"{PREFIX}%"}).first():
+            print("Benchmark data already seeded")
+            return
+        lesson_ids = conn.execute(text(
+            "INSERT INTO lessons (title, order_index, is_active) "
+            "SELECT :prefix || g, 100000 + g, false FROM generate_series(1, :lessons) AS g RETURNING id"
+        ), {"prefix": PREFIX, "lessons": lessons}).scalars().all()
+        problems = conn.execute(text(
+            "INSERT INTO problems (lesson_id, question, problem_type, xp_value, order_index) "
+            "SELECT l, 'q' || g, 'options', 10, g "
+            "FROM unnest(CAST(:lesson_ids AS integer[])) AS l, generate_series(1, :per_lesson) AS g "
+            "RETURNING id, lesson_id"
+        ), {"lesson_ids": lesson_ids, "per_lesson": problems_per_lesson}).all()
+        problem_ids = [problem.id for problem in problems]
+        option_ids = {}
+        for is_correct in (True, False):
+            option_ids[is_correct] = dict(conn.execute(text(
+                "INSERT INTO problem_options (problem_id, option_text, order_index, is_correct) "
+                "SELECT p, 'o', 1, :is_correct FROM unnest(CAST(:problem_ids AS integer[])) AS p "
+                "RETURNING problem_id, id"
+            ), {"problem_ids": problem_ids, "is_correct": is_correct}).all())
+        arrays = {
+            "problem_ids": problem_ids,
+            "lesson_ids": [problem.lesson_id for problem in problems],
+            "right_ids": [option_ids[True][problem_id] for problem_id in problem_ids],
+            "wrong_ids": [option_ids[False][problem_id] for problem_id in problem_ids],
+        }
+
+    print(f"Seeding {users} users x {answers} answers over {lessons} lessons...")
+    for start in range(1, users + 1, USER_BATCH):
+        with get_sync_engine().begin() as conn:
+            user_ids = conn.execute(text(
+                "INSERT INTO users (username, total_xp, current_streak) "
+                "SELECT :prefix || g, 0, 0 FROM generate_series(:start, :stop) AS g RETURNING id"
+            ), {"prefix": PREFIX, "start": start, "stop": min(start + USER_BATCH - 1, users)}).scalars().all()
+            # Answer k of user u: a spread-out problem, correct two times in three
+            conn.execute(text("""
+                INSERT INTO submissions (user_id, problem_id, lesson_id, attempt_id, option_id,
+                                         is_correct, xp_earned, submitted_at)
+                SELECT u, p.problem_ids[i], p.lesson_ids[i], 'bench',
+                       CASE WHEN (u + k) % 3 = 0 THEN p.wrong_ids[i] ELSE p.right_ids[i] END,
+                       (u + k) % 3 <> 0, 0, now()
+                FROM unnest(CAST(:user_ids AS integer[])) AS u
+                CROSS JOIN generate_series(1, :answers) AS k
+                CROSS JOIN (SELECT CAST(:problem_ids AS integer[]) AS problem_ids,
+                                   CAST(:lesson_ids AS integer[]) AS lesson_ids,
+                                   CAST(:right_ids AS integer[]) AS right_ids,
+                                   CAST(:wrong_ids AS integer[]) AS wrong_ids) AS p
+                CROSS JOIN LATERAL (
+                    SELECT 1 + (u * 7919 + k * 104729) % cardinality(p.problem_ids) AS i
+                ) AS pick
+            """), {**arrays, "answers": answers, "user_ids": user_ids})
+        print(f"  {min(start + USER_BATCH - 1, users)} users")
+    with get_sync_engine().begin() as conn:
+        conn.execute(text("ANALYZE users, submissions, user_progress"))
+
+
+def change_content(add: bool):
+    """Add one problem to every benchmark lesson, or remove it again"""
+    with get_sync_engine().begin() as conn:
+        if add:
+            conn.execute(text(
+                "INSERT INTO problems (lesson_id, question, problem_type, xp_value, order_index) "
+                "SELECT id, 'bench_extra', 'options', 10, 1000 FROM lessons WHERE title LIKE :prefix"
+            ), {"prefix": f"{PREFIX}%"})
+        else:
+            conn.execute(text("DELETE FROM problems WHERE question = 'bench_extra'"))
+        return conn.execute(text("SELECT array_agg(id) FROM lessons WHERE title LIKE :prefix"),
+                            {"prefix": f"{PREFIX}%"}).scalar()
+
+
+async def timed_rebuild(workers: int, chunk_size: int, lesson_ids):
+    engine = create_async_engine(settings.database_url, pool_size=workers, max_overflow=0)
+    try:
+        return await rebuild_progress(engine, workers=workers, chunk_size=chunk_size, lesson_ids=lesson_ids)
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--lessons", type=int, default=50)
+    parser.add_argument("--problems-per-lesson", type=int, default=10)
+    parser.add_argument("--answers", type=int, default=20, help="answers per user")
+    parser.add_argument("--workers", default="1,4,8", help="comma-separated worker counts to compare")
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    seed(args.users, args.lessons, args.problems_per_lesson, args.answers)
+    lesson_ids = change_content(add=False)
+    print("Initial rebuild (creates the progress rows)...")
+    asyncio.run(timed_rebuild(max(int(w) for w in args.workers.split(",")), args.chunk_size, lesson_ids))
+
+    print(f"{'workers':>8} {'seconds':>10} {'rows':>12} {'rows/s':>12}")
+    add = True
+    for workers in (int(w) for w in args.workers.split(",")):
+        change_content(add)
+        add = not add
+        started = time.perf_counter()
+        result = asyncio.run(timed_rebuild(workers, args.chunk_size, lesson_ids))
+        elapsed = time.perf_counter() - started
+        print(f"{workers:>8} {elapsed:>10.1f} {result.rows_changed:>12} {result.rows_changed / elapsed:>12.0f}")
+    if not add:
+        change_content(add=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Side-by-side throughput benchmark of the single-answer submission paths.
+
+Sends the same workload through the ORM path (route lesson lookup plus
+SubmissionService.process_single_submission) and through the raw asyncpg
+fast path, at a fixed concurrency, and reports submissions per second and
+latency percentiles. Answers are spread over --users benchmark users
+(bench_single_<n>, created if missing) so row locks do not serialise the
+run. It writes real submissions: point DATABASE_URL at a scratch database.
+
+    python3 scripts/bench_single_submit.py --requests 5000 --concurrency 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.database import engine, AsyncSessionLocal, raw_connection
+from app.models import Lesson, Problem, ProblemOption, User
+from app.schemas import SingleSubmissionRequest
+from app.services import SubmissionService, FastSubmissionService
+
+
+async def orm_submit(user_id, lesson_id, submission):
+    async with AsyncSessionLocal() as db:
+        lesson = (await db.execute(select(Lesson).where(Lesson.id == lesson_id))).scalar_one_or_none()
+        assert lesson is not None
+        return await SubmissionService.process_single_submission(db, user_id, lesson_id, submission)
+
+
+async def fast_submit(user_id, lesson_id, submission):
+    async with raw_connection() as conn:
+        return await FastSubmissionService.process_single_submission(conn, user_id, lesson_id, submission)
+
+
+async def run(label, submit, workload, concurrency):
+    latencies = []
+    queue = asyncio.Queue()
+    for item in workload:
+        queue.put_nowait(item)
+
+    async def worker():
+        while not queue.empty():
+            user_id, lesson_id, problem_id, option_id = queue.get_nowait()
+            submission = SingleSubmissionRequest(
+                attempt_id=f"bench_{uuid.uuid4().hex}", answer={"problem_id": problem_id, "option_id": option_id})
+            started = time.perf_counter()
+            await submit(user_id, lesson_id, submission)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"{label:<8} {len(latencies) / elapsed:10.0f} {statistics.median(latencies):10.2f} "
+          f"{latencies[int(len(latencies) * 0.95) - 1]:10.2f} {latencies[-1]:10.2f}")
+    return len(latencies) / elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--users", type=int, default=50)
+    args = parser.parse_args()
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            insert(User)
+            .values([{"username": f"bench_single_{n}", "total_xp": 0, "current_streak": 0} for n in range(args.users)])
+            .on_conflict_do_nothing(index_elements=[User.username])
+        )
+        await db.commit()
+        user_ids = (await db.execute(
+            select(User.id).where(User.username.like("bench_single_%")).order_by(User.id).limit(args.users)
+        )).scalars().all()
+        answers = (await db.execute(
+            select(Problem.lesson_id, Problem.id, ProblemOption.id)
+            .join(ProblemOption, ProblemOption.problem_id == Problem.id)
+            .order_by(Problem.id, ProblemOption.id)
+        )).all()
+    if not answers:
+        raise SystemExit("No problems found, run scripts/seed_data.py first")
+
+    workload = [
+        (user_ids[n % len(user_ids)], *answers[n % len(answers)])
+        for n in range(args.requests)
+    ]
+
+    print(f"{'path':<8} {'req/s':>10} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10}")
+    orm = await run("orm", orm_submit, workload, args.concurrency)
+    fast = await run("fast", fast_submit, workload, args.concurrency)
+    print(f"fast path: {fast / orm:.2f}x the ORM throughput")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark single-answer submissions: direct commit path vs write-behind queue.
+
+Fires N concurrent single submissions for the demo user against the database
+in DATABASE_URL and reports wall time, requests/s and transaction commits/s.
+
+    python3 scripts/bench_write_behind.py --requests 2000 --concurrency 100
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, select
+
+from app.core.config import settings
+from app.core.database import engine, AsyncSessionLocal
+from app.models import Problem, ProblemOption
+from app.schemas import SingleSubmissionRequest
+from app.services import SubmissionService
+from app.services.submission_writer import SubmissionWriter
+
+
+class CommitCounter:
+    def __init__(self):
+        self.commits = 0
+        event.listen(engine.sync_engine, "commit", self._on_commit)
+
+    def _on_commit(self, conn):
+        self.commits += 1
+
+
+async def pick_target():
+    async with AsyncSessionLocal() as db:
+        stmt = (
+            select(Problem.lesson_id, Problem.id, ProblemOption.id)
+            .join(ProblemOption, ProblemOption.problem_id == Problem.id)
+            .order_by(Problem.id, ProblemOption.order_index)
+            .limit(1)
+        )
+        result = await db.execute(stmt)
+        row = result.one_or_none()
+        if not row:
+            raise SystemExit("No problems found, run scripts/seed_data.py first")
+        return row
+
+
+async def run(label, submit, requests, concurrency, counter):
+    lesson_id, problem_id, option_id = await pick_target()
+    limiter = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with limiter:
+            async with AsyncSessionLocal() as db:
+                submission = SingleSubmissionRequest(
+                    attempt_id=f"bench_{uuid.uuid4().hex}",
+                    answer={"problem_id": problem_id, "option_id": option_id}
+                )
+                await submit(db, settings.demo_user_id, lesson_id, submission)
+
+    commits_before = counter.commits
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    commits = counter.commits - commits_before
+    print(
+        f"{label:<24} {elapsed:8.2f}s {requests / elapsed:10.1f} req/s "
+        f"{commits:8d} commits {commits / elapsed:10.1f} commits/s")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=settings.write_behind_batch_size)
+    parser.add_argument("--flush-interval-ms", type=int, default=settings.write_behind_flush_interval_ms)
+    args = parser.parse_args()
+
+    counter = CommitCounter()
+    print(f"{'path':<24} {'wall':>9} {'throughput':>14} {'commits':>16} {'rate':>18}")
+
+    await run("direct", SubmissionService.process_single_submission,
+              args.requests, args.concurrency, counter)
+
+    for durability in ("flush", "enqueue"):
+        writer = SubmissionWriter(
+            queue_size=args.requests,
+            batch_size=args.batch_size,
+            flush_interval_ms=args.flush_interval_ms,
+            enqueue_timeout_ms=settings.write_behind_enqueue_timeout_ms,
+            durability=durability
+        )
+        await writer.start()
+        await run(f"write-behind/{durability}", writer.submit_single,
+                  args.requests, args.concurrency, counter)
+        await writer.stop()
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Startup-time report: where does `import app.main` spend its time?
+
+Runs `python -X importtime` several times in fresh interpreters and prints
+the median total, self time per top-level package and the cumulative time
+of each app module.
+
+    python3 scripts/import_time_report.py --runs 5 --top 15
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+def sample(target: str):
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise SystemExit(completed.stderr)
+
+    self_by_package = defaultdict(int)
+    cumulative_by_module = {}
+    total = 0
+    for line in completed.stderr.splitlines():
+        match = LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        self_by_package[name.split(".")[0]] += int(self_us)
+        cumulative_by_module[name] = int(cumulative_us)
+        if not indent:
+            total += int(cumulative_us)
+    return total, self_by_package, cumulative_by_module
+
+
+def median_of(samples, key):
+    return statistics.median(sample.get(key, 0) for sample in samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--target", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    runs = [sample(args.target) for _ in range(args.runs)]
+    totals = [run[0] for run in runs]
+    packages = [run[1] for run in runs]
+    modules = [run[2] for run in runs]
+
+    print(f"import {args.target}: median {statistics.median(totals) / 1000:.1f}ms "
+          f"over {args.runs} runs (min {min(totals) / 1000:.1f}ms)")
+
+    print(f"\nSelf time by top-level package (top {args.top})")
+    names = {name for run in packages for name in run}
+    ranked = sorted(names, key=lambda name: median_of(packages, name), reverse=True)
+    for name in ranked[:args.top]:
+        print(f"  {median_of(packages, name) / 1000:8.1f}ms  {name}")
+
+    print("\nCumulative time of app modules")
+    app_modules = sorted(
+        (name for name in modules[0] if name == "app" or name.startswith("app.")),
+        key=lambda name: median_of(modules, name), reverse=True
+    )
+    for name in app_modules:
+        print(f"  {median_of(modules, name) / 1000:8.1f}ms  {name}")
+
+    # Drivers that a web worker should never load
+    unexpected = [name for name in ("psycopg2", "uvicorn") if name in modules[0]]
+    if unexpected:
+        print(f"\nLoaded but unused by the API process: {', '.join(unexpected)}")
+
+
+if __name__ == "__main__":
+    main()
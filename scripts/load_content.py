@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Load lessons, problems and options from JSON files.
+
+    python3 scripts/load_content.py content/*.json
+
+Each file looks like:
+
+    {"lessons": [{"key": "arithmetic-1", "title": "Basic Arithmetic", "order_index": 1,
+                  "problems": [{"key": "arithmetic-1-1", "question": "What is 5 + 3?",
+                                "xp_value": 10, "order_index": 1,
+                                "options": [{"option_text": "8", "is_correct": true},
+                                            {"option_text": "12"}]}]}]}
+
+Only rows that differ from the database are written; rerunning with the
+same files changes nothing.
+
+Lessons and problems created by scripts/seed_data.py have no key. The first
+load of files describing them needs --adopt, which gives those rows the keys
+of the lessons, problems and options at the same order_index:
+
+    python3 scripts/load_content.py --adopt content/*.json
+"""
+import argparse
+import asyncio
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+from app.services.content_loader import load_content, read_content
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Load lesson content from JSON files")
+    parser.add_argument("paths", nargs="+", help="JSON content files")
+    parser.add_argument("--adopt", action="store_true",
+                        help="give unkeyed rows at the same order_index the keys from the files")
+    args = parser.parse_args()
+
+    try:
+        content = read_content(args.paths)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+
+    engine = create_async_engine(settings.database_url, pool_size=1, max_overflow=0)
+    try:
+        result = await load_content(engine, content, report=print, adopt=args.adopt)
+    except ValueError as error:
+        parser.error(str(error))
+    finally:
+        await engine.dispose()
+
+    print(f"Changed {result.lessons} lesson(s), {result.problems} problem(s), {result.options} option(s) "
+          f"in {result.seconds:.1f}s")
+    if result.adopted:
+        print(f"Adopted {result.adopted} unkeyed row(s)")
+    if result.stale_problems:
+        print(f"{result.stale_problems} problem(s) of these lessons are no longer in the files; they were kept")
+    if result.new_problem_lesson_ids:
+        lessons = ",".join(str(lesson_id) for lesson_id in result.new_problem_lesson_ids)
+        print(f"Lessons gained problems; refresh their progress with:\n"
+              f"    python3 scripts/rebuild_progress.py --lessons {lessons}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Recompute user_progress from submissions after a content change.
+
+    # every lesson, 8 user-id ranges at a time
+    python3 scripts/rebuild_progress.py --workers 8
+
+    # only lessons whose problems changed
+    python3 scripts/rebuild_progress.py --lessons 3,7
+
+Finished ranges are recorded in --checkpoint; rerunning the same command
+after an interruption skips them. The file is removed when the rebuild
+completes.
+"""
+import argparse
+import asyncio
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+from app.services.progress_rebuild import rebuild_progress
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Rebuild user_progress from submissions")
+    parser.add_argument("--lessons", help="comma-separated lesson ids (default: all lessons)")
+    parser.add_argument("--workers", type=int, default=4, help="ranges processed in parallel, one connection each")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="user ids per range")
+    parser.add_argument("--checkpoint", default="rebuild_progress.checkpoint.json")
+    args = parser.parse_args()
+
+    lesson_ids = None
+    if args.lessons:
+        try:
+            lesson_ids = [int(part) for part in args.lessons.split(",") if part.strip()]
+        except ValueError:
+            parser.error("--lessons must be a comma-separated list of integers")
+
+    engine = create_async_engine(settings.database_url, pool_size=args.workers, max_overflow=0)
+    try:
+        result = await rebuild_progress(
+            engine,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            lesson_ids=lesson_ids,
+            checkpoint_path=args.checkpoint,
+            report=print
+        )
+    finally:
+        await engine.dispose()
+
+    print(f"Rebuilt {result.chunks - result.skipped} of {result.chunks} range(s) "
+          f"({result.skipped} done before) in {result.seconds:.1f}s, {result.rows_changed} row(s) changed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -7,13 +7,14 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.models import User, Lesson, Problem, ProblemOption
-from app.core.database import non_async_engine
+from app.core.database import get_sync_engine
+from app.core.invalidation import invalidation_bus
 from sqlalchemy.orm import sessionmaker
 
 
 
 # Create session
-SessionLocal = sessionmaker(bind=non_async_engine)
+SessionLocal = sessionmaker(bind=get_sync_engine())
 db = SessionLocal()
 
 
@@ -485,6 +486,9 @@ def seed_data():
                     )
                     db.add(option)
 
+        # Running workers drop cached lessons once this commits
+        invalidation_bus.publish_sync(db, "lesson")
+
         # Commit all changes
         db.commit()
         print("✅ Seed data created successfully!")
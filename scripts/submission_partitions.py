@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Maintain the monthly partitions of the submissions table.
+
+    # create partitions for this month and the next N (run daily from cron)
+    python3 scripts/submission_partitions.py ensure --months-ahead 3
+
+    # fold partitions older than 13 months into submission summaries, then
+    # detach them and move them to an archive schema (or --drop them)
+    python3 scripts/submission_partitions.py retain --keep-months 13 --archive-schema archive
+
+    python3 scripts/submission_partitions.py list
+"""
+import argparse
+import os
+import sys
+from datetime import datetime, timezone
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.core.database import get_sync_engine
+from app.core.partitions import add_months, month_start, ensure_partitions, list_partitions
+from app.services.submission_compaction import compact_partitions_before
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain submissions partitions")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ensure = commands.add_parser("ensure", help="create upcoming monthly partitions")
+    ensure.add_argument("--months-ahead", type=int, default=settings.submission_partitions_months_ahead)
+
+    retain = commands.add_parser(
+        "retain", help="compact partitions past the retention period into summaries and detach them")
+    retain.add_argument("--keep-months", type=int, required=True,
+                        help="months to keep, counting the current one")
+    target = retain.add_mutually_exclusive_group()
+    target.add_argument("--archive-schema", help="move detached partitions to this schema")
+    target.add_argument("--drop", action="store_true", help="drop detached partitions")
+
+    commands.add_parser("list", help="show partitions and their ranges")
+    args = parser.parse_args()
+
+    with get_sync_engine().begin() as conn:
+        if args.command == "ensure":
+            created = ensure_partitions(conn, months_ahead=args.months_ahead)
+            print(f"Created {len(created)} partition(s): {', '.join(created) or '-'}")
+        elif args.command == "retain":
+            if args.keep_months < 1:
+                parser.error("--keep-months must be at least 1")
+            cutoff = add_months(month_start(datetime.now(timezone.utc)), 1 - args.keep_months)
+            try:
+                result = compact_partitions_before(
+                    conn, cutoff, archive_schema=args.archive_schema, drop=args.drop)
+            except ValueError as error:
+                parser.error(str(error))
+            print(f"Compacted {len(result.partitions)} partition(s) ending on or before {cutoff} "
+                  f"into {result.summaries} summary row(s) in {result.seconds:.1f}s: "
+                  f"{', '.join(result.partitions) or '-'}")
+        else:
+            for partition in list_partitions(conn):
+                print(f"{partition.name:<28} {partition.start} .. {partition.end}")
+
+
+if __name__ == "__main__":
+    main()
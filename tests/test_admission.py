@@ -0,0 +1,112 @@
+import asyncio
+import pytest
+
+from app.core.admission import AdmissionController, Rejected, RouteClass, classify
+
+
+def controller(max_in_flight=10, queue_size=10, max_wait_seconds=1.0, submission_limit=1, catalog_limit=1):
+    return AdmissionController(
+        [RouteClass("submission", submission_limit, priority=0), RouteClass("catalog", catalog_limit, priority=1)],
+        max_in_flight=max_in_flight,
+        queue_size=queue_size,
+        max_wait_seconds=max_wait_seconds
+    )
+
+
+class TestClassify:
+    """Test how requests map to route classes"""
+
+    def test_route_classes(self):
+        """Submissions, catalog reads and other API calls should get their own class"""
+        assert classify("POST", "/api/lessons/3/submit") == "submission"
+        assert classify("POST", "/api/lessons/3/single") == "submission"
+        assert classify("GET", "/api/lessons/3") == "catalog"
+        assert classify("GET", "/api/profile") == "default"
+
+    def test_health_is_never_limited(self):
+        """Health, readiness and metrics should bypass admission control"""
+        assert classify("GET", "/health/ready") is None
+        assert classify("GET", "/metrics") is None
+
+
+class TestAdmissionController:
+    """Test concurrency limits, queueing and shedding"""
+
+    @pytest.mark.asyncio
+    async def test_queued_request_runs_after_release(self):
+        """A request over the class limit should wait for a slot"""
+        admission = controller()
+        admitted_at = await admission.acquire("catalog")
+        waiter = asyncio.create_task(admission.acquire("catalog"))
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+
+        admission.release("catalog", admitted_at)
+        await asyncio.wait_for(waiter, timeout=1)
+        assert admission.in_flight == 1
+
+    @pytest.mark.asyncio
+    async def test_submissions_served_before_catalog(self):
+        """When a shared slot frees up, a waiting submission should go first"""
+        admission = controller(max_in_flight=1, catalog_limit=5)
+        admitted_at = await admission.acquire("catalog")
+        catalog = asyncio.create_task(admission.acquire("catalog"))
+        await asyncio.sleep(0)
+        submission = asyncio.create_task(admission.acquire("submission"))
+        await asyncio.sleep(0.01)
+
+        admission.release("catalog", admitted_at)
+        await asyncio.wait_for(submission, timeout=1)
+        assert not catalog.done()
+        catalog.cancel()
+
+    @pytest.mark.asyncio
+    async def test_full_queue_rejects(self):
+        """A request should be rejected at once when its queue is full"""
+        admission = controller(queue_size=1)
+        await admission.acquire("catalog")
+        waiter = asyncio.create_task(admission.acquire("catalog"))
+        await asyncio.sleep(0)
+
+        with pytest.raises(Rejected) as rejected:
+            await admission.acquire("catalog")
+        assert rejected.value.reason == "queue_full"
+        assert rejected.value.retry_after >= 1
+        waiter.cancel()
+
+    @pytest.mark.asyncio
+    async def test_expected_wait_past_deadline_rejects(self):
+        """A request that could not start before the deadline should not queue"""
+        admission = controller(max_wait_seconds=1.0)
+        admission._service_time["catalog"] = 5.0
+        await admission.acquire("catalog")
+
+        with pytest.raises(Rejected) as rejected:
+            await admission.acquire("catalog")
+        assert rejected.value.reason == "deadline"
+        assert rejected.value.retry_after == 5
+
+    @pytest.mark.asyncio
+    async def test_waiting_past_deadline_rejects(self):
+        """A queued request should be rejected when its wait reaches the deadline"""
+        admission = controller(max_wait_seconds=0.02)
+        await admission.acquire("catalog")
+
+        with pytest.raises(Rejected) as rejected:
+            await admission.acquire("catalog")
+        assert rejected.value.reason == "timeout"
+        assert len(admission._waiters["catalog"]) == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_queue(self):
+        """A client that disconnects while queued should not keep a place or a slot"""
+        admission = controller()
+        admitted_at = await admission.acquire("catalog")
+        waiter = asyncio.create_task(admission.acquire("catalog"))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        admission.release("catalog", admitted_at)
+        assert admission.in_flight == 0
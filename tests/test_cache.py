@@ -0,0 +1,105 @@
+import json
+import time
+from app.core.cache import LocalCache
+from app.core.invalidation import InvalidationBus
+
+
+class TestLocalCache:
+    """Test the bounded in-process cache"""
+    
+    def test_get_after_set(self):
+        """A stored value should be returned until evicted"""
+        cache = LocalCache("test_get", max_entries=10, ttl_seconds=60)
+        cache.set(1, "lesson")
+        
+        assert cache.get(1) == "lesson"
+        cache.evict(1)
+        assert cache.get(1) is None
+    
+    def test_lru_bound(self):
+        """The least recently used entry should go first"""
+        cache = LocalCache("test_lru", max_entries=2, ttl_seconds=60)
+        cache.set(1, "a")
+        cache.set(2, "b")
+        cache.get(1)
+        cache.set(3, "c")
+        
+        assert cache.get(1) == "a"
+        assert cache.get(2) is None
+        assert cache.get(3) == "c"
+    
+    def test_expired_entry_misses(self):
+        """Entries past their TTL should not be served"""
+        cache = LocalCache("test_ttl", max_entries=10, ttl_seconds=0.01)
+        cache.set(1, "a")
+        time.sleep(0.02)
+        
+        assert cache.get(1) is None
+    
+    def test_stale_load_is_not_stored(self):
+        """A value loaded before an invalidation should be dropped"""
+        cache = LocalCache("test_generation", max_entries=10, ttl_seconds=60)
+        generation = cache.generation
+        cache.evict(1)
+        cache.set(1, "stale", generation)
+        
+        assert cache.get(1) is None
+    
+    def test_suspended_cache_misses(self):
+        """A suspended cache neither serves nor stores"""
+        cache = LocalCache("test_suspend", max_entries=10, ttl_seconds=60)
+        cache.set(1, "a")
+        cache.suspended = True
+        
+        assert cache.get(1) is None
+
+
+class TestInvalidationBus:
+    """Test how NOTIFY payloads evict registered caches"""
+    
+    def make_bus(self):
+        bus = InvalidationBus(channel="test")
+        lessons = LocalCache("test_bus_lessons", max_entries=10, ttl_seconds=60)
+        users = LocalCache("test_bus_users", max_entries=10, ttl_seconds=60)
+        bus.register("lesson", lessons)
+        bus.register("user", users)
+        # As once the listener has connected
+        bus._suspend(False)
+        lessons.set(1, "lesson 1")
+        lessons.set(2, "lesson 2")
+        users.set(1, "user 1")
+        return bus, lessons, users
+    
+    def test_entity_id_evicts_one_key(self):
+        """A message for one lesson should only evict that lesson"""
+        bus, lessons, users = self.make_bus()
+        bus._on_notify(None, 0, "test", json.dumps({"entity": "lesson", "id": 1, "version": 3}))
+        
+        assert lessons.get(1) is None
+        assert lessons.get(2) == "lesson 2"
+        assert users.get(1) == "user 1"
+    
+    def test_entity_without_id_flushes_entity(self):
+        """A message without id should flush the whole entity"""
+        bus, lessons, users = self.make_bus()
+        bus.apply("lesson")
+        
+        assert len(lessons) == 0
+        assert users.get(1) == "user 1"
+    
+    def test_wildcard_and_garbage_flush_everything(self):
+        """Wildcards and unreadable payloads should flush every cache"""
+        bus, lessons, users = self.make_bus()
+        bus._on_notify(None, 0, "test", "not json")
+        
+        assert len(lessons) == 0 and len(users) == 0
+    
+    def test_caches_bypassed_without_listener(self):
+        """Registered caches should neither serve nor store until the listener connects"""
+        bus = InvalidationBus(channel="test")
+        lessons = LocalCache("test_bus_unheard", max_entries=10, ttl_seconds=60)
+        bus.register("lesson", lessons)
+        lessons.set(1, "lesson 1")
+        
+        assert lessons.get(1) is None
+        assert len(lessons) == 0
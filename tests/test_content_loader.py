@@ -0,0 +1,177 @@
+import asyncio
+import copy
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.services.content_loader import OptionRecord, load_content, parse_content
+from tests.pg_support import TEST_DATABASE_URL, requires_postgres, migrated_engine
+
+DOCUMENT = {"lessons": [{
+    "key": "arithmetic",
+    "title": "Basic Arithmetic",
+    "order_index": 1,
+    "problems": [
+        {"key": "add", "question": "What is 5 + 3?", "order_index": 1,
+         "options": [{"option_text": "8", "is_correct": True}, {"option_text": "12"}]},
+        {"key": "subtract", "question": "What is 12 - 7?", "xp_value": 20, "order_index": 2,
+         "options": [{"option_text": "5", "is_correct": True}, {"option_text": "6"}]},
+    ]
+}]}
+
+
+class TestParseContent:
+    """Test flattening JSON documents into records"""
+
+    def test_defaults(self):
+        """Options should get positional order and keys, problems the default type and XP"""
+        content = parse_content([DOCUMENT])
+
+        assert content.problems[0].problem_type == "options"
+        assert content.problems[0].xp_value == 10
+        assert content.options[1] == OptionRecord("add/2", "add", "12", 2, False)
+        assert len(content.options) == 4
+
+    def test_duplicate_key_refused(self):
+        """The same problem key twice would make the diff ambiguous"""
+        document = copy.deepcopy(DOCUMENT)
+        document["lessons"][0]["problems"][1]["key"] = "add"
+
+        with pytest.raises(ValueError, match="duplicate problem key"):
+            parse_content([document])
+
+    def test_missing_field_names_the_problem(self):
+        """Errors should say where the bad record is"""
+        document = copy.deepcopy(DOCUMENT)
+        del document["lessons"][0]["problems"][1]["question"]
+
+        with pytest.raises(ValueError, match="problem subtract: missing \"question\""):
+            parse_content([document], ["bank.json"])
+
+
+@pytest.fixture(scope="module")
+def pg_engine():
+    engine = migrated_engine()
+    yield engine
+    engine.dispose()
+
+
+async def load(document, adopt=False):
+    engine = create_async_engine(TEST_DATABASE_URL)
+    try:
+        return await load_content(engine, parse_content([document]), adopt=adopt)
+    finally:
+        await engine.dispose()
+
+
+@requires_postgres
+class TestLoadContent:
+    """Test diff-based loads against a real database"""
+
+    def test_initial_load_inserts_everything(self, pg_engine):
+        """A first load should create every lesson, problem and option"""
+        result = asyncio.run(load(DOCUMENT))
+
+        assert (result.lessons, result.problems, result.options) == (1, 2, 4)
+        assert result.new_problem_lesson_ids == result.lesson_ids
+
+    def test_unchanged_reload_writes_nothing(self, pg_engine):
+        """Loading the same files again should not touch any row"""
+        result = asyncio.run(load(DOCUMENT))
+
+        assert (result.lessons, result.problems, result.options) == (0, 0, 0)
+        assert result.lesson_ids == []
+
+    def test_edit_updates_only_that_row(self, pg_engine):
+        """Changing one option should update it in place and mark its lesson changed"""
+        document = copy.deepcopy(DOCUMENT)
+        document["lessons"][0]["problems"][0]["options"][1]["option_text"] = "13"
+        with pg_engine.connect() as conn:
+            option_id = conn.execute(text("SELECT id FROM problem_options WHERE external_key = 'add/2'")).scalar()
+
+        result = asyncio.run(load(document))
+        with pg_engine.connect() as conn:
+            row = conn.execute(text(
+                "SELECT id, option_text FROM problem_options WHERE external_key = 'add/2'")).one()
+
+        assert (result.lessons, result.problems, result.options) == (0, 0, 1)
+        assert len(result.lesson_ids) == 1
+        assert result.new_problem_lesson_ids == []
+        assert tuple(row) == (option_id, "13")
+
+    def test_missing_problem_kept_and_counted(self, pg_engine):
+        """Problems dropped from the files should stay, reported as stale"""
+        document = copy.deepcopy(DOCUMENT)
+        del document["lessons"][0]["problems"][1]
+
+        result = asyncio.run(load(document))
+
+        assert result.stale_problems == 1
+
+    def test_moving_problem_refused(self, pg_engine):
+        """A problem may not change lessons; the whole load should roll back"""
+        document = copy.deepcopy(DOCUMENT)
+        moved = document["lessons"][0]["problems"].pop()
+        document["lessons"].append({"key": "other", "title": "Other", "order_index": 2, "problems": [moved]})
+
+        with pytest.raises(ValueError, match="subtract"):
+            asyncio.run(load(document))
+        with pg_engine.connect() as conn:
+            assert conn.execute(text("SELECT count(*) FROM lessons WHERE external_key = 'other'")).scalar() == 0
+
+
+LEGACY = {"lessons": [{
+    "key": "legacy",
+    "title": "Seeded Lesson",
+    "order_index": 5,
+    "problems": [
+        {"key": "legacy-1", "question": "What is 2 + 2?", "order_index": 1,
+         "options": [{"option_text": "4", "is_correct": True}, {"option_text": "5 (edited)"}]},
+    ]
+}]}
+
+
+def seed_unkeyed(engine):
+    """Rows as scripts/seed_data.py creates them, without external keys"""
+    with engine.begin() as conn:
+        lesson_id = conn.execute(text(
+            "INSERT INTO lessons (title, order_index, is_active) VALUES ('Seeded Lesson', 5, true) "
+            "RETURNING id")).scalar()
+        problem_id = conn.execute(text(
+            "INSERT INTO problems (lesson_id, question, problem_type, xp_value, order_index) "
+            "VALUES (:lesson_id, 'What is 2 + 2?', 'options', 10, 1) RETURNING id"), {"lesson_id": lesson_id}).scalar()
+        conn.execute(text(
+            "INSERT INTO problem_options (problem_id, option_text, order_index, is_correct) "
+            "VALUES (:problem_id, '4', 1, true), (:problem_id, '5', 2, false)"), {"problem_id": problem_id})
+    return lesson_id, problem_id
+
+
+@requires_postgres
+class TestAdoptUnkeyedRows:
+    """Test the first load over lessons created before the loader"""
+
+    def test_adoption(self, pg_engine):
+        """Loads should refuse to duplicate unkeyed rows, and adopt them when asked"""
+        lesson_id, problem_id = seed_unkeyed(pg_engine)
+
+        with pytest.raises(ValueError, match="adopt"):
+            asyncio.run(load(LEGACY))
+        with pg_engine.connect() as conn:
+            assert conn.execute(text("SELECT count(*) FROM lessons WHERE order_index = 5")).scalar() == 1
+
+        result = asyncio.run(load(LEGACY, adopt=True))
+        with pg_engine.connect() as conn:
+            lessons = conn.execute(text("SELECT id, external_key FROM lessons WHERE order_index = 5")).all()
+            problems = conn.execute(text(
+                "SELECT id, external_key FROM problems WHERE lesson_id = :lesson_id"), {"lesson_id": lesson_id}).all()
+            options = conn.execute(text(
+                "SELECT external_key, option_text FROM problem_options WHERE problem_id = :problem_id "
+                "ORDER BY order_index"), {"problem_id": problem_id}).all()
+
+        assert result.adopted == 4
+        assert (result.lessons, result.problems, result.options) == (0, 0, 1)
+        assert [tuple(row) for row in lessons] == [(lesson_id, "legacy")]
+        assert [tuple(row) for row in problems] == [(problem_id, "legacy-1")]
+        assert [tuple(row) for row in options] == [("legacy-1/1", "4"), ("legacy-1/2", "5 (edited)")]
+        assert asyncio.run(load(LEGACY)).adopted == 0
@@ -0,0 +1,117 @@
+import asyncio
+import json
+import time
+import pytest
+from sqlalchemy.util import greenlet_spawn
+
+from app.core.deadline import (
+    DeadlineExceeded, DeadlineMiddleware, DeadlineQueue,
+    ran_out_of_time, remaining, reset_deadline, set_deadline, statement_timeout_ms
+)
+
+
+class QueryCanceled(Exception):
+    sqlstate = "57014"
+
+
+async def call(middleware, path="/api/lessons/1"):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    await middleware({"type": "http", "method": "GET", "path": path}, receive, send)
+    return sent
+
+
+class TestBudget:
+    """Test the remaining budget and its statement_timeout"""
+
+    def test_no_budget_outside_a_request(self):
+        """Background work should run without a timeout"""
+        assert remaining() is None
+        assert statement_timeout_ms() is None
+        assert not ran_out_of_time(QueryCanceled())
+
+    def test_statement_timeout_is_remaining_budget(self):
+        """The timeout should be the time left, in milliseconds"""
+        token = set_deadline(2.0)
+        try:
+            assert 1900 < statement_timeout_ms() <= 2000
+            assert ran_out_of_time(QueryCanceled())
+            assert not ran_out_of_time(ValueError())
+        finally:
+            reset_deadline(token)
+
+    def test_used_up_budget_raises(self):
+        """No query should start once the budget is gone"""
+        token = set_deadline(-0.1)
+        try:
+            with pytest.raises(DeadlineExceeded) as exceeded:
+                statement_timeout_ms()
+            assert exceeded.value.status_code == 504
+        finally:
+            reset_deadline(token)
+
+
+class TestPoolCheckout:
+    """Test that waiting for a pooled connection stops at the deadline"""
+
+    @pytest.mark.asyncio
+    async def test_checkout_wait_capped_by_budget(self):
+        """An empty pool should answer DeadlineExceeded once the budget runs out, not after pool_timeout"""
+        queue = DeadlineQueue()
+        token = set_deadline(0.05)
+        try:
+            started = time.monotonic()
+            with pytest.raises(DeadlineExceeded):
+                await greenlet_spawn(queue.get, True, 30)
+            assert time.monotonic() - started < 1
+        finally:
+            reset_deadline(token)
+
+    @pytest.mark.asyncio
+    async def test_checkout_without_budget_unchanged(self):
+        """Outside a request the queue should behave like the stock one"""
+        queue = DeadlineQueue()
+        queue.put_nowait("connection")
+        assert await greenlet_spawn(queue.get, True, 30) == "connection"
+
+
+class TestDeadlineMiddleware:
+    """Test budgets per route class and cancellation of overrunning requests"""
+
+    @pytest.mark.asyncio
+    async def test_overrunning_request_cancelled_with_504(self):
+        """A handler past its budget should be cancelled and answered with deadline_exceeded"""
+        cancelled = asyncio.Event()
+
+        async def slow_app(scope, receive, send):
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        sent = await call(DeadlineMiddleware(slow_app, {"catalog": 0.01}))
+        assert cancelled.is_set()
+        assert sent[0]["status"] == 504
+        assert json.loads(sent[1]["body"])["code"] == "deadline_exceeded"
+
+    @pytest.mark.asyncio
+    async def test_budget_visible_to_handler(self):
+        """The handler should see the budget of its route class, and only /api routes get one"""
+        seen = []
+
+        async def app(scope, receive, send):
+            seen.append(remaining())
+
+        middleware = DeadlineMiddleware(app, {"catalog": 3.0})
+        await call(middleware)
+        await call(middleware, path="/health")
+        assert 2.9 < seen[0] <= 3.0
+        assert seen[1] is None
+        assert remaining() is None
@@ -0,0 +1,249 @@
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from app.core.config import settings
+from app.schemas import SingleSubmissionRequest
+from app.services import SubmissionService, FastSubmissionService
+from app.services.fast_submission import _AnsweredConcurrently
+from app.services.submission_service import AttemptResponseMissing
+from tests.pg_support import TEST_DATABASE_URL, requires_postgres, migrated_engine
+
+ORM_USER = 1
+FAST_USER = 2
+
+# (attempt_id, problem_id, option_id); the replay repeats the first attempt
+STEPS = [
+    ("first", 1, 1),
+    ("first", 1, 1),
+    ("wrong", 2, 4),
+    ("right", 2, 3),
+    ("invalid", 999, 1),
+]
+
+
+def seed(engine):
+    yesterday = datetime.now(timezone.utc) - timedelta(days=1)
+    with engine.begin() as conn:
+        for user_id in (ORM_USER, FAST_USER):
+            conn.execute(text(
+                "INSERT INTO users (id, username, total_xp, current_streak, last_activity_date) "
+                "VALUES (:id, :name, 100, 3, :yesterday)"), {"id": user_id, "name": f"user_{user_id}", "yesterday": yesterday})
+        conn.execute(text("INSERT INTO lessons (id, title, order_index, is_active) VALUES (1, 'l', 1, true)"))
+        conn.execute(text(
+            "INSERT INTO problems (id, lesson_id, question, problem_type, xp_value, order_index) "
+            "VALUES (1, 1, 'q1', 'options', 10, 1), (2, 1, 'q2', 'options', 15, 2)"))
+        conn.execute(text(
+            "INSERT INTO problem_options (id, problem_id, option_text, order_index, is_correct) "
+            "VALUES (1, 1, 'a', 1, true), (2, 1, 'b', 2, false), (3, 2, 'c', 1, true), (4, 2, 'd', 2, false)"))
+
+
+async def run_both_paths():
+    engine = create_async_engine(TEST_DATABASE_URL)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    outcomes = []
+    try:
+        for attempt_id, problem_id, option_id in STEPS:
+            submission = SingleSubmissionRequest(
+                attempt_id=attempt_id, answer={"problem_id": problem_id, "option_id": option_id})
+            step = []
+            try:
+                async with session_factory() as db:
+                    response = await SubmissionService.process_single_submission(db, ORM_USER, 1, submission)
+                step.append(response.model_dump())
+            except ValueError as e:
+                step.append(type(e))
+            try:
+                async with engine.connect() as conn:
+                    raw = await conn.get_raw_connection()
+                    response = await FastSubmissionService.process_single_submission(
+                        raw.driver_connection, FAST_USER, 1, submission)
+                step.append(response.model_dump())
+            except ValueError as e:
+                step.append(type(e))
+            outcomes.append(step)
+    finally:
+        await engine.dispose()
+    return outcomes
+
+
+@pytest.fixture(scope="module")
+def pg_engine():
+    engine = migrated_engine()
+    seed(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def outcomes(pg_engine):
+    return asyncio.run(run_both_paths())
+
+
+@requires_postgres
+class TestFastSingleSubmission:
+    """Test that the raw asyncpg path matches the ORM path"""
+
+    def test_responses_match(self, outcomes):
+        """Every step should produce the same response (or error) on both paths"""
+        for step, (orm, fast) in zip(STEPS, outcomes):
+            assert orm == fast, step
+
+    def test_user_state_matches(self, pg_engine, outcomes):
+        """XP, streak and lesson progress should end up the same for both users"""
+        with pg_engine.connect() as conn:
+            users = conn.execute(text(
+                "SELECT total_xp, current_streak FROM users WHERE id IN (:a, :b) ORDER BY id"
+            ), {"a": ORM_USER, "b": FAST_USER}).all()
+            progress = conn.execute(text(
+                "SELECT completion_percentage, is_completed, completed_at IS NOT NULL FROM user_progress "
+                "WHERE user_id IN (:a, :b) ORDER BY user_id"
+            ), {"a": ORM_USER, "b": FAST_USER}).all()
+
+        assert users[0] == users[1]
+        assert users[0] == (125, 4)
+        assert progress[0] == progress[1] == (100, True, True)
+
+    def test_stats_counted_for_both_paths(self, pg_engine, outcomes):
+        """Counters should see the same attempts and distinct users from each path"""
+        with pg_engine.connect() as conn:
+            stats = conn.execute(text(
+                "SELECT problem_id, attempts, correct, distinct_users FROM problem_stats ORDER BY problem_id"
+            )).all()
+
+        assert stats == [(1, 2, 2, 2), (2, 4, 2, 2)]
+
+
+
+@pytest.fixture(scope="module")
+def half_done(pg_engine):
+    """Lesson 2, two problems; each user has solved one and has 50% progress"""
+    with pg_engine.begin() as conn:
+        conn.execute(text("INSERT INTO lessons (id, title, order_index, is_active) VALUES (2, 'l2', 2, true)"))
+        conn.execute(text(
+            "INSERT INTO problems (id, lesson_id, question, problem_type, xp_value, order_index) "
+            "VALUES (10, 2, 'q', 'options', 10, 1), (11, 2, 'q', 'options', 10, 2)"))
+        conn.execute(text(
+            "INSERT INTO problem_options (id, problem_id, option_text, order_index, is_correct) "
+            "VALUES (10, 10, 'a', 1, true), (11, 11, 'a', 1, true)"))
+        for user_id in (ORM_USER, FAST_USER):
+            conn.execute(text(
+                "INSERT INTO submissions (user_id, problem_id, lesson_id, attempt_id, option_id, is_correct, xp_earned) "
+                "VALUES (:user_id, 10, 2, 'half', 10, true, 10)"), {"user_id": user_id})
+            conn.execute(text(
+                "INSERT INTO user_progress (user_id, lesson_id, is_completed, completion_percentage) "
+                "VALUES (:user_id, 2, false, 50)"), {"user_id": user_id})
+    return pg_engine
+
+
+async def progress_after_concurrent_answer(user_id, update):
+    """Run `update(engine, user_id)` while another transaction holds the progress
+    row and commits the lesson's last answer; return the stored percentage"""
+    engine = create_async_engine(TEST_DATABASE_URL)
+    try:
+        async with engine.connect() as holder:
+            await holder.execute(text(
+                "SELECT 1 FROM user_progress WHERE user_id = :user_id AND lesson_id = 2 FOR UPDATE"
+            ), {"user_id": user_id})
+            await holder.execute(text(
+                "INSERT INTO submissions (user_id, problem_id, lesson_id, attempt_id, option_id, is_correct, xp_earned) "
+                "VALUES (:user_id, 11, 2, 'last', 11, true, 10)"), {"user_id": user_id})
+            task = asyncio.create_task(update(engine, user_id))
+            await asyncio.sleep(0.3)
+            await holder.commit()
+        await task
+        async with engine.connect() as conn:
+            return await conn.scalar(text(
+                "SELECT completion_percentage FROM user_progress WHERE user_id = :user_id AND lesson_id = 2"
+            ), {"user_id": user_id})
+    finally:
+        await engine.dispose()
+
+
+async def orm_progress_update(engine, user_id):
+    async with async_sessionmaker(engine)() as db:
+        await SubmissionService._update_lesson_progress(db, user_id, 2)
+        await db.commit()
+
+
+async def fast_progress_update(engine, user_id):
+    async with engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+        await FastSubmissionService._update_lesson_progress(raw.driver_connection, user_id, 2)
+
+
+@requires_postgres
+class TestProgressLock:
+    """Test that lesson progress is counted under its row lock on both paths"""
+
+    def test_orm_path_counts_after_lock(self, half_done):
+        """The ORM update should count answers committed by the transaction it waited for"""
+        assert asyncio.run(progress_after_concurrent_answer(ORM_USER, orm_progress_update)) == 100
+
+    def test_fast_path_counts_after_lock(self, half_done):
+        """The raw update should count answers committed by the transaction it waited for"""
+        assert asyncio.run(progress_after_concurrent_answer(FAST_USER, fast_progress_update)) == 100
+
+
+class TestAnsweredConcurrently:
+    """Test the fast path when another request saved the attempt first"""
+
+    @pytest.mark.asyncio
+    async def test_unreadable_response_answered_from_submissions(self, monkeypatch):
+        """Without a readable stored response the attempt should be answered again, not reported missing"""
+        calls = []
+
+        async def process(conn, user_id, lesson_id, submission, timeout):
+            calls.append(submission.attempt_id)
+            if len(calls) == 1:
+                raise _AnsweredConcurrently()
+            return "answered from the committed submissions"
+
+        async def no_stored_response(conn, key):
+            return None
+
+        monkeypatch.setattr(FastSubmissionService, "_process", staticmethod(process))
+        monkeypatch.setattr(FastSubmissionService, "_stored_response", staticmethod(no_stored_response))
+        submission = SingleSubmissionRequest(attempt_id="a", answer={"problem_id": 1, "option_id": 1})
+
+        result = await FastSubmissionService.process_single_submission(None, 1, 1, submission)
+
+        assert result == "answered from the committed submissions"
+        assert calls == ["a", "a"]
+
+
+@requires_postgres
+class TestExpiredStoredResponse:
+    """Test the fast path against a stored response that expired but was not swept yet"""
+
+    def test_attempt_reported_missing(self, pg_engine, outcomes):
+        """A conflict with nothing readable behind it should raise, not look like a missing lesson"""
+        expired = datetime.now(timezone.utc) - timedelta(hours=settings.idempotency_response_ttl_hours + 1)
+        with pg_engine.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO idempotent_responses (user_id, attempt_id, problem_id, response, created_at) "
+                "VALUES (:user_id, 'expired', 1, '{}', :expired)"), {"user_id": FAST_USER, "expired": expired})
+            before = conn.execute(text("SELECT total_xp FROM users WHERE id = :id"), {"id": FAST_USER}).scalar()
+
+        async def submit():
+            engine = create_async_engine(TEST_DATABASE_URL)
+            submission = SingleSubmissionRequest(attempt_id="expired", answer={"problem_id": 1, "option_id": 1})
+            try:
+                async with engine.connect() as conn:
+                    raw = await conn.get_raw_connection()
+                    await FastSubmissionService.process_single_submission(
+                        raw.driver_connection, FAST_USER, 1, submission)
+            finally:
+                await engine.dispose()
+
+        with pytest.raises(AttemptResponseMissing):
+            asyncio.run(submit())
+        with pg_engine.connect() as conn:
+            stored = conn.execute(text("SELECT count(*) FROM submissions WHERE attempt_id = 'expired'")).scalar()
+            after = conn.execute(text("SELECT total_xp FROM users WHERE id = :id"), {"id": FAST_USER}).scalar()
+
+        assert stored == 0
+        assert after == before
@@ -0,0 +1,167 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.core.http_cache import make_etag, etag_matches
+from app.routes.lessons import router
+from app.services import LessonService
+from app.services.lesson_service import LESSONS_VERSION
+from tests.pg_support import requires_postgres, migrated_engine
+
+
+class TestETag:
+    """Test ETag generation and If-None-Match comparison"""
+    
+    def test_same_parts_same_etag(self):
+        """The ETag should only depend on its parts"""
+        assert make_etag("lessons", 1, (None, 3)) == make_etag("lessons", 1, (None, 3))
+        assert make_etag("lessons", 1) != make_etag("lessons", 2)
+    
+    def test_etag_is_quoted(self):
+        """ETags should be quoted strong validators"""
+        etag = make_etag("lessons")
+        assert etag.startswith('"') and etag.endswith('"')
+    
+    def test_missing_header_does_not_match(self):
+        """No If-None-Match header means a full response"""
+        assert etag_matches(None, '"abc"') == False
+        assert etag_matches("", '"abc"') == False
+    
+    def test_exact_and_list_match(self):
+        """If-None-Match may list several validators"""
+        assert etag_matches('"abc"', '"abc"') == True
+        assert etag_matches('"xyz", "abc"', '"abc"') == True
+        assert etag_matches('"xyz"', '"abc"') == False
+    
+    def test_weak_comparison(self):
+        """If-None-Match uses weak comparison, so W/ prefixes are ignored"""
+        assert etag_matches('W/"abc"', '"abc"') == True
+    
+    def test_wildcard_matches(self):
+        """A wildcard matches any current representation"""
+        assert etag_matches("*", '"abc"') == True
+
+
+class FakeCatalog:
+    """Lessons service stand-in whose listing can be held while its version moves on"""
+
+    def __init__(self):
+        self.version = (1,)
+        self.release = asyncio.Event()
+        self.bodies = 0
+
+    async def get_lessons_version(self, db, user_id):
+        return self.version
+
+    async def get_lessons_with_progress(self, db, user_id):
+        self.bodies += 1
+        await self.release.wait()
+        return []
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    fake = FakeCatalog()
+    monkeypatch.setattr(LessonService, "get_lessons_version", fake.get_lessons_version)
+    monkeypatch.setattr(LessonService, "get_lessons_with_progress", fake.get_lessons_with_progress)
+    return fake
+
+
+def lessons_client():
+    async def no_db():
+        yield None
+
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_async_db] = no_db
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def lessons_etag(version):
+    return make_etag("lessons", settings.api_version, settings.demo_user_id, version)
+
+
+class TestLessonsListing:
+    """Test the ETag of GET /api/lessons/"""
+
+    @pytest.mark.asyncio
+    async def test_follower_tagged_with_leader_version(self, catalog):
+        """A request joining an older flight should get that flight's ETag, not its own newer one"""
+        async with lessons_client() as client:
+            leader = asyncio.create_task(client.get("/api/lessons/"))
+            await asyncio.sleep(0.01)
+            catalog.version = (2,)
+            follower = asyncio.create_task(client.get("/api/lessons/"))
+            await asyncio.sleep(0.01)
+            catalog.release.set()
+            responses = await asyncio.gather(leader, follower)
+
+        assert catalog.bodies == 1
+        assert [response.headers["ETag"] for response in responses] == [lessons_etag((1,))] * 2
+
+    @pytest.mark.asyncio
+    async def test_not_modified(self, catalog):
+        """A matching If-None-Match should get a 304 without reading the listing"""
+        async with lessons_client() as client:
+            response = await client.get("/api/lessons/", headers={"If-None-Match": lessons_etag((1,))})
+
+        assert response.status_code == 304
+        assert catalog.bodies == 0
+
+
+@pytest.fixture(scope="module")
+def pg_engine():
+    engine = migrated_engine()
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, username, total_xp, current_streak) VALUES (1, 'u', 0, 0)"))
+        conn.execute(text(
+            "INSERT INTO lessons (id, title, order_index, is_active) VALUES (1, 'a', 1, true), (2, 'b', 2, true)"))
+        conn.execute(text(
+            "INSERT INTO user_progress (user_id, lesson_id, is_completed, completion_percentage) "
+            "VALUES (1, 1, false, 40)"))
+    yield engine
+    engine.dispose()
+
+
+def lessons_version(engine):
+    with engine.connect() as conn:
+        return tuple(conn.execute(LESSONS_VERSION, {"user_id": 1}).one())
+
+
+@requires_postgres
+class TestLessonsVersion:
+    """Test the lessons listing version query against a real database"""
+    
+    def test_stable_without_writes(self, pg_engine):
+        """Reading twice with no write in between should give the same version"""
+        assert lessons_version(pg_engine) == lessons_version(pg_engine)
+    
+    def test_changes_on_catalog_and_progress_writes(self, pg_engine):
+        """Lesson and progress updates should both change the version"""
+        before = lessons_version(pg_engine)
+        with pg_engine.begin() as conn:
+            conn.execute(text("UPDATE lessons SET title = 'renamed' WHERE id = 1"))
+        after_lesson = lessons_version(pg_engine)
+        with pg_engine.begin() as conn:
+            conn.execute(text("UPDATE user_progress SET completion_percentage = 60 WHERE user_id = 1"))
+        
+        assert len({before, after_lesson, lessons_version(pg_engine)}) == 3
+    
+    def test_late_commit_of_earlier_transaction(self, pg_engine):
+        """A write committed after one that started later should still change the version"""
+        earlier = pg_engine.connect()
+        try:
+            earlier.execute(text("UPDATE lessons SET title = 'first', updated_at = now() WHERE id = 1"))
+            with pg_engine.begin() as later:
+                later.execute(text("UPDATE lessons SET title = 'second', updated_at = now() WHERE id = 2"))
+            seen = lessons_version(pg_engine)
+            earlier.commit()
+        finally:
+            earlier.close()
+        
+        assert lessons_version(pg_engine) != seen
@@ -0,0 +1,110 @@
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from app.schemas import SingleSubmissionRequest, SubmissionResponse
+from app.services import SubmissionService, IdempotencyService
+from app.services.idempotency_service import REPLAY_MESSAGE, response_cache
+from tests.pg_support import TEST_DATABASE_URL, requires_postgres, migrated_engine
+
+
+def original_response():
+    return SubmissionResponse(
+        success=True,
+        message="Submission processed successfully",
+        results=[{"problem_id": 1, "is_correct": True, "xp_earned": 10}],
+        total_xp_earned=10,
+        new_total_xp=110,
+        current_streak=4,
+        streak_increased=True
+    )
+
+
+class TestReplayResponse:
+    """Test what a replayed attempt answers"""
+
+    def test_replay_keeps_original_values(self):
+        """A replay should return the original XP and streak, marked as a replay"""
+        replay = IdempotencyService.replay_of(original_response())
+        assert replay.message == REPLAY_MESSAGE
+        assert replay.streak_increased is False
+        assert replay.new_total_xp == 110
+        assert replay.current_streak == 4
+        assert replay.results == original_response().results
+
+
+def seed(engine):
+    yesterday = datetime.now(timezone.utc) - timedelta(days=1)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO users (id, username, total_xp, current_streak, last_activity_date) "
+            "VALUES (1, 'user_1', 100, 3, :yesterday)"), {"yesterday": yesterday})
+        conn.execute(text("INSERT INTO lessons (id, title, order_index, is_active) VALUES (1, 'l', 1, true)"))
+        conn.execute(text(
+            "INSERT INTO problems (id, lesson_id, question, problem_type, xp_value, order_index) "
+            "VALUES (1, 1, 'q1', 'options', 10, 1)"))
+        conn.execute(text(
+            "INSERT INTO problem_options (id, problem_id, option_text, order_index, is_correct) "
+            "VALUES (1, 1, 'a', 1, true)"))
+
+
+async def submit_and_replay(pg_engine):
+    engine = create_async_engine(TEST_DATABASE_URL)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    submission = SingleSubmissionRequest(attempt_id="attempt", answer={"problem_id": 1, "option_id": 1})
+    responses = {}
+    try:
+        async with session_factory() as db:
+            responses["first"] = await SubmissionService.process_single_submission(db, 1, 1, submission)
+
+        # XP earned elsewhere must not leak into the replay
+        with pg_engine.begin() as conn:
+            conn.execute(text("UPDATE users SET total_xp = total_xp + 500 WHERE id = 1"))
+        response_cache.clear()
+        async with session_factory() as db:
+            responses["replay"] = await SubmissionService.process_single_submission(db, 1, 1, submission)
+
+        with pg_engine.begin() as conn:
+            conn.execute(text("UPDATE idempotent_responses SET created_at = now() - interval '30 days'"))
+        response_cache.clear()
+        async with session_factory() as db:
+            responses["swept"] = await IdempotencyService.sweep_expired(db, batch_size=1)
+            responses["after_sweep"] = await SubmissionService.process_single_submission(db, 1, 1, submission)
+    finally:
+        await engine.dispose()
+    return responses
+
+
+@pytest.fixture(scope="module")
+def pg_engine():
+    engine = migrated_engine()
+    seed(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def responses(pg_engine):
+    return asyncio.run(submit_and_replay(pg_engine))
+
+
+@requires_postgres
+class TestStoredResponses:
+    """Test replays answered from the stored original response"""
+
+    def test_replay_returns_original_response(self, responses):
+        """A replay should answer the XP and streak of the original request"""
+        first, replay = responses["first"], responses["replay"]
+        assert first.new_total_xp == 110
+        assert replay.new_total_xp == 110
+        assert replay.current_streak == first.current_streak
+        assert replay.streak_increased is False
+
+    def test_expired_responses_swept(self, responses):
+        """Expired responses should be deleted and replays fall back to the submissions"""
+        assert responses["swept"] == 1
+        assert responses["after_sweep"].new_total_xp == 610
+        assert responses["after_sweep"].results == responses["first"].results
@@ -0,0 +1,88 @@
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.routes.lessons import router
+from app.schemas import LessonDetailResponse
+from app.services import LessonService
+
+NOW = datetime(2026, 10, 1, tzinfo=timezone.utc)
+CATALOG = {
+    lesson_id: LessonDetailResponse(
+        id=lesson_id, title=f"Lesson {lesson_id}", order_index=lesson_id, created_at=NOW, updated_at=NOW)
+    for lesson_id in (1, 2, 3)
+}
+
+
+@pytest.fixture
+def requested(monkeypatch):
+    """Lesson ids each service call was asked for"""
+    calls = []
+
+    async def get_lesson_details(db, lesson_ids):
+        calls.append(list(lesson_ids))
+        return {lesson_id: CATALOG[lesson_id] for lesson_id in lesson_ids if lesson_id in CATALOG}
+
+    monkeypatch.setattr(LessonService, "get_lesson_details", staticmethod(get_lesson_details))
+    return calls
+
+
+@pytest.fixture
+def client():
+    async def no_db():
+        yield None
+
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_async_db] = no_db
+    return TestClient(app)
+
+
+class TestLessonBatch:
+    """Test GET /api/lessons/batch"""
+
+    def test_items_in_request_order(self, client, requested):
+        """Lessons should come back in the order they were asked for"""
+        response = client.get("/api/lessons/batch?ids=3,1")
+
+        assert response.status_code == 200
+        assert [item["id"] for item in response.json()["lessons"]] == [3, 1]
+        assert response.json()["lessons"][0]["lesson"]["title"] == "Lesson 3"
+        assert requested == [[3, 1]]
+
+    def test_unknown_ids_reported_not_found(self, client, requested):
+        """Unknown ids should get an item marked not found instead of failing the batch"""
+        response = client.get("/api/lessons/batch?ids=1,999")
+
+        assert response.status_code == 200
+        assert response.json()["lessons"][1] == {"id": 999, "found": False, "lesson": None}
+        assert response.json()["lessons"][0]["found"] is True
+
+    def test_duplicate_ids_answered_per_request_position(self, client, requested):
+        """Every requested position should get its item, duplicates included"""
+        response = client.get("/api/lessons/batch?ids=2,2,1")
+
+        assert [item["id"] for item in response.json()["lessons"]] == [2, 2, 1]
+        assert all(item["found"] for item in response.json()["lessons"])
+
+    def test_too_many_ids_refused(self, client, requested, monkeypatch):
+        """More than lesson_batch_max_ids ids should be refused before any query"""
+        monkeypatch.setattr(settings, "lesson_batch_max_ids", 3)
+
+        assert client.get("/api/lessons/batch?ids=1,2,3").status_code == 200
+        assert client.get("/api/lessons/batch?ids=1,2,3,4").status_code == 422
+        assert requested == [[1, 2, 3]]
+
+    @pytest.mark.parametrize("ids", ["1,a", "1.5", ",", ""])
+    def test_malformed_ids_refused(self, client, requested, ids):
+        """Anything but a comma-separated list of integers should be a 422"""
+        assert client.get(f"/api/lessons/batch?ids={ids}").status_code == 422
+        assert requested == []
+
+    def test_missing_ids_refused(self, client, requested):
+        """The ids parameter is required"""
+        assert client.get("/api/lessons/batch").status_code == 422
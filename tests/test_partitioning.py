@@ -0,0 +1,159 @@
+import asyncio
+import pytest
+from datetime import date, datetime, timezone, timedelta
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from app.core.config import settings
+from app.core.partitions import add_months, month_start, partition_name, ensure_partitions, list_partitions
+from app.schemas import SingleSubmissionRequest
+from app.services import SubmissionService, FastSubmissionService
+from app.services.idempotency_service import REPLAY_MESSAGE
+from app.services.submission_compaction import compact_partitions_before
+from app.services.submission_service import existing_attempt_query
+from tests.pg_support import TEST_DATABASE_URL, requires_postgres, migrated_engine, explain, scanned_relations
+
+
+class TestPartitionNames:
+    """Test month arithmetic used for partition ranges"""
+    
+    def test_add_months_wraps_years(self):
+        """Adding months should roll over into the next or previous year"""
+        assert add_months(date(2026, 11, 1), 2) == date(2027, 1, 1)
+        assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    
+    def test_partition_name(self):
+        """Partition names should sort chronologically"""
+        assert partition_name(date(2026, 3, 1)) == "submissions_y2026m03"
+        assert partition_name(date(2026, 3, 1)) < partition_name(date(2026, 10, 1))
+
+
+@pytest.fixture(scope="module")
+def pg_engine():
+    engine = migrated_engine()
+    now = datetime.now(timezone.utc)
+    old = now - timedelta(days=200)
+    with engine.begin() as conn:
+        # Retention archives into its own schema, which outlives the public one
+        conn.execute(text("DROP SCHEMA IF EXISTS archive CASCADE"))
+        ensure_partitions(conn, months_ahead=3, since=old)
+        conn.execute(text("INSERT INTO users (id, username, total_xp, current_streak) VALUES (1, 'u', 0, 0)"))
+        conn.execute(text("INSERT INTO lessons (id, title, order_index, is_active) VALUES (1, 'l', 1, true)"))
+        conn.execute(text(
+            "INSERT INTO problems (id, lesson_id, question, problem_type, xp_value, order_index) "
+            "VALUES (1, 1, 'q', 'options', 10, 1)"))
+        conn.execute(text(
+            "INSERT INTO problem_options (id, problem_id, option_text, order_index, is_correct) "
+            "VALUES (1, 1, 'a', 1, true)"))
+        for attempt_id, submitted_at in (("attempt", old), ("attempt", now), ("old_attempt", old)):
+            conn.execute(text(
+                "INSERT INTO submissions (user_id, problem_id, lesson_id, attempt_id, option_id, is_correct, xp_earned, "
+                "submitted_at) VALUES (1, 1, 1, :attempt_id, 1, true, 10, :submitted_at)"),
+                {"attempt_id": attempt_id, "submitted_at": submitted_at})
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def short_window(monkeypatch):
+    monkeypatch.setattr(settings, "submission_idempotency_window_days", 30)
+
+
+async def replay_on_both_paths(attempt_id):
+    engine = create_async_engine(TEST_DATABASE_URL)
+    submission = SingleSubmissionRequest(attempt_id=attempt_id, answer={"problem_id": 1, "option_id": 1})
+    try:
+        async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+            orm = await SubmissionService.process_single_submission(db, 1, 1, submission)
+        async with engine.connect() as conn:
+            raw = await conn.get_raw_connection()
+            fast = await FastSubmissionService.process_single_submission(raw.driver_connection, 1, 1, submission)
+    finally:
+        await engine.dispose()
+    return orm, fast
+
+
+@requires_postgres
+class TestSubmissionPartitions:
+    """Test the partitioned submissions table against a real Postgres"""
+    
+    def test_future_partitions_exist(self, pg_engine):
+        """This month and the next three should have partitions"""
+        with pg_engine.begin() as conn:
+            names = {p.name for p in list_partitions(conn)}
+        current = month_start(datetime.now(timezone.utc))
+        for months in range(4):
+            assert partition_name(add_months(current, months)) in names
+    
+    def test_rows_land_in_their_month(self, pg_engine):
+        """Old and new submissions should be stored in different partitions"""
+        with pg_engine.begin() as conn:
+            rows = conn.execute(text("SELECT tableoid::regclass::text FROM submissions")).scalars().all()
+        assert len(set(rows)) == 2
+
+    def test_no_default_partition(self, pg_engine):
+        """Rows outside every month should fail instead of landing in a DEFAULT partition"""
+        with pg_engine.begin() as conn:
+            names = {p.name for p in list_partitions(conn)}
+            created = ensure_partitions(conn, months_ahead=3)
+
+        assert "submissions_default" not in names
+        assert created == []
+    
+    def test_idempotency_lookup_prunes_old_partitions(self, pg_engine, short_window):
+        """The attempt lookup should only visit partitions inside the idempotency window"""
+        stmt, params = existing_attempt_query(1, "attempt", 1)
+        with pg_engine.begin() as conn:
+            plan = explain(conn, stmt.params(params))
+            partitions = list_partitions(conn)
+        
+        window_start = (datetime.now(timezone.utc) - timedelta(days=31)).date()
+        too_old = {p.name for p in partitions if p.end <= window_start}
+        scanned = scanned_relations(plan)
+        
+        assert too_old
+        assert scanned
+        assert not scanned & too_old
+    
+    def test_replay_older_than_window_recognised(self, pg_engine, short_window):
+        """A replay of an attempt older than the window should be answered, not graded and credited again"""
+        orm, fast = asyncio.run(replay_on_both_paths("old_attempt"))
+        with pg_engine.connect() as conn:
+            stored = conn.execute(text("SELECT count(*) FROM submissions WHERE attempt_id = 'old_attempt'")).scalar()
+            total_xp = conn.execute(text("SELECT total_xp FROM users WHERE id = 1")).scalar()
+
+        assert orm.message == fast.message == REPLAY_MESSAGE
+        assert orm.total_xp_earned == fast.total_xp_earned == 10
+        assert stored == 1
+        assert total_xp == 0
+
+    def test_retention_refuses_cutoff_inside_window(self, pg_engine):
+        """Retention should compact and detach nothing while the cutoff reaches into the idempotency window"""
+        cutoff = add_months(month_start(datetime.now(timezone.utc)), -3)
+        with pg_engine.begin() as conn:
+            before = list_partitions(conn)
+            with pytest.raises(ValueError):
+                compact_partitions_before(conn, cutoff, archive_schema="archive")
+            after = list_partitions(conn)
+
+        assert after == before
+
+    def test_retention_compacts_and_archives_old_partitions(self, pg_engine, short_window):
+        """Retention should fold old partitions into summaries, then move them to the archive whole"""
+        cutoff = add_months(month_start(datetime.now(timezone.utc)), -3)
+        with pg_engine.begin() as conn:
+            result = compact_partitions_before(conn, cutoff, archive_schema="archive")
+            remaining = {p.name for p in list_partitions(conn)}
+            archived = conn.execute(text(
+                "SELECT count(*) FROM information_schema.tables WHERE table_schema = 'archive'")).scalar()
+            archived_rows = sum(
+                conn.execute(text(f"SELECT count(*) FROM archive.{name}")).scalar() for name in result.partitions)
+            summaries = conn.execute(text("SELECT attempts FROM submission_summaries")).scalars().all()
+            live = conn.execute(text("SELECT count(*) FROM submissions")).scalar()
+
+        assert result.partitions
+        assert not set(result.partitions) & remaining
+        assert archived == len(result.partitions)
+        assert archived_rows == 2
+        assert summaries == [2]
+        assert live == 1
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from app.models import Submission
+from app.services.problem_stats_service import ProblemStatsService
+from tests.pg_support import TEST_DATABASE_URL, requires_postgres, migrated_engine
+
+
+def seed(engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO users (id, username, total_xp, current_streak) "
+            "VALUES (1, 'a', 0, 0), (2, 'b', 0, 0), (3, 'c', 0, 0)"))
+        conn.execute(text("INSERT INTO lessons (id, title, order_index, is_active) VALUES (1, 'l', 1, true)"))
+        conn.execute(text(
+            "INSERT INTO problems (id, lesson_id, question, problem_type, xp_value, order_index) "
+            "VALUES (1, 1, 'q', 'options', 10, 1)"))
+        conn.execute(text(
+            "INSERT INTO problem_options (id, problem_id, option_text, order_index, is_correct) "
+            "VALUES (1, 1, 'a', 1, true), (2, 1, 'b', 2, false)"))
+
+
+@pytest.fixture(scope="module")
+def pg_engine():
+    engine = migrated_engine()
+    seed(engine)
+    yield engine
+    engine.dispose()
+
+
+async def answer(session_factory, user_id, option_id, attempt_id, hold: float = 0.0):
+    """One submission transaction: counters first, then the submission row"""
+    is_correct = option_id == 1
+    async with session_factory() as db:
+        await ProblemStatsService.record_answers(db, user_id, [(1, option_id, is_correct)])
+        await db.execute(insert(Submission), [{
+            "user_id": user_id, "problem_id": 1, "lesson_id": 1, "attempt_id": attempt_id,
+            "option_id": option_id, "is_correct": is_correct, "xp_earned": 10 if is_correct else 0
+        }])
+        await asyncio.sleep(hold)
+        await db.commit()
+
+
+async def run(job):
+    engine = create_async_engine(TEST_DATABASE_URL)
+    try:
+        return await job(async_sessionmaker(engine, expire_on_commit=False))
+    finally:
+        await engine.dispose()
+
+
+def counters(pg_engine):
+    with pg_engine.connect() as conn:
+        problem = conn.execute(text(
+            "SELECT attempts, correct, distinct_users FROM problem_stats WHERE problem_id = 1")).one()
+        options = dict(conn.execute(text(
+            "SELECT option_id, distinct_users FROM problem_option_stats")).all())
+    return tuple(problem), options
+
+
+@requires_postgres
+class TestRecordAnswers:
+    """Test the answer counters against a real database"""
+
+    def test_repeat_attempts_count_user_once(self, pg_engine):
+        """Every attempt counts, but a user only once per problem and per option"""
+        async def job(session_factory):
+            await answer(session_factory, 1, 2, "a")
+            await answer(session_factory, 1, 1, "b")
+            await answer(session_factory, 1, 1, "c")
+        asyncio.run(run(job))
+
+        assert counters(pg_engine) == ((3, 2, 1), {1: 1, 2: 1})
+
+    def test_concurrent_first_attempts_count_once(self, pg_engine):
+        """Two first attempts by one user in flight together should add one distinct user"""
+        async def job(session_factory):
+            await asyncio.gather(
+                answer(session_factory, 2, 1, "a", hold=0.2),
+                answer(session_factory, 2, 1, "b", hold=0.2)
+            )
+        asyncio.run(run(job))
+
+        assert counters(pg_engine) == ((5, 4, 2), {1: 2, 2: 1})
+
+    def test_statistics_served_from_counters(self, pg_engine):
+        """The statistics response should be built from the counters"""
+        async def job(session_factory):
+            async with session_factory() as db:
+                return await ProblemStatsService.get_problem_statistics(db, 1)
+        statistics = asyncio.run(run(job))
+
+        assert (statistics.attempts, statistics.correct, statistics.distinct_users) == (5, 4, 2)
+        assert [option.attempts for option in statistics.options] == [4, 1]
+        assert statistics.options[0].pick_rate == 0.8
+
+    def test_unknown_problem(self, pg_engine):
+        """Statistics of a problem that does not exist should be None"""
+        async def job(session_factory):
+            async with session_factory() as db:
+                return await ProblemStatsService.get_problem_statistics(db, 999)
+
+        assert asyncio.run(run(job)) is None
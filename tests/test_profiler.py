@@ -0,0 +1,91 @@
+import asyncio
+import pstats
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.profiler import SamplingProfiler
+from app.routes.debug import router
+
+
+def burn(seconds):
+    deadline = time.process_time() + seconds
+    while time.process_time() < deadline:
+        pass
+
+
+async def busy_handler():
+    await asyncio.sleep(0)
+    burn(0.3)
+
+
+def profile_busy_handler():
+    profiler = SamplingProfiler(0.002)
+
+    async def main():
+        profiler.start()
+        try:
+            await asyncio.gather(busy_handler(), asyncio.sleep(0.05))
+        finally:
+            profiler.stop()
+
+    asyncio.run(main())
+    return profiler
+
+
+class TestSamplingProfiler:
+    """Test the SIGPROF sampler"""
+
+    def test_stacks_reach_through_awaiting_coroutines(self):
+        """CPU burnt in a task should be charged to its coroutine and the await point it resumed from"""
+        collapsed = profile_busy_handler().collapsed()
+        hottest = collapsed.splitlines()[0]
+
+        assert "test_profiler.busy_handler:" in hottest
+        assert hottest.split(";")[-1].startswith("tests.test_profiler.burn:")
+
+    def test_pstats_loadable(self, tmp_path):
+        """The pstats output should be a valid stats file"""
+        path = tmp_path / "profile.pstats"
+        path.write_bytes(profile_busy_handler().pstats())
+
+        stats = pstats.Stats(str(path))
+
+        assert any(name == "burn" for _, _, name in stats.stats)
+
+    def test_one_profile_at_a_time(self):
+        """A second profile should be refused while one is running"""
+        first = SamplingProfiler(0.01)
+        first.start()
+        try:
+            with pytest.raises(RuntimeError):
+                SamplingProfiler(0.01).start()
+        finally:
+            first.stop()
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+class TestProfileEndpoint:
+    """Test access to /debug/profile"""
+
+    def test_hidden_without_token(self, client, monkeypatch):
+        """Without a configured admin token the endpoint should not exist"""
+        monkeypatch.setattr(settings, "debug_admin_token", None)
+
+        assert client.get("/debug/profile?seconds=1").status_code == 404
+
+    def test_wrong_token_forbidden(self, client, monkeypatch):
+        """Only requests carrying the admin token may profile"""
+        monkeypatch.setattr(settings, "debug_admin_token", "secret")
+
+        assert client.get("/debug/profile?seconds=1").status_code == 403
+        assert client.get("/debug/profile?seconds=1", headers={"X-Admin-Token": "guess"}).status_code == 403
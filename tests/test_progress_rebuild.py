@@ -0,0 +1,159 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from app.services import SubmissionService, FastSubmissionService
+from app.services.progress_rebuild import Checkpoint, Chunk, rebuild_progress, user_id_chunks
+from tests.pg_support import TEST_DATABASE_URL, requires_postgres, migrated_engine
+
+
+class TestChunks:
+    """Test user-id ranges and the checkpoint file"""
+
+    def test_chunks_cover_every_user_once(self):
+        """Ranges should be contiguous, half-open and end at the last id"""
+        assert user_id_chunks(1, 25, 10) == [Chunk(1, 11), Chunk(11, 21), Chunk(21, 26)]
+        assert user_id_chunks(5, 5, 10) == [Chunk(5, 6)]
+
+    def test_checkpoint_resumes(self, tmp_path):
+        """Chunks marked done should be remembered by a later run with the same parameters"""
+        path = str(tmp_path / "checkpoint.json")
+        params = {"chunk_size": 10, "lesson_ids": [3]}
+        Checkpoint(path, params).mark_done(Chunk(1, 11))
+
+        assert Checkpoint(path, params).done == {Chunk(1, 11)}
+
+    def test_checkpoint_of_other_rebuild_refused(self, tmp_path):
+        """A checkpoint written with other parameters should not be reused"""
+        path = str(tmp_path / "checkpoint.json")
+        Checkpoint(path, {"chunk_size": 10, "lesson_ids": None}).mark_done(Chunk(1, 11))
+
+        with pytest.raises(ValueError):
+            Checkpoint(path, {"chunk_size": 10, "lesson_ids": [3]})
+
+
+def seed(engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO users (id, username, total_xp, current_streak) "
+            "SELECT g, 'user_' || g, 0, 0 FROM generate_series(1, 30) AS g"))
+        conn.execute(text(
+            "INSERT INTO lessons (id, title, order_index, is_active) VALUES (1, 'a', 1, true), (2, 'b', 2, true)"))
+        conn.execute(text(
+            "INSERT INTO problems (id, lesson_id, question, problem_type, xp_value, order_index) "
+            "VALUES (1, 1, 'q', 'options', 10, 1), (2, 1, 'q', 'options', 10, 2), (3, 2, 'q', 'options', 10, 1)"))
+        conn.execute(text(
+            "INSERT INTO problem_options (id, problem_id, option_text, order_index, is_correct) "
+            "VALUES (1, 1, 'a', 1, true), (2, 2, 'a', 1, true), (3, 3, 'a', 1, true)"))
+        # Every user solved problem 1; even users also solved problem 2
+        conn.execute(text(
+            "INSERT INTO submissions (user_id, problem_id, lesson_id, attempt_id, option_id, is_correct, xp_earned) "
+            "SELECT g, 1, 1, 'a', 1, true, 10 FROM generate_series(1, 30) AS g "
+            "UNION ALL SELECT g, 2, 1, 'a', 2, true, 10 FROM generate_series(2, 30, 2) AS g"))
+        # Stale rows: a lesson-2 row without submissions and a wrong lesson-1 row
+        conn.execute(text(
+            "INSERT INTO user_progress (user_id, lesson_id, is_completed, completion_percentage) "
+            "VALUES (1, 2, true, 100), (3, 1, false, 10)"))
+
+
+@pytest.fixture(scope="module")
+def pg_engine():
+    engine = migrated_engine()
+    seed(engine)
+    yield engine
+    engine.dispose()
+
+
+async def rebuild(**kwargs):
+    engine = create_async_engine(TEST_DATABASE_URL)
+    try:
+        return await rebuild_progress(engine, workers=3, chunk_size=7, **kwargs)
+    finally:
+        await engine.dispose()
+
+
+@requires_postgres
+class TestRebuildProgress:
+    """Test the set-based rebuild against a real database"""
+
+    def test_rebuild_matches_submissions(self, pg_engine):
+        """Every (user, lesson) should end up with the percentage its submissions give"""
+        result = asyncio.run(rebuild())
+        with pg_engine.connect() as conn:
+            rows = conn.execute(text(
+                "SELECT user_id, lesson_id, completion_percentage, is_completed FROM user_progress"
+            )).all()
+        progress = {(row.user_id, row.lesson_id): (row.completion_percentage, row.is_completed) for row in rows}
+
+        assert result.chunks == 5
+        assert progress[(1, 1)] == (50, False)
+        assert progress[(2, 1)] == (100, True)
+        assert progress[(3, 1)] == (50, False)
+        assert progress[(1, 2)] == (0, False)
+        assert len(progress) == 31
+
+    def test_second_rebuild_writes_nothing(self, pg_engine):
+        """Rows that are already right should not be rewritten"""
+        assert asyncio.run(rebuild()).rows_changed == 0
+
+    def test_rebuild_of_changed_lesson(self, pg_engine):
+        """After a problem is added only the affected lesson should change"""
+        with pg_engine.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO problems (id, lesson_id, question, problem_type, xp_value, order_index) "
+                "VALUES (4, 1, 'q', 'options', 10, 3)"))
+        result = asyncio.run(rebuild(lesson_ids=[1]))
+        with pg_engine.connect() as conn:
+            percentage = conn.execute(text(
+                "SELECT completion_percentage FROM user_progress WHERE user_id = 2 AND lesson_id = 1"
+            )).scalar()
+
+        assert result.rows_changed == 30
+        assert percentage == 66
+
+
+async def live_percentages(user_id, lesson_id):
+    """Progress as stored by the ORM path, then by the fast path"""
+    engine = create_async_engine(TEST_DATABASE_URL)
+    read = text("SELECT completion_percentage FROM user_progress WHERE user_id = :user_id AND lesson_id = :lesson_id")
+    params = {"user_id": user_id, "lesson_id": lesson_id}
+    try:
+        async with async_sessionmaker(engine)() as db:
+            await SubmissionService._update_lesson_progress(db, user_id, lesson_id)
+            await db.commit()
+            orm = await db.scalar(read, params)
+        async with engine.connect() as conn:
+            raw = await conn.get_raw_connection()
+            await FastSubmissionService._update_lesson_progress(raw.driver_connection, user_id, lesson_id)
+            fast = await conn.scalar(read, params)
+    finally:
+        await engine.dispose()
+    return orm, fast
+
+
+@requires_postgres
+class TestPercentageAgreement:
+    """Test that the rebuild and both submission paths compute the same percentage"""
+
+    def test_same_percentage_on_every_path(self, pg_engine):
+        """29 of 100 solved should be 29 everywhere, not the 28 that float arithmetic gives"""
+        with pg_engine.begin() as conn:
+            conn.execute(text("INSERT INTO users (id, username, total_xp, current_streak) VALUES (31, 'u', 0, 0)"))
+            conn.execute(text("INSERT INTO lessons (id, title, order_index, is_active) VALUES (3, 'c', 3, true)"))
+            conn.execute(text(
+                "INSERT INTO problems (id, lesson_id, question, problem_type, xp_value, order_index) "
+                "SELECT g, 3, 'q', 'options', 10, g FROM generate_series(100, 199) AS g"))
+            conn.execute(text(
+                "INSERT INTO problem_options (id, problem_id, option_text, order_index, is_correct) "
+                "SELECT g, g, 'a', 1, true FROM generate_series(100, 199) AS g"))
+            conn.execute(text(
+                "INSERT INTO submissions (user_id, problem_id, lesson_id, attempt_id, option_id, is_correct, xp_earned) "
+                "SELECT 31, g, 3, 'a', g, true, 10 FROM generate_series(100, 128) AS g"))
+
+        orm, fast = asyncio.run(live_percentages(31, 3))
+        rebuilt = asyncio.run(rebuild(lesson_ids=[3]))
+
+        assert orm == fast == 29
+        assert rebuilt.rows_changed == 0
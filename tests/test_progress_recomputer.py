@@ -0,0 +1,104 @@
+import asyncio
+import pytest
+
+from app.core.metrics import metrics
+from app.services.progress_recomputer import ProgressRecomputer
+
+
+class RecordingRecomputer(ProgressRecomputer):
+    """Recomputer whose recomputation only records its key"""
+
+    def __init__(self, queue_size=10, concurrency=1, delay=0.0):
+        super().__init__(queue_size=queue_size, concurrency=concurrency)
+        self.delay = delay
+        self.recomputed = []
+        self.active = 0
+        self.max_active = 0
+        self.active_keys = set()
+        self.overlapped = False
+
+    async def recompute(self, user_id, lesson_id):
+        key = (user_id, lesson_id)
+        self.overlapped = self.overlapped or key in self.active_keys
+        self.active_keys.add(key)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(self.delay)
+        self.recomputed.append(key)
+        self.active -= 1
+        self.active_keys.discard(key)
+
+
+class TestProgressRecomputer:
+    """Test queueing, coalescing and concurrency of progress recomputation"""
+
+    def test_not_running_falls_back_inline(self):
+        """Without workers the caller should update progress itself"""
+        assert RecordingRecomputer().enqueue(1, 1) is False
+
+    @pytest.mark.asyncio
+    async def test_burst_in_one_lesson_coalesced(self):
+        """Several answers in one lesson before the worker runs should cost one recomputation"""
+        recomputer = RecordingRecomputer()
+        await recomputer.start()
+        assert all(recomputer.enqueue(1, 7) for _ in range(5))
+        recomputer.enqueue(1, 8)
+        await recomputer.stop()
+
+        assert recomputer.recomputed == [(1, 7), (1, 8)]
+        assert metrics.get("progress.staleness_ms") >= 0
+
+    @pytest.mark.asyncio
+    async def test_answer_during_recompute_runs_again(self):
+        """A key enqueued while it is being recomputed should be recomputed once more"""
+        recomputer = RecordingRecomputer(delay=0.02)
+        await recomputer.start()
+        recomputer.enqueue(1, 7)
+        await asyncio.sleep(0.01)
+        assert recomputer.active == 1
+        recomputer.enqueue(1, 7)
+        await recomputer.stop()
+
+        assert recomputer.recomputed == [(1, 7), (1, 7)]
+
+    @pytest.mark.asyncio
+    async def test_key_never_recomputed_concurrently(self):
+        """With spare workers, a key enqueued during its run should wait for that run to finish"""
+        recomputer = RecordingRecomputer(concurrency=2, delay=0.02)
+        await recomputer.start()
+        recomputer.enqueue(1, 7)
+        await asyncio.sleep(0.01)
+        recomputer.enqueue(1, 7)
+        recomputer.enqueue(1, 8)
+        await asyncio.sleep(0.005)
+        recomputer.enqueue(1, 7)  # coalesced with the run waiting for the first
+        await recomputer.stop()
+
+        assert recomputer.overlapped is False
+        assert recomputer.recomputed.count((1, 7)) == 2
+        assert recomputer.recomputed.count((1, 8)) == 1
+        assert recomputer.waiting == 0
+
+    @pytest.mark.asyncio
+    async def test_full_queue_falls_back_inline(self):
+        """New keys beyond the queue size should be refused"""
+        recomputer = RecordingRecomputer(queue_size=2)
+        await recomputer.start()
+        assert recomputer.enqueue(1, 1)
+        assert recomputer.enqueue(1, 2)
+        assert recomputer.enqueue(1, 3) is False
+        assert recomputer.enqueue(1, 1)  # already waiting: coalesced, not refused
+        await recomputer.stop()
+
+    @pytest.mark.asyncio
+    async def test_concurrency_bounded(self):
+        """No more recomputations than workers should run at once"""
+        recomputer = RecordingRecomputer(concurrency=2, delay=0.01)
+        await recomputer.start()
+        for lesson_id in range(6):
+            recomputer.enqueue(1, lesson_id)
+        await recomputer.stop()
+
+        assert recomputer.max_active == 2
+        assert sorted(recomputer.recomputed) == [(1, lesson_id) for lesson_id in range(6)]
+        assert recomputer.enqueue(1, 9) is False
@@ -0,0 +1,296 @@
+"""
+Query-plan regression tests for the service layer.
+
+Seeds a realistic volume into TEST_DATABASE_URL, runs every service method,
+records each statement it sends and EXPLAINs it. Plans must not scan large
+tables sequentially, and no statement may cost more than its scenario's
+ceiling in COST_CEILINGS. Their shapes are compared with the snapshots in
+tests/query_plans/, and their estimated costs with the costs recorded there
+(tests/query_plans/costs.json): a changed shape fails with a diff, a cost
+more than COST_GROWTH times the recorded one fails too. Plans differ between
+PostgreSQL major versions, so both comparisons are skipped on a server other
+than the one they were recorded on. A missing snapshot fails; run once with
+UPDATE_QUERY_PLANS=1 to record snapshots and costs, or to accept changed
+ones, and commit tests/query_plans/.
+"""
+import asyncio
+import difflib
+import json
+import os
+from datetime import datetime, timezone, timedelta
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from app.core.partitions import ensure_partitions
+from app.schemas import SubmissionRequest, SingleSubmissionRequest
+from app.services import LessonService, UserService, SubmissionService
+from app.services.idempotency_service import response_cache
+from app.services.lesson_service import lesson_detail_cache
+from app.services.problem_stats_service import ProblemStatsService
+from tests.pg_support import (
+    TEST_DATABASE_URL, requires_postgres, migrated_engine, StatementRecorder, plan_nodes, plan_shape
+)
+
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "query_plans")
+UPDATE_SNAPSHOTS = os.getenv("UPDATE_QUERY_PLANS") == "1"
+
+SCALE = int(os.getenv("QUERY_PLAN_SCALE", "1"))
+USERS = 20000 * SCALE
+LESSONS = 200
+PROBLEMS_PER_LESSON = 30
+OPTIONS_PER_PROBLEM = 4
+SUBMISSIONS = 400000 * SCALE
+HISTORY_DAYS = 180
+# Tables with at least this many rows must never be read with a Seq Scan
+LARGE_TABLE_ROWS = 5000
+# Exceptions where a Seq Scan is the right plan at this volume. A 20-lesson
+# batch reads a tenth of problem_options: one pass beats 600 index probes.
+SEQ_SCAN_ALLOWED = {
+    "LessonService.get_lesson_details": {"problem_options"},
+}
+
+USER_ID = 1
+LESSON_ID = 1
+PROBLEM_ID = 1
+CORRECT_OPTION_ID = 1
+
+# A statement may get this much more expensive than its recorded cost
+COST_GROWTH = 2.0
+COSTS_PATH = os.path.join(SNAPSHOT_DIR, "costs.json")
+# Highest estimated total cost any statement of a scenario may have, with or
+# without recorded costs; about four times what the statements cost today
+COST_CEILINGS = {
+    "LessonService.get_lessons_version": 200,
+    "LessonService.get_lessons_with_progress": 200,
+    "LessonService.get_lesson_detail": 1600,
+    "LessonService.get_lesson_details": 3500,
+    "UserService.get_user_profile": 200,
+    "ProblemStatsService.get_problem_statistics": 200,
+    "SubmissionService.process_submission": 350,
+    "SubmissionService.process_single_submission": 250,
+    "SubmissionService.process_submission.replay": 250,
+    "SubmissionService._update_lesson_progress": 200,
+}
+
+SEED = [
+    "INSERT INTO users (id, username, total_xp, current_streak) "
+    "SELECT g, 'user_' || g, 0, 0 FROM generate_series(1, :users) AS g",
+    "INSERT INTO lessons (id, title, order_index, is_active) "
+    "SELECT g, 'Lesson ' || g, g, g % 10 <> 0 FROM generate_series(1, :lessons) AS g",
+    "INSERT INTO problems (id, lesson_id, question, problem_type, xp_value, order_index) "
+    "SELECT g, (g - 1) / :per_lesson + 1, 'Question ' || g, 'options', 10, (g - 1) % :per_lesson + 1 "
+    "FROM generate_series(1, :lessons * :per_lesson) AS g",
+    "INSERT INTO problem_options (id, problem_id, option_text, order_index, is_correct) "
+    "SELECT g, (g - 1) / :per_problem + 1, 'Option ' || g, (g - 1) % :per_problem + 1, (g - 1) % :per_problem = 0 "
+    "FROM generate_series(1, :lessons * :per_lesson * :per_problem) AS g",
+    # Each user answers a spread of problems over the history window
+    "INSERT INTO submissions (user_id, problem_id, lesson_id, attempt_id, option_id, is_correct, xp_earned, "
+    "                         submitted_at) "
+    "SELECT g % :users + 1, p, (p - 1) / :per_lesson + 1, 'seed_' || g / 5, (p - 1) * :per_problem + 1 + g % :per_problem, "
+    "       g % :per_problem = 0, CASE WHEN g % :per_problem = 0 THEN 10 ELSE 0 END, "
+    "       now() - (g % :days) * interval '1 day' "
+    "FROM generate_series(1, :submissions) AS g, "
+    "     LATERAL (SELECT (g::bigint * 7919) % (:lessons * :per_lesson) + 1 AS p) AS picked",
+    "INSERT INTO user_progress (user_id, lesson_id, is_completed, completion_percentage) "
+    "SELECT u, l, l % 3 = 0, CASE WHEN l % 3 = 0 THEN 100 ELSE 40 END "
+    "FROM generate_series(1, :users) AS u, generate_series(1, 10) AS l",
+    "INSERT INTO problem_stats (problem_id, attempts, correct, distinct_users) "
+    "SELECT id, 100, 25, 80 FROM problems",
+    "INSERT INTO problem_option_stats (option_id, problem_id, attempts, distinct_users) "
+    "SELECT id, problem_id, 25, 20 FROM problem_options",
+]
+
+
+def seed(engine):
+    params = {
+        "users": USERS, "lessons": LESSONS, "per_lesson": PROBLEMS_PER_LESSON,
+        "per_problem": OPTIONS_PER_PROBLEM, "submissions": SUBMISSIONS, "days": HISTORY_DAYS
+    }
+    with engine.begin() as conn:
+        ensure_partitions(conn, months_ahead=3,
+                          since=datetime.now(timezone.utc) - timedelta(days=HISTORY_DAYS))
+        for statement in SEED:
+            conn.execute(text(statement), params)
+        for table in ("users", "lessons", "problems", "problem_options"):
+            conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), max(id)) FROM {table}"))
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE"))
+        return set(conn.execute(text(
+            "SELECT relname FROM pg_class WHERE relkind = 'r' AND reltuples >= :rows"
+        ), {"rows": LARGE_TABLE_ROWS}).scalars())
+
+
+SCENARIOS = {
+    "LessonService.get_lessons_version":
+        lambda db: LessonService.get_lessons_version(db, USER_ID),
+    "LessonService.get_lessons_with_progress":
+        lambda db: LessonService.get_lessons_with_progress(db, USER_ID),
+    "LessonService.get_lesson_detail":
+        lambda db: LessonService.get_lesson_detail(db, LESSON_ID),
+    "LessonService.get_lesson_details":
+        lambda db: LessonService.get_lesson_details(db, list(range(1, 21))),
+    "UserService.get_user_profile":
+        lambda db: UserService.get_user_profile(db, USER_ID),
+    "ProblemStatsService.get_problem_statistics":
+        lambda db: ProblemStatsService.get_problem_statistics(db, PROBLEM_ID),
+    "SubmissionService.process_submission":
+        lambda db: SubmissionService.process_submission(db, USER_ID, LESSON_ID, SubmissionRequest(
+            attempt_id="plan_multi",
+            answers=[{"problem_id": PROBLEM_ID, "option_id": CORRECT_OPTION_ID},
+                     {"problem_id": PROBLEM_ID + 1, "option_id": CORRECT_OPTION_ID + OPTIONS_PER_PROBLEM}]
+        )),
+    "SubmissionService.process_single_submission":
+        lambda db: SubmissionService.process_single_submission(db, USER_ID, LESSON_ID, SingleSubmissionRequest(
+            attempt_id="plan_single",
+            answer={"problem_id": PROBLEM_ID, "option_id": CORRECT_OPTION_ID}
+        )),
+    "SubmissionService.process_submission.replay":
+        lambda db: SubmissionService.process_submission(db, USER_ID, LESSON_ID, SubmissionRequest(
+            attempt_id="plan_multi",
+            answers=[{"problem_id": PROBLEM_ID, "option_id": CORRECT_OPTION_ID}]
+        )),
+    "SubmissionService._update_lesson_progress":
+        lambda db: SubmissionService._update_lesson_progress(db, USER_ID, LESSON_ID),
+}
+
+
+async def capture_plans() -> tuple:
+    """Run every scenario and EXPLAIN each statement it sent.
+
+    Returns the server's major version and {scenario: [(sql, plan)]}.
+    """
+    engine = create_async_engine(TEST_DATABASE_URL)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    plans = {}
+    try:
+        async with engine.connect() as conn:
+            server_version = int((await conn.execute(text("SHOW server_version_num"))).scalar()) // 10000
+        for name, scenario in SCENARIOS.items():
+            lesson_detail_cache.clear()
+            response_cache.clear()
+            with StatementRecorder(engine) as recorder:
+                async with session_factory() as db:
+                    await scenario(db)
+                    await db.commit()
+            plans[name] = []
+            async with engine.connect() as conn:
+                for statement, parameters in recorder.statements:
+                    raw = (await conn.exec_driver_sql(
+                        f"EXPLAIN (FORMAT JSON) {statement}", tuple(parameters or ())
+                    )).scalar()
+                    if isinstance(raw, str):
+                        raw = json.loads(raw)
+                    plans[name].append((statement, raw[0]["Plan"]))
+    finally:
+        await engine.dispose()
+    return server_version, plans
+
+
+@pytest.fixture(scope="module")
+def captured():
+    engine = migrated_engine()
+    try:
+        large_tables = seed(engine)
+    finally:
+        engine.dispose()
+    server_version, plans = asyncio.run(capture_plans())
+    return large_tables, server_version, plans
+
+
+def load_costs() -> dict:
+    if not os.path.exists(COSTS_PATH):
+        return {}
+    with open(COSTS_PATH) as f:
+        return json.load(f)
+
+
+def skip_other_server(server_version: int):
+    """Recorded plans and costs only apply to the PostgreSQL major version they came from"""
+    recorded = load_costs().get("server_version")
+    if recorded is not None and recorded != server_version and not UPDATE_SNAPSHOTS:
+        pytest.skip(f"Plans recorded on PostgreSQL {recorded}, server is {server_version}")
+
+
+def write_snapshot(path: str, content: str):
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+def render(statements) -> str:
+    lines = []
+    for index, (statement, plan) in enumerate(statements, 1):
+        lines.append(f"-- [{index}] {' '.join(statement.split())[:120]}")
+        lines.extend(plan_shape(plan))
+    return "\n".join(lines) + "\n"
+
+
+@requires_postgres
+class TestServiceQueryPlans:
+    """Test that service statements keep using indexes at realistic volume"""
+
+    @pytest.mark.parametrize("scenario", list(SCENARIOS))
+    def test_no_sequential_scans_on_large_tables(self, captured, scenario):
+        """No statement should Seq Scan a table above LARGE_TABLE_ROWS"""
+        large_tables, _, plans = captured
+        assert plans[scenario]
+        allowed = SEQ_SCAN_ALLOWED.get(scenario, set())
+        for statement, plan in plans[scenario]:
+            seq_scanned = {
+                node["Relation Name"] for node in plan_nodes(plan)
+                if node["Node Type"] == "Seq Scan" and node["Relation Name"] in large_tables
+            } - allowed
+            assert not seq_scanned, f"Seq Scan on {seq_scanned} in:\n{statement}"
+
+    @pytest.mark.parametrize("scenario", list(SCENARIOS))
+    def test_estimated_cost_under_ceiling(self, captured, scenario):
+        """No statement's estimated total cost should exceed its scenario's ceiling"""
+        _, _, plans = captured
+        ceiling = COST_CEILINGS[scenario] * SCALE
+        for statement, plan in plans[scenario]:
+            assert plan["Total Cost"] <= ceiling, (
+                f"Estimated cost {plan['Total Cost']} > ceiling {ceiling} for:\n{statement}")
+
+    @pytest.mark.parametrize("scenario", list(SCENARIOS))
+    def test_estimated_cost_within_recorded(self, captured, scenario):
+        """No statement's estimated total cost should grow past COST_GROWTH times its recorded cost"""
+        _, server_version, plans = captured
+        skip_other_server(server_version)
+        current = [plan["Total Cost"] for _, plan in plans[scenario]]
+        costs = load_costs()
+
+        if UPDATE_SNAPSHOTS:
+            costs[scenario] = current
+            costs["server_version"] = server_version
+            write_snapshot(COSTS_PATH, json.dumps(costs, indent=2, sort_keys=True) + "\n")
+            return
+
+        assert scenario in costs, f"No recorded costs for {scenario}: run with UPDATE_QUERY_PLANS=1"
+        recorded = costs[scenario]
+        assert len(current) == len(recorded), f"{len(current)} statements, {len(recorded)} recorded"
+        for (statement, _), cost, before in zip(plans[scenario], current, recorded):
+            assert cost <= before * COST_GROWTH, (
+                f"Estimated cost {cost} > {COST_GROWTH} x recorded {before} for:\n{statement}")
+
+    @pytest.mark.parametrize("scenario", list(SCENARIOS))
+    def test_plan_matches_snapshot(self, captured, scenario):
+        """Plan shapes should match the recorded snapshot"""
+        _, server_version, plans = captured
+        skip_other_server(server_version)
+        current = render(plans[scenario])
+        path = os.path.join(SNAPSHOT_DIR, f"{scenario}.txt")
+
+        if UPDATE_SNAPSHOTS:
+            write_snapshot(path, current)
+            return
+
+        assert os.path.exists(path), f"No snapshot for {scenario}: run with UPDATE_QUERY_PLANS=1"
+        with open(path) as f:
+            expected = f.read()
+        diff = "".join(difflib.unified_diff(
+            expected.splitlines(keepends=True), current.splitlines(keepends=True),
+            fromfile=f"snapshot/{scenario}", tofile=f"current/{scenario}"
+        ))
+        assert not diff, f"Query plan changed (UPDATE_QUERY_PLANS=1 to accept):\n{diff}"
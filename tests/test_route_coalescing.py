@@ -0,0 +1,119 @@
+import asyncio
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.core.database import get_async_db
+from app.routes import lessons_router, users_router
+from app.services import LessonService, UserService
+
+NOW = datetime.now(timezone.utc)
+LESSON = {"id": 1, "title": "l", "order_index": 1, "created_at": NOW, "updated_at": NOW, "problems": []}
+PROFILE = {
+    "user_id": 1, "username": "u", "total_xp": 0, "current_streak": 0,
+    "progress_percentage": 0.0, "lessons_completed": 0, "total_lessons": 1
+}
+
+
+class HeldCall:
+    """Service stand-in that counts its calls and holds each one until released"""
+
+    def __init__(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self, *args, **kwargs):
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+async def no_version(db, user_id):
+    return (1,)
+
+
+async def get_twice(router, path, held):
+    """Two identical GETs, the second sent while the first is in flight"""
+    async def no_db():
+        yield None
+
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_async_db] = no_db
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        first = asyncio.create_task(client.get(path))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(client.get(path))
+        await asyncio.sleep(0.01)
+        held.release.set()
+        return await asyncio.gather(first, second)
+
+
+class TestCatalogCoalescing:
+    """Test that identical concurrent catalog reads share one service call"""
+
+    @pytest.mark.asyncio
+    async def test_listing_read_once(self, monkeypatch):
+        """Two concurrent lesson listings should read the lessons once"""
+        held = HeldCall(result=[])
+        monkeypatch.setattr(LessonService, "get_lessons_version", no_version)
+        monkeypatch.setattr(LessonService, "get_lessons_with_progress", held)
+
+        responses = await get_twice(lessons_router, "/api/lessons/", held)
+
+        assert [response.status_code for response in responses] == [200, 200]
+        assert held.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_detail_read_once(self, monkeypatch):
+        """Two concurrent reads of one lesson should load it once and both get it"""
+        held = HeldCall(result=LESSON)
+        monkeypatch.setattr(LessonService, "get_lesson_detail", held)
+
+        responses = await get_twice(lessons_router, "/api/lessons/1", held)
+
+        assert [response.json()["id"] for response in responses] == [1, 1]
+        assert held.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_detail_error_reaches_both(self, monkeypatch):
+        """A failing leader should fail its follower too, without a second call"""
+        held = HeldCall(error=RuntimeError("database down"))
+        monkeypatch.setattr(LessonService, "get_lesson_detail", held)
+
+        responses = await get_twice(lessons_router, "/api/lessons/1", held)
+
+        assert [response.status_code for response in responses] == [500, 500]
+        assert held.calls == 1
+
+
+class TestProfileCoalescing:
+    """Test that identical concurrent profile reads share one service call"""
+
+    @pytest.mark.asyncio
+    async def test_profile_read_once(self, monkeypatch):
+        """Two concurrent profile reads should load the profile once and both get it"""
+        held = HeldCall(result=PROFILE)
+        monkeypatch.setattr(UserService, "get_user_profile", held)
+
+        responses = await get_twice(users_router, "/api/profiles/", held)
+
+        assert [response.json()["username"] for response in responses] == ["u", "u"]
+        assert held.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_profile_error_reaches_both(self, monkeypatch):
+        """A failing leader should fail its follower too, without a second call"""
+        held = HeldCall(error=RuntimeError("database down"))
+        monkeypatch.setattr(UserService, "get_user_profile", held)
+
+        responses = await get_twice(users_router, "/api/profiles/", held)
+
+        assert [response.status_code for response in responses] == [500, 500]
+        assert held.calls == 1
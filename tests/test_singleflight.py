@@ -0,0 +1,101 @@
+import asyncio
+import pytest
+from app.core.metrics import metrics
+from app.core.singleflight import SingleFlight
+
+
+class TestSingleFlight:
+    """Test coalescing of concurrent calls with the same key"""
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_duplicates_share_one_call(self):
+        """Concurrent callers with the same key should run the function once"""
+        flight = SingleFlight("test_share")
+        calls = 0
+        
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "result"
+        
+        results = await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+        
+        assert results == ["result"] * 5
+        assert calls == 1
+        assert metrics.get("singleflight.test_share.coalesced") == 4
+        assert len(flight) == 0
+    
+    @pytest.mark.asyncio
+    async def test_different_keys_do_not_coalesce(self):
+        """Calls with different keys should each run"""
+        flight = SingleFlight("test_keys")
+        calls = []
+        
+        async def work(key):
+            calls.append(key)
+            await asyncio.sleep(0.01)
+            return key
+        
+        results = await asyncio.gather(
+            flight.do(1, lambda: work(1)),
+            flight.do(2, lambda: work(2))
+        )
+        
+        assert results == [1, 2]
+        assert sorted(calls) == [1, 2]
+    
+    @pytest.mark.asyncio
+    async def test_exception_is_shared(self):
+        """Followers should see the leader's exception"""
+        flight = SingleFlight("test_error")
+        
+        async def work():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+        
+        results = await asyncio.gather(
+            flight.do("key", work), flight.do("key", work), return_exceptions=True
+        )
+        
+        assert all(isinstance(r, ValueError) for r in results)
+    
+    @pytest.mark.asyncio
+    async def test_cancelled_leader_hands_over_to_follower(self):
+        """Cancelling the leader should make a follower retry, not fail"""
+        flight = SingleFlight("test_cancel")
+        calls = 0
+        
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return calls
+        
+        leader = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        
+        assert await follower == 2
+        assert leader.cancelled()
+        assert len(flight) == 0
+    
+    @pytest.mark.asyncio
+    async def test_cancelled_follower_does_not_cancel_leader(self):
+        """A follower giving up should leave the leader running"""
+        flight = SingleFlight("test_follower_cancel")
+        
+        async def work():
+            await asyncio.sleep(0.02)
+            return "done"
+        
+        leader = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0.005)
+        follower.cancel()
+        
+        assert await leader == "done"
+        assert follower.cancelled()
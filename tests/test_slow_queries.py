@@ -0,0 +1,105 @@
+import asyncio
+import json
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.slow_queries import SlowQueryLog, calling_function, parameter_shape
+from tests.pg_support import TEST_DATABASE_URL, requires_postgres, migrated_engine
+
+
+def make_log(path, **kwargs):
+    options = dict(threshold_ms=0, path=str(path), max_bytes=100000, backups=1,
+                   sample_rate=0.0, explain_per_minute=2, explain_timeout_ms=1000)
+    options.update(kwargs)
+    return SlowQueryLog(**options)
+
+
+def read_entries(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+class TestSlowQueryLog:
+    """Test what a slow statement is recorded with"""
+
+    def test_parameter_shape_hides_values(self):
+        """Only types and list lengths should be logged"""
+        assert parameter_shape((7, "secret", [1, 2, 3])) == ["int", "str", "list[3]"]
+        assert parameter_shape({"user_id": 7}) == {"user_id": "int"}
+        assert parameter_shape([(1,), (2,)], executemany=True) == {"rows": 2, "shape": ["int"]}
+
+    def test_caller_found_through_awaits(self):
+        """The innermost function of the given packages on the coroutine chain should be named"""
+        async def service_method():
+            return calling_function(packages=("tests",))
+
+        async def route():
+            return await service_method()
+
+        caller = asyncio.run(route())
+
+        assert caller.endswith("test_caller_found_through_awaits.<locals>.service_method")
+
+    def test_slow_statement_written(self, tmp_path):
+        """A statement over the threshold should become one JSON line"""
+        path = tmp_path / "slow.jsonl"
+        log = make_log(path)
+
+        log.record("SELECT * FROM users WHERE id = $1", (7,), 0.25)
+        entry, = read_entries(path)
+
+        assert entry["duration_ms"] == 250.0
+        assert entry["parameters"] == ["int"]
+        assert entry["route"] is None
+        assert "plan" not in entry
+
+    def test_explain_rate_capped(self, tmp_path):
+        """No more EXPLAINs than the cap per minute should be started"""
+        log = make_log(tmp_path / "slow.jsonl", sample_rate=1.0, dsn="postgresql://unused")
+
+        async def take_slots():
+            taken = []
+            for _ in range(3):
+                taken.append(log._take_explain_slot())
+                log._explaining = False
+            return taken
+
+        assert asyncio.run(take_slots()) == [True, True, False]
+
+
+@pytest.fixture(scope="module")
+def pg_engine():
+    engine = migrated_engine()
+    yield engine
+    engine.dispose()
+
+
+@requires_postgres
+class TestExplainCapture:
+    """Test EXPLAIN capture against a real database"""
+
+    def test_sampled_statement_gets_plan(self, pg_engine, tmp_path):
+        """A sampled read should be logged with its EXPLAIN ANALYZE plan"""
+        path = tmp_path / "slow.jsonl"
+        dsn = make_url(TEST_DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+        log = make_log(path, sample_rate=1.0, dsn=dsn)
+
+        async def run():
+            engine = create_async_engine(TEST_DATABASE_URL)
+            log.install(engine)
+            try:
+                async with engine.connect() as conn:
+                    await conn.execute(text("SELECT count(*) FROM users WHERE id = :id"), {"id": 1})
+                await asyncio.gather(*log._tasks)
+            finally:
+                await log.stop()
+                await engine.dispose()
+
+        asyncio.run(run())
+        explained = [entry for entry in read_entries(path) if "plan" in entry]
+
+        assert explained
+        assert "Execution Time" in explained[0]["plan"][0]
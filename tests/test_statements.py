@@ -0,0 +1,102 @@
+import asyncio
+import logging
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, Table, bindparam, create_engine, select
+from sqlalchemy.dialects.postgresql.asyncpg import dialect as asyncpg_dialect
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import app.services  # noqa: F401  (registers the hot statements)
+from app.core import statements
+from app.core.metrics import metrics
+from app.services.submission_service import PROGRESS_FOR_LESSON
+from tests.pg_support import TEST_DATABASE_URL, requires_postgres, migrated_engine
+
+
+class TestHotStatements:
+    """Test the statements prepared on every new connection"""
+
+    def test_hot_statements_are_registered(self):
+        """The service modules should register their hot-path statements"""
+        assert len(statements._hot_statements) >= 10
+
+    def test_hot_statements_have_fixed_sql(self):
+        """Hot statements must compile to one SQL text so they can be prepared ahead"""
+        dialect = asyncpg_dialect()
+        for stmt in statements._hot_statements:
+            sql = stmt.compile(dialect=dialect).string
+            assert "POSTCOMPILE" not in sql, sql
+
+
+class TestCompileCacheMetrics:
+    """Test the compile-cache counters"""
+
+    def test_reused_statement_hits_the_compiled_cache(self):
+        """Executing the same statement again should count as a cache hit"""
+        engine = create_engine("sqlite://")
+        statements.install(engine, prepare=False)
+        table = Table("items", MetaData(), Column("id", Integer, primary_key=True))
+        table.create(engine)
+        stmt = select(table.c.id).where(table.c.id == bindparam("item_id"))
+
+        hits = metrics.get("sql.compile_cache.hits")
+        misses = metrics.get("sql.compile_cache.misses")
+        with engine.connect() as conn:
+            for item_id in range(3):
+                conn.execute(stmt, {"item_id": item_id})
+
+        assert metrics.get("sql.compile_cache.misses") - misses == 1
+        assert metrics.get("sql.compile_cache.hits") - hits == 2
+        assert 0 < metrics.get("sql.compile_cache.hit_rate") <= 1
+
+
+PREPARED_COUNT = "SELECT count(*) FROM pg_prepared_statements"
+
+
+async def prepare_then_execute_hot_statement():
+    """Prepared-statement count of a new pool connection, before and after running a hot statement"""
+    engine = create_async_engine(TEST_DATABASE_URL)
+    statements.install(engine)
+    try:
+        async with engine.connect() as conn:
+            driver = (await conn.get_raw_connection()).driver_connection
+            before = await driver.fetchval(PREPARED_COUNT)
+            await conn.execute(PROGRESS_FOR_LESSON, {"user_id": 1, "lesson_id": 1})
+            after = await driver.fetchval(PREPARED_COUNT)
+    finally:
+        await engine.dispose()
+    return before, after
+
+
+@pytest.fixture(scope="module")
+def pg_engine():
+    engine = migrated_engine()
+    yield engine
+    engine.dispose()
+
+
+@requires_postgres
+class TestPrepareOnConnect:
+    """Test hot statement preparation on a real asyncpg connection.
+
+    It goes through private parts of SQLAlchemy's asyncpg adapter (the
+    connection's _prepare and its prepared-statement LRU, and
+    dialect._invalidate_schema_cache_asof); these tests are what notices
+    when an upgrade of the pinned versions changes them.
+    """
+
+    def test_every_hot_statement_prepared(self, pg_engine, caplog):
+        """Opening a connection should prepare each hot statement without a warning"""
+        prepared = metrics.get("sql.prepared_on_connect")
+        with caplog.at_level(logging.WARNING, logger="app.core.statements"):
+            asyncio.run(prepare_then_execute_hot_statement())
+
+        assert metrics.get("sql.prepared_on_connect") - prepared == len(statements._hot_statements)
+        assert not caplog.records
+
+    def test_hot_statement_runs_without_parse(self, pg_engine):
+        """A hot statement's first execution should reuse the statement prepared on connect"""
+        before, after = asyncio.run(prepare_then_execute_hot_statement())
+
+        assert before >= len({stmt.compile(dialect=asyncpg_dialect()).string for stmt in statements._hot_statements})
+        assert after == before
@@ -0,0 +1,124 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+from app.core.partitions import add_months, month_start, ensure_partitions, list_partitions
+from app.services.progress_rebuild import rebuild_progress
+from app.services.submission_compaction import compact_partitions_before, earliest_allowed_cutoff
+from app.services.submission_service import LESSON_SOLVED_COUNT
+from tests.pg_support import TEST_DATABASE_URL, requires_postgres, migrated_engine
+
+
+class TestCutoff:
+    """Test the guard on the compaction cutoff"""
+
+    def test_cutoff_inside_idempotency_window_refused(self):
+        """Submissions that replays may still look up should never be compacted"""
+        cutoff = earliest_allowed_cutoff().date() + timedelta(days=1)
+
+        with pytest.raises(ValueError):
+            compact_partitions_before(None, cutoff)
+
+
+def seed(engine):
+    old = datetime.now(timezone.utc) - timedelta(days=200)
+    with engine.begin() as conn:
+        ensure_partitions(conn, months_ahead=3, since=old)
+        conn.execute(text(
+            "INSERT INTO users (id, username, total_xp, current_streak) "
+            "VALUES (1, 'a', 0, 0), (2, 'b', 0, 0)"))
+        conn.execute(text("INSERT INTO lessons (id, title, order_index, is_active) VALUES (1, 'l', 1, true)"))
+        conn.execute(text(
+            "INSERT INTO problems (id, lesson_id, question, problem_type, xp_value, order_index) "
+            "VALUES (1, 1, 'q', 'options', 10, 1), (2, 1, 'q', 'options', 10, 2)"))
+        conn.execute(text(
+            "INSERT INTO problem_options (id, problem_id, option_text, order_index, is_correct) "
+            "VALUES (1, 1, 'a', 1, true), (2, 1, 'b', 2, false), (3, 2, 'a', 1, true)"))
+        # User 1 solved problem 1 long ago after a wrong try and problem 2 recently;
+        # user 2 only ever answered problem 1 wrongly, long ago
+        conn.execute(text(
+            "INSERT INTO submissions (user_id, problem_id, lesson_id, attempt_id, option_id, "
+            "is_correct, xp_earned, submitted_at) VALUES "
+            "(1, 1, 1, 'a', 2, false, 0, :old), "
+            "(1, 1, 1, 'b', 1, true, 10, :old + interval '1 day'), "
+            "(1, 2, 1, 'c', 3, true, 10, now()), "
+            "(2, 1, 1, 'a', 2, false, 0, :old)"), {"old": old})
+
+
+@pytest.fixture(scope="module")
+def pg_engine():
+    engine = migrated_engine()
+    seed(engine)
+    yield engine
+    engine.dispose()
+
+
+def months_ago(months):
+    return add_months(month_start(datetime.now(timezone.utc)), -months)
+
+
+async def run(job):
+    engine = create_async_engine(TEST_DATABASE_URL)
+    try:
+        return await job(engine)
+    finally:
+        await engine.dispose()
+
+
+@requires_postgres
+class TestCompaction:
+    """Test compaction and the readers of compacted history against a real database"""
+
+    @pytest.fixture(autouse=True)
+    def short_window(self, monkeypatch):
+        monkeypatch.setattr(settings, "submission_idempotency_window_days", 30)
+
+    def test_old_partitions_folded_into_summaries(self, pg_engine):
+        """Old partitions should be summarised per user and problem and dropped"""
+        with pg_engine.begin() as conn:
+            result = compact_partitions_before(conn, months_ago(3), drop=True)
+        with pg_engine.connect() as conn:
+            remaining = conn.execute(text("SELECT count(*) FROM submissions")).scalar()
+            partitions = {partition.name for partition in list_partitions(conn)}
+            rows = conn.execute(text(
+                "SELECT user_id, problem_id, attempts, first_correct_at IS NOT NULL AS solved, best_xp, option_ids "
+                "FROM submission_summaries ORDER BY user_id, problem_id")).all()
+
+        assert result.partitions
+        assert not set(result.partitions) & partitions
+        assert remaining == 1
+        assert [tuple(row) for row in rows] == [(1, 1, 2, True, 10, [1, 2]), (2, 1, 1, False, 0, [2])]
+
+    def test_progress_counts_compacted_answers(self, pg_engine):
+        """Solved counts and the progress rebuild should see summaries and recent rows alike"""
+        with pg_engine.connect() as conn:
+            solved = conn.execute(LESSON_SOLVED_COUNT, {"user_id": 1, "lesson_id": 1}).scalar()
+        asyncio.run(run(lambda engine: rebuild_progress(engine, workers=1, chunk_size=10)))
+        with pg_engine.connect() as conn:
+            progress = dict(conn.execute(text(
+                "SELECT user_id, completion_percentage FROM user_progress WHERE lesson_id = 1")).all())
+
+        assert solved == 2
+        assert progress == {1: 100, 2: 0}
+
+    def test_second_compaction_merges(self, pg_engine):
+        """Compacting more rows of a summarised problem should add to its summary"""
+        old = datetime.now(timezone.utc) - timedelta(days=150)
+        with pg_engine.begin() as conn:
+            ensure_partitions(conn, months_ahead=3, since=old)
+            conn.execute(text(
+                "INSERT INTO submissions (user_id, problem_id, lesson_id, attempt_id, option_id, "
+                "is_correct, xp_earned, submitted_at) VALUES (2, 1, 1, 'd', 1, true, 10, :old)"), {"old": old})
+        with pg_engine.begin() as conn:
+            compact_partitions_before(conn, months_ago(3), drop=True)
+        with pg_engine.connect() as conn:
+            row = conn.execute(text(
+                "SELECT attempts, first_correct_at, best_xp, option_ids FROM submission_summaries "
+                "WHERE user_id = 2 AND problem_id = 1")).one()
+
+        assert (row.attempts, row.best_xp, row.option_ids) == (2, 10, [1, 2])
+        assert abs(row.first_correct_at - old) < timedelta(seconds=1)
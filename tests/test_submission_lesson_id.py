@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from app.schemas import SubmissionRequest, SingleSubmissionRequest
+from app.services import SubmissionService
+from app.services.submission_service import LESSON_SOLVED_COUNT
+from tests.pg_support import TEST_DATABASE_URL, requires_postgres, migrated_engine
+
+
+def seed(engine):
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, username, total_xp, current_streak) VALUES (1, 'u', 0, 0)"))
+        conn.execute(text(
+            "INSERT INTO lessons (id, title, order_index, is_active) VALUES (1, 'a', 1, true), (2, 'b', 2, true)"))
+        conn.execute(text(
+            "INSERT INTO problems (id, lesson_id, question, problem_type, xp_value, order_index) "
+            "VALUES (1, 1, 'q1', 'options', 10, 1), (2, 2, 'q2', 'options', 10, 1), (3, 2, 'q3', 'options', 10, 2)"))
+        conn.execute(text(
+            "INSERT INTO problem_options (id, problem_id, option_text, order_index, is_correct) "
+            "VALUES (1, 1, 'a', 1, true), (2, 2, 'a', 1, true), (3, 3, 'a', 1, true)"))
+
+
+@pytest.fixture(scope="module")
+def pg_engine():
+    engine = migrated_engine()
+    seed(engine)
+    yield engine
+    engine.dispose()
+
+
+async def submit():
+    engine = create_async_engine(TEST_DATABASE_URL)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    try:
+        async with session_factory() as db:
+            await SubmissionService.process_single_submission(db, 1, 2, SingleSubmissionRequest(
+                attempt_id="single", answer={"problem_id": 2, "option_id": 2}))
+        async with session_factory() as db:
+            await SubmissionService.process_submission(db, 1, 2, SubmissionRequest(
+                attempt_id="multi", answers=[{"problem_id": 3, "option_id": 3}]))
+    finally:
+        await engine.dispose()
+
+
+@requires_postgres
+class TestSubmissionLessonId:
+    """Test that submissions carry their lesson and lesson progress reads it"""
+
+    def test_submissions_store_lesson_id(self, pg_engine):
+        """Both submission paths should write the lesson of the answered problem"""
+        asyncio.run(submit())
+        with pg_engine.connect() as conn:
+            rows = dict(conn.execute(text("SELECT problem_id, lesson_id FROM submissions")).all())
+            progress = conn.execute(text(
+                "SELECT completion_percentage FROM user_progress WHERE user_id = 1 AND lesson_id = 2")).scalar()
+
+        assert rows == {2: 2, 3: 2}
+        assert progress == 100
+
+    def test_progress_counts_by_stored_lesson(self, pg_engine):
+        """The solved count should filter on submissions.lesson_id, not join to problems"""
+        # Rolled back when the connection closes
+        with pg_engine.connect() as conn:
+            conn.execute(text(
+                "INSERT INTO submissions (user_id, problem_id, lesson_id, attempt_id, option_id, is_correct, xp_earned) "
+                "VALUES (1, 1, 2, 'stored', 1, true, 10)"))
+            solved_in_2 = conn.execute(LESSON_SOLVED_COUNT, {"user_id": 1, "lesson_id": 2}).scalar()
+            solved_in_1 = conn.execute(LESSON_SOLVED_COUNT, {"user_id": 1, "lesson_id": 1}).scalar()
+
+        assert (solved_in_1, solved_in_2) == (0, 3)
+
+    def test_lesson_id_required(self, pg_engine):
+        """After the contract migration a submission without lesson_id should be refused"""
+        with pytest.raises(IntegrityError):
+            with pg_engine.begin() as conn:
+                conn.execute(text(
+                    "INSERT INTO submissions (user_id, problem_id, attempt_id, option_id, is_correct, xp_earned) "
+                    "VALUES (1, 1, 'old', 1, true, 10)"))
@@ -0,0 +1,282 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+import app.services.submission_writer as submission_writer_module
+from app.schemas import SingleSubmissionRequest, SubmissionResponse
+from app.services.submission_writer import GradedAnswer, SubmissionQueueFull, SubmissionWriter
+from tests.pg_support import TEST_DATABASE_URL, requires_postgres, migrated_engine
+
+
+def original_response():
+    return SubmissionResponse(
+        success=True,
+        message="Submission already processed (idempotent response)",
+        results=[{"problem_id": 1, "is_correct": True, "xp_earned": 10}],
+        total_xp_earned=10,
+        new_total_xp=500,
+        current_streak=7,
+        streak_increased=False
+    )
+
+
+class FakeSession:
+    """Request session that only tracks whether it holds a connection"""
+
+    def __init__(self):
+        self.checked_out = True
+        self.closes = 0
+
+    async def close(self):
+        self.checked_out = False
+        self.closes += 1
+
+
+class RecordingWriter(SubmissionWriter):
+    """Writer whose reads are canned and whose flushes only record their batches"""
+
+    def __init__(self, queue_size=10, batch_size=10, flush_interval_ms=20,
+                 enqueue_timeout_ms=50, durability="flush"):
+        super().__init__(queue_size, batch_size, flush_interval_ms, enqueue_timeout_ms, durability)
+        self.batches = []
+        self.fail = set()
+        self.elsewhere = {}
+        self.release = None
+        self.held = {}
+        self.total_xp = 100
+        self.sessions = []
+
+    async def _grade(self, db, user_id, lesson_id, submission):
+        return GradedAnswer(True, 10)
+
+    async def _load_user_state(self, db, user_id):
+        db.checked_out = True
+        projected = self._projected_users.get(user_id)
+        if projected is not None:
+            return projected
+        return SimpleNamespace(
+            total_xp=self.total_xp,
+            current_streak=1,
+            last_activity_date=datetime.now(timezone.utc) - timedelta(hours=1)
+        )
+
+    async def _persist(self, batch):
+        self.sessions.append([db.checked_out for db in self.sessions_by_answer(batch)])
+        if self.release is not None:
+            await self.release.wait()
+        for answer in batch:
+            if answer.attempt_id in self.held:
+                await self.held[answer.attempt_id].wait()
+        if self.fail.intersection(answer.attempt_id for answer in batch):
+            raise RuntimeError("database unavailable")
+        self.batches.append([answer.attempt_id for answer in batch if answer.attempt_id not in self.elsewhere])
+        return {answer.key: self.elsewhere[answer.attempt_id]
+                for answer in batch if answer.attempt_id in self.elsewhere}
+
+    def sessions_by_answer(self, batch):
+        return [self.request_sessions[answer.attempt_id] for answer in batch]
+
+    async def submit(self, user_id, attempt_id, problem_id=1):
+        db = FakeSession()
+        self.request_sessions[attempt_id] = db
+        request = SingleSubmissionRequest(
+            attempt_id=attempt_id, answer={"problem_id": problem_id, "option_id": 1})
+        return await self.submit_single(db, user_id, 1, request)
+
+    async def start(self):
+        self.request_sessions = {}
+        await super().start()
+
+
+class TestSubmissionWriter:
+    """Test group commit, capacity and failure handling of the write-behind path"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_answers_coalesced(self):
+        """Answers arriving within one flush interval should be written in one batch"""
+        writer = RecordingWriter(flush_interval_ms=50)
+        await writer.start()
+        responses = await asyncio.gather(*(
+            writer.submit(user_id, f"coalesce-{user_id}") for user_id in range(1, 6)))
+        await writer.stop()
+
+        assert writer.batches == [[f"coalesce-{user_id}" for user_id in range(1, 6)]]
+        assert all(response.total_xp_earned == 10 for response in responses)
+
+    @pytest.mark.asyncio
+    async def test_connection_released_while_waiting(self):
+        """A request must not hold its connection while the flusher needs one"""
+        writer = RecordingWriter()
+        await writer.start()
+        await writer.submit(1, "release-a")
+        await writer.stop()
+
+        assert writer.sessions == [[False]]
+        assert writer.request_sessions["release-a"].closes == 2
+
+    @pytest.mark.asyncio
+    async def test_projection_accumulates_until_committed(self):
+        """A user's second answer in flight should build on the first one's XP"""
+        writer = RecordingWriter(flush_interval_ms=50)
+        await writer.start()
+        first, second = await asyncio.gather(
+            writer.submit(1, "project-a", problem_id=1),
+            writer.submit(1, "project-b", problem_id=2))
+        await writer.stop()
+
+        assert sorted([first.new_total_xp, second.new_total_xp]) == [110, 120]
+        assert writer._projected_users == {}
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_rebuilds_projection(self):
+        """A failed answer's XP must leave the projection, the user's answers still in flight must not"""
+        writer = RecordingWriter(batch_size=1, flush_interval_ms=0)
+        writer.fail = {"fail-a"}
+        writer.held = {"fail-a": asyncio.Event(), "fail-b": asyncio.Event()}
+        await writer.start()
+        failing = asyncio.create_task(writer.submit(1, "fail-a", problem_id=1))
+        await asyncio.sleep(0.01)
+        pending = asyncio.create_task(writer.submit(1, "fail-b", problem_id=2))
+        await asyncio.sleep(0.01)
+        writer.held["fail-a"].set()
+
+        with pytest.raises(RuntimeError):
+            await failing
+        # fail-b is still waiting for its flush: committed 100 plus its 10
+        assert writer._pending_per_user == {1: 1}
+        assert writer._projected_users[1].total_xp == 110
+
+        writer.held["fail-b"].set()
+        assert (await pending).new_total_xp == 120
+        await writer.stop()
+        assert writer.batches == [["fail-b"]]
+
+    @pytest.mark.asyncio
+    async def test_answered_elsewhere_returns_stored_response(self):
+        """An attempt committed first by another request should be answered with that request's response"""
+        stored = original_response()
+        writer = RecordingWriter(batch_size=1, flush_interval_ms=0)
+        writer.elsewhere = {"elsewhere-a": stored}
+        writer.held = {"elsewhere-a": asyncio.Event(), "elsewhere-b": asyncio.Event()}
+        await writer.start()
+        elsewhere = asyncio.create_task(writer.submit(1, "elsewhere-a", problem_id=1))
+        await asyncio.sleep(0.01)
+        pending = asyncio.create_task(writer.submit(1, "elsewhere-b", problem_id=2))
+        await asyncio.sleep(0.01)
+        writer.held["elsewhere-a"].set()
+
+        assert await elsewhere == stored
+        # Its XP was never credited here: only elsewhere-b's stays projected
+        assert writer._projected_users[1].total_xp == 110
+
+        writer.held["elsewhere-b"].set()
+        await pending
+        await writer.stop()
+        assert writer.batches == [[], ["elsewhere-b"]]
+
+    @pytest.mark.asyncio
+    async def test_full_queue_times_out(self):
+        """Answers beyond the capacity should be refused after the enqueue timeout"""
+        writer = RecordingWriter(queue_size=1, enqueue_timeout_ms=20)
+        writer.release = asyncio.Event()
+        await writer.start()
+        first = asyncio.create_task(writer.submit(1, "full-a"))
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(SubmissionQueueFull):
+            await writer.submit(2, "full-b")
+        assert writer.request_sessions["full-b"].checked_out is False
+
+        writer.release.set()
+        await first
+        await writer.stop()
+        assert writer.batches == [["full-a"]]
+
+    @pytest.mark.asyncio
+    async def test_stop_drains_queue(self):
+        """Answers accepted before shutdown should all be written"""
+        writer = RecordingWriter(batch_size=2, flush_interval_ms=1000, durability="enqueue")
+        await writer.start()
+        for attempt in range(5):
+            await writer.submit(attempt + 1, f"drain-{attempt}")
+        await writer.stop()
+
+        assert [attempt for batch in writer.batches for attempt in batch] == [
+            f"drain-{attempt}" for attempt in range(5)]
+        assert all(len(batch) <= 2 for batch in writer.batches)
+        assert writer._pending == {}
+
+
+def seed(engine):
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, username, total_xp, current_streak) VALUES (1, 'u', 500, 7), (2, 'v', 0, 0)"))
+        conn.execute(text("INSERT INTO lessons (id, title, order_index, is_active) VALUES (1, 'l', 1, true)"))
+        conn.execute(text(
+            "INSERT INTO problems (id, lesson_id, question, problem_type, xp_value, order_index) "
+            "VALUES (1, 1, 'q1', 'options', 10, 1), (2, 1, 'q2', 'options', 10, 2)"))
+        conn.execute(text(
+            "INSERT INTO problem_options (id, problem_id, option_text, order_index, is_correct) "
+            "VALUES (1, 1, 'a', 1, true), (2, 2, 'a', 1, true)"))
+        # What another worker committed for the attempt after it was graded here
+        conn.execute(text(
+            "INSERT INTO submissions (user_id, problem_id, lesson_id, attempt_id, option_id, is_correct, xp_earned) "
+            "VALUES (1, 1, 1, 'elsewhere', 1, true, 10)"))
+        conn.execute(text(
+            "INSERT INTO idempotent_responses (user_id, attempt_id, problem_id, response) "
+            "VALUES (1, 'elsewhere', 1, CAST(:response AS jsonb))"),
+            {"response": original_response().model_dump_json()})
+
+
+@pytest.fixture(scope="module")
+def pg_engine():
+    engine = migrated_engine()
+    seed(engine)
+    yield engine
+    engine.dispose()
+
+
+async def flush_with_stored_response(monkeypatch):
+    engine = create_async_engine(TEST_DATABASE_URL)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    monkeypatch.setattr(submission_writer_module, "AsyncSessionLocal", session_factory)
+    writer = SubmissionWriter(queue_size=10, batch_size=10, flush_interval_ms=20, enqueue_timeout_ms=1000)
+
+    async def graded_before_the_other_commit(db, user_id, lesson_id, submission):
+        return GradedAnswer(True, 10)
+
+    writer._grade = graded_before_the_other_commit
+    try:
+        await writer.start()
+        async with session_factory() as elsewhere_db, session_factory() as fresh_db:
+            return await asyncio.gather(
+                writer.submit_single(elsewhere_db, 1, 1, SingleSubmissionRequest(
+                    attempt_id="elsewhere", answer={"problem_id": 1, "option_id": 1})),
+                writer.submit_single(fresh_db, 2, 1, SingleSubmissionRequest(
+                    attempt_id="fresh", answer={"problem_id": 2, "option_id": 2})))
+    finally:
+        await writer.stop()
+        await engine.dispose()
+
+
+@requires_postgres
+class TestPersistAnsweredElsewhere:
+    """Test a flush of an attempt whose response another request already stored"""
+
+    def test_stored_attempt_not_written_twice(self, pg_engine, monkeypatch):
+        """The stored response should answer and no second submission or XP should be written"""
+        elsewhere, fresh = asyncio.run(flush_with_stored_response(monkeypatch))
+        with pg_engine.connect() as conn:
+            attempts = dict(conn.execute(text(
+                "SELECT attempt_id, count(*) FROM submissions GROUP BY attempt_id")).all())
+            total_xp = dict(conn.execute(text("SELECT id, total_xp FROM users")).all())
+            attempt_stats = conn.execute(text("SELECT attempts FROM problem_stats WHERE problem_id = 1")).scalar()
+
+        assert elsewhere == original_response()
+        assert fresh.new_total_xp == 10
+        assert attempts == {"elsewhere": 1, "fresh": 1}
+        assert total_xp == {1: 500, 2: 10}
+        assert attempt_stats is None
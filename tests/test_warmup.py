@@ -0,0 +1,158 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.core import warmup
+from app.core.config import settings
+from app.routes import health_router
+from app.services.idempotency_service import idempotency_sweeper
+from app.services.submission_service import (
+    EXISTING_ATTEMPT, EXISTING_ATTEMPT_PROBLEM, EARLIER_ATTEMPT, EARLIER_ATTEMPT_PROBLEM, PROBLEM_IN_LESSON, OPTION_BY_ID
+)
+from app.services.submission_writer import USER_STATE
+
+
+class NoDatabase:
+    """Engine stand-in: startup's partition check fails and is logged"""
+
+    def begin(self):
+        raise ConnectionError("no database")
+
+    async def dispose(self):
+        pass
+
+
+class RecordingSession:
+    """Session that records the statements it is asked to run and finds nothing"""
+
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, stmt, params=None):
+        self.statements.append(stmt)
+        return self
+
+    def scalar_one_or_none(self):
+        return None
+
+
+@pytest.fixture
+def startup(monkeypatch):
+    """Run the real lifespan with warmup held until the returned event is set"""
+    release = asyncio.Event()
+
+    async def warm_up_pool(connections):
+        pass
+
+    async def warm_up_queries():
+        await release.wait()
+
+    async def no_sweeper():
+        pass
+
+    monkeypatch.setattr(main, "engine", NoDatabase())
+    monkeypatch.setattr(warmup, "warm_up_pool", warm_up_pool)
+    monkeypatch.setattr(warmup, "warm_up_queries", warm_up_queries)
+    monkeypatch.setattr(idempotency_sweeper, "start", no_sweeper)
+    monkeypatch.setattr(settings, "warmup_enabled", True)
+    monkeypatch.setattr(settings, "invalidation_enabled", False)
+    monkeypatch.setattr(settings, "write_behind_enabled", False)
+    monkeypatch.setattr(settings, "progress_recompute_enabled", False)
+    return release
+
+
+def client(ready=None):
+    app = FastAPI()
+    app.include_router(health_router)
+    if ready is not None:
+        app.state.ready = ready
+    return TestClient(app)
+
+
+class TestReadiness:
+    """Test GET /health/ready around startup warmup"""
+
+    def test_not_ready_without_state(self):
+        """An app whose lifespan has not run yet should not take traffic"""
+        response = client().get("/health/ready")
+
+        assert response.status_code == 503
+        assert response.json()["status"] == "starting"
+
+    def test_ready_flag(self):
+        """The probe should follow app.state.ready"""
+        assert client(ready=False).get("/health/ready").status_code == 503
+        assert client(ready=True).get("/health/ready").status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_not_ready_until_warmup_finishes(self, startup):
+        """The worker should report 503 while warming up and 200 once warmup is done"""
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            lifespan = main.lifespan(main.app)
+            starting = asyncio.create_task(lifespan.__aenter__())
+            await asyncio.sleep(0.01)
+
+            during = await http.get("/health/ready")
+            startup.set()
+            await starting
+            after = await http.get("/health/ready")
+            await lifespan.__aexit__(None, None, None)
+            stopped = await http.get("/health/ready")
+
+        assert during.status_code == 503
+        assert after.status_code == 200
+        assert stopped.status_code == 503
+
+    @pytest.mark.asyncio
+    async def test_ready_after_failed_warmup(self, startup, monkeypatch):
+        """A warmup error should be logged and the worker still become ready, cold"""
+        async def failing_queries():
+            raise ConnectionError("database blip")
+
+        monkeypatch.setattr(warmup, "warm_up_queries", failing_queries)
+        async with main.lifespan(main.app):
+            assert main.app.state.ready is True
+
+
+class TestMetricsEndpoint:
+    """Test that GET /metrics is guarded by the admin token, as /debug is"""
+
+    def test_hidden_without_token(self, monkeypatch):
+        """Without a configured admin token the endpoint should not exist"""
+        monkeypatch.setattr(settings, "debug_admin_token", None)
+
+        assert client().get("/metrics").status_code == 404
+
+    def test_admin_token_required(self, monkeypatch):
+        """Only requests carrying the admin token should see the counters"""
+        monkeypatch.setattr(settings, "debug_admin_token", "secret")
+        http = client()
+
+        assert http.get("/metrics").status_code == 403
+        assert http.get("/metrics", headers={"X-Admin-Token": "wrong"}).status_code == 403
+        assert http.get("/metrics", headers={"X-Admin-Token": "secret"}).status_code == 200
+
+
+class TestWarmUpSubmissionReads:
+    """Test that warmup runs the read statements of the submission paths"""
+
+    @pytest.mark.asyncio
+    async def test_submission_statements_run(self, monkeypatch):
+        """Both existing-attempt lookups, grading reads and the writer's user read should run"""
+        async def no_stored_response(db, user_id, attempt_id, problem_id=0):
+            return None
+
+        monkeypatch.setattr(
+            "app.services.IdempotencyService.get_response", staticmethod(no_stored_response))
+        db = RecordingSession()
+        await warmup.warm_up_submission_reads(db, 1, 1)
+
+        assert db.statements == [
+            EXISTING_ATTEMPT, EARLIER_ATTEMPT, EXISTING_ATTEMPT_PROBLEM, EARLIER_ATTEMPT_PROBLEM,
+            PROBLEM_IN_LESSON, OPTION_BY_ID, USER_STATE
+        ]